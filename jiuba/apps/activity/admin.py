@@ -2,11 +2,11 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
+from apps.reservations.models import Reservation
 from .models import Activity
 
 class ReservationInline(admin.TabularInline):
     """在活动详情页内联显示预约记录"""
-    from apps.reservations.models import Reservation  # 修正导入路径
     model = Reservation
     extra = 0
     readonly_fields = ['user', 'contact_phone', 'status', 'created_at']
@@ -27,7 +27,7 @@ class ActivityAdmin(admin.ModelAdmin):
     list_editable = ['is_featured']
     search_fields = ['title', 'shop__name']
     date_hierarchy = 'start_time'
-    readonly_fields = ['created_at', 'updated_at', 'reservation_stats_detailed']
+    readonly_fields = ['created_at', 'updated_at', 'remaining_slots_display', 'reservation_stats_detailed']
     inlines = [ReservationInline]  # 添加内联显示
     
     # 更合理的字段分组
@@ -54,23 +54,24 @@ class ActivityAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_queryset(self, request):
+        # 列表页和详情页的预约统计均来自同一条聚合查询
+        return super().get_queryset(request).select_related('shop').with_reservation_stats()
+
     def reservation_stats(self, obj):
         """在列表页显示预约统计"""
-        try:
-            from apps.reservations.models import Reservation
-            confirmed = Reservation.objects.filter(activity=obj, status='confirmed').count()
-            total = Reservation.objects.filter(activity=obj).count()
-            
-            if total == 0:
-                return format_html('<span style="color: #95a5a6;">暂无预约</span>')
-            
-            return format_html(
-                '<span style="color: #2ecc71;">已确认: {}</span> / <span style="color: #3498db;">总计: {}</span>',
-                confirmed, total
-            )
-        except ImportError:
-            return format_html('<span style="color: #95a5a6;">预约模块未安装</span>')
+        confirmed = obj.confirmed_reservation_count()
+        total = obj.reservation_count()
+        
+        if total == 0:
+            return format_html('<span style="color: #95a5a6;">暂无预约</span>')
+        
+        return format_html(
+            '<span style="color: #2ecc71;">已确认: {}</span> / <span style="color: #3498db;">总计: {}</span>',
+            confirmed, total
+        )
     reservation_stats.short_description = '预约统计'
+    reservation_stats.admin_order_field = 'total_reservations'
 
     def remaining_slots_display(self, obj):
         """显示剩余名额"""
@@ -96,34 +97,29 @@ class ActivityAdmin(admin.ModelAdmin):
 
     def reservation_stats_detailed(self, obj):
         """在详情页显示详细预约统计"""
-        try:
-            from apps.reservations.models import Reservation
-            total = Reservation.objects.filter(activity=obj).count()
-            confirmed = Reservation.objects.filter(activity=obj, status='confirmed').count()
-            completed = Reservation.objects.filter(activity=obj, status='completed').count()
-            cancelled = Reservation.objects.filter(activity=obj, status='cancelled').count()
-            
-            if total == 0:
-                return format_html('<span style="color: #95a5a6;">暂无预约记录</span>')
-            
-            return format_html('''
-                <div style="padding: 10px; background: #f8f9fa; border-radius: 5px;">
-                    <div style="display: grid; grid-template-columns: repeat(2, 1fr); gap: 10px;">
-                        <div><strong>总预约数:</strong> <span style="color: #3498db;">{}</span></div>
-                        <div><strong>已确认:</strong> <span style="color: #2ecc71;">{}</span></div>
-                        <div><strong>已完成:</strong> <span style="color: #9b59b6;">{}</span></div>
-                        <div><strong>已取消:</strong> <span style="color: #e74c3c;">{}</span></div>
-                    </div>
+        total = obj.reservation_count()
+        confirmed = obj.confirmed_reservation_count()
+        completed = obj.completed_reservation_count()
+        cancelled = obj.cancelled_reservation_count()
+        
+        if total == 0:
+            return format_html('<span style="color: #95a5a6;">暂无预约记录</span>')
+        
+        return format_html('''
+            <div style="padding: 10px; background: #f8f9fa; border-radius: 5px;">
+                <div style="display: grid; grid-template-columns: repeat(2, 1fr); gap: 10px;">
+                    <div><strong>总预约数:</strong> <span style="color: #3498db;">{}</span></div>
+                    <div><strong>已确认:</strong> <span style="color: #2ecc71;">{}</span></div>
+                    <div><strong>已完成:</strong> <span style="color: #9b59b6;">{}</span></div>
+                    <div><strong>已取消:</strong> <span style="color: #e74c3c;">{}</span></div>
                 </div>
-            ''', total, confirmed, completed, cancelled)
-        except ImportError:
-            return format_html('<span style="color: #95a5a6;">预约模块未安装</span>')
+            </div>
+        ''', total, confirmed, completed, cancelled)
     reservation_stats_detailed.short_description = '详细预约统计'
 
     def action_buttons(self, obj):
         """操作按钮"""
         try:
-            from django.contrib import admin
             reservations_url = reverse('admin:reservations_reservation_changelist') + f'?activity__id__exact={obj.id}'
             return format_html(
                 '<a class="button" href="{}" style="background: #3498db; color: white; padding: 5px 10px; border-radius: 3px; text-decoration: none; margin-right: 5px;">查看预约</a>'
@@ -5,3 +5,6 @@ class ActivityConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.activity'
     verbose_name = "活动管理"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,109 @@
+"""
+首页活动聚合（推荐 / 进行中 / 即将开始 / 今日 / 本店）
+
+一条查询取出启用且未结束的活动：Case/When 标记所属的桶，窗口函数 RowNumber 按桶分区编号，
+只返回各桶按 start_time 的前 BUCKET_SIZE 个，在内存中分桶，同一活动只序列化一次；
+结果缓存到下一个状态边界：最近的一个尚未到达的 start_time / end_time，
+或本地时间的下一个零点（"今日"变化）。
+到达边界时缓存自然过期，活动的增删改通过版本号立即失效。
+图片地址为相对路径，与请求的域名无关，所有请求共用同一份缓存。
+"""
+import math
+import time as _time
+from datetime import datetime, time, timedelta
+
+from django.core.cache import cache
+from django.db.models import BooleanField, Case, F, Min, Q, Value, When, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from .models import Activity
+from .serializers import ActivitySerializer
+
+VERSION_KEY = 'activity_feed:version'
+BUCKETS = ['featured', 'ongoing', 'upcoming', 'today']
+# 每个桶最多返回的活动数
+BUCKET_SIZE = 20
+
+
+def _cache_key(shop_id):
+    version = cache.get_or_set(VERSION_KEY, _time.time_ns, None)
+    return f'activity_feed:{version}:{shop_id or "all"}'
+
+
+def _flag(**lookups):
+    return Case(When(then=Value(True), **lookups), default=Value(False), output_field=BooleanField())
+
+
+def _rank(partition):
+    """按 partition 分区、start_time 排序的序号"""
+    return Window(RowNumber(), partition_by=[partition], order_by=[F('start_time').asc(), F('pk').asc()])
+
+
+def build_feed(shop_id=None, now=None):
+    """
+    生成分桶结果，返回 (数据, 距下一个边界的秒数)
+    shop_id 不为空时额外返回该店铺未结束的活动（shop 桶）
+    """
+    now = now or timezone.now()
+    local_now = timezone.localtime(now)
+    today_start = timezone.make_aware(datetime.combine(local_now.date(), time.min))
+    today_end = today_start + timedelta(days=1)
+
+    # 进行中 / 即将开始互斥，共用一个分区序号 status_rank
+    queryset = Activity.objects.filter(is_active=True, end_time__gt=now).annotate(
+        is_ongoing=_flag(start_time__lte=now),
+        is_today=_flag(start_time__gte=today_start, start_time__lt=today_end),
+        in_shop=_flag(shop_id=shop_id),
+        featured_rank=_rank(F('is_featured')),
+        status_rank=_rank(F('is_ongoing')),
+        today_rank=_rank(F('is_today')),
+        shop_rank=_rank(F('in_shop')),
+        # 窗口在筛选前计算，是全部未结束活动中最早的结束时间
+        next_end=Window(Min('end_time')),
+    )
+    size = BUCKET_SIZE
+    activities = list(
+        queryset.filter(
+            Q(is_featured=True, featured_rank__lte=size) | Q(status_rank__lte=size)
+            | Q(is_today=True, today_rank__lte=size) | Q(in_shop=True, shop_rank__lte=size)
+        ).select_related('shop').order_by('start_time', 'pk')
+    )
+    rows = ActivitySerializer(activities, many=True).data
+
+    feed = {name: [] for name in BUCKETS}
+    if shop_id is not None:
+        feed['shop'] = []
+    boundary = today_end
+    for activity, row in zip(activities, rows):
+        if activity.is_featured and activity.featured_rank <= size:
+            feed['featured'].append(row)
+        if activity.status_rank <= size:
+            if activity.is_ongoing:
+                feed['ongoing'].append(row)
+            else:
+                feed['upcoming'].append(row)
+                boundary = min(boundary, activity.start_time)
+        if activity.is_today and activity.today_rank <= size:
+            feed['today'].append(row)
+        if shop_id is not None and activity.in_shop and activity.shop_rank <= size:
+            feed['shop'].append(row)
+    # 任一活动结束或下一个活动开始时，各桶的内容都可能变化
+    if activities:
+        boundary = min(boundary, activities[0].next_end)
+
+    return feed, max(1, math.ceil((boundary - now).total_seconds()))
+
+
+def get_feed(shop_id=None):
+    key = _cache_key(shop_id)
+    feed = cache.get(key)
+    if feed is None:
+        feed, timeout = build_feed(shop_id)
+        cache.set(key, feed, timeout)
+    return feed
+
+
+def invalidate_feed():
+    """活动或店铺变更后使全部缓存失效（旧版本的缓存到期后自动清除）"""
+    cache.set(VERSION_KEY, _time.time_ns(), None)
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:20
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_confirmed_count(apps, schema_editor):
+    Activity = apps.get_model('activity', 'Activity')
+    Reservation = apps.get_model('reservations', 'Reservation')
+    counts = Reservation.objects.filter(
+        activity=OuterRef('pk'), status__in=['confirmed', 'completed']
+    ).order_by().values('activity').annotate(total=Count('id')).values('total')
+    Activity.objects.update(confirmed_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activity', '0003_activity_is_featured'),
+        ('reservations', '0002_alter_reservation_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activity',
+            name='confirmed_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='有效预约（已确认 + 已完成）数量', verbose_name='已占用名额'),
+        ),
+        migrations.RunPython(backfill_confirmed_count, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,24 @@
 # apps/activity/models.py
 from django.db import models
+from django.db.models import Count, Q
 from django.utils import timezone
 from apps.shop.models import Shop
 
+
+class ActivityQuerySet(models.QuerySet):
+    def with_reservation_stats(self):
+        """
+        一次查询附带各状态预约数量：
+        total_reservations / confirmed_reservations / completed_reservations / cancelled_reservations
+        """
+        return self.annotate(
+            total_reservations=Count('reservation'),
+            confirmed_reservations=Count('reservation', filter=Q(reservation__status='confirmed')),
+            completed_reservations=Count('reservation', filter=Q(reservation__status='completed')),
+            cancelled_reservations=Count('reservation', filter=Q(reservation__status='cancelled')),
+        )
+
+
 class Activity(models.Model):
     shop = models.ForeignKey(
         Shop,
@@ -32,14 +48,37 @@ class Activity(models.Model):
         blank=True,
         help_text="留空表示不限人数"
     )
+    # 由 apps.reservations.capacity 维护，预约成功 +1、取消 -1，不要直接修改
+    confirmed_count = models.PositiveIntegerField(
+        "已占用名额",
+        default=0,
+        editable=False,
+        help_text="有效预约（已确认 + 已完成）数量"
+    )
     is_active = models.BooleanField("是否启用", default=True)
     created_at = models.DateTimeField("创建时间", auto_now_add=True)
     updated_at = models.DateTimeField("更新时间", auto_now=True)
 
+    objects = ActivityQuerySet.as_manager()
+
     class Meta:
         verbose_name = "活动"
         verbose_name_plural = "活动"
         ordering = ['start_time']
+        indexes = [
+            # 日历按月范围扫描 start_time，可按店铺筛选
+            models.Index(fields=['start_time'], name='activity_start_idx'),
+            models.Index(fields=['shop', 'start_time'], name='activity_shop_start_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # confirmed_count 只由 apps.reservations.capacity 原子更新，修改活动时不写回内存中可能已过期的值
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'confirmed_count'
+            ]
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.title} @ {self.shop.name}"
@@ -52,35 +91,33 @@ class Activity(models.Model):
         """返回剩余名额（仅当设置了 max_participants 时有效）"""
         if self.max_participants is None:
             return float('inf')  # 无限
-        from apps.reservation.models import Reservation
-        confirmed_count = Reservation.objects.filter(
-            activity=self,
-            status='confirmed'
-        ).count()
-        return max(0, self.max_participants - confirmed_count)
+        return max(0, self.max_participants - self.confirmed_count)
 
     # 🆕 新增预约相关统计方法
+    # 通过 with_reservation_stats() 查询的对象直接使用注解值，否则单独 COUNT
+    def _reservation_stat(self, annotation, **filters):
+        if hasattr(self, annotation):
+            return getattr(self, annotation)
+        if self.pk is None:
+            return 0
+        return self.reservation_set.filter(**filters).count()
+
     def reservation_count(self):
         """获取该活动的总预约数量"""
-        from apps.reservation.models import Reservation
-        return Reservation.objects.filter(activity=self).count()
+        return self._reservation_stat('total_reservations')
 
     def confirmed_reservation_count(self):
         """获取已确认的预约数量"""
-        from apps.reservation.models import Reservation
-        return Reservation.objects.filter(activity=self, status='confirmed').count()
+        return self._reservation_stat('confirmed_reservations', status='confirmed')
 
     def completed_reservation_count(self):
         """获取已完成的预约数量"""
-        from apps.reservation.models import Reservation
-        return Reservation.objects.filter(activity=self, status='completed').count()
+        return self._reservation_stat('completed_reservations', status='completed')
 
     def cancelled_reservation_count(self):
         """获取已取消的预约数量"""
-        from apps.reservation.models import Reservation
-        return Reservation.objects.filter(activity=self, status='cancelled').count()
+        return self._reservation_stat('cancelled_reservations', status='cancelled')
 
     def get_reservations(self):
         """获取该活动的所有预约"""
-        from apps.reservation.models import Reservation
-        return Reservation.objects.filter(activity=self).select_related('user')
\ No newline at end of file
+        return self.reservation_set.select_related('user')
@@ -0,0 +1,111 @@
+"""
+活动日历
+
+按月返回每天的活动数量和简要信息（不含剩余名额等随预约变化的数据）。按 (店铺, 月份) 缓存，
+请求的几个月中未缓存的月份由一条 start_time 范围查询取出（start_time / shop + start_time 索引），
+在内存中按月份和本地日期分组。
+"""
+import time
+from datetime import datetime
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Activity
+
+VERSION_KEY = 'activity_calendar:version'
+CACHE_TIMEOUT = 60 * 60 * 24
+# 单次请求最多返回的月份数
+MAX_MONTHS = 3
+# 可查询的年份范围，超出时 datetime 无法表示下一个月或转换时区
+MIN_YEAR, MAX_YEAR = 2000, 2099
+
+
+def _version():
+    return cache.get_or_set(VERSION_KEY, time.time_ns, None)
+
+
+def _cache_key(version, shop_id, year, month):
+    return f'activity_calendar:{version}:{shop_id or "all"}:{year}-{month:02d}'
+
+
+def _next_month(year, month):
+    return (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def build_months(first, last, shop_id=None):
+    """
+    生成 first 到 last（均为 (年, 月)）之间每个月的日历，一条范围查询：
+    {(年, 月): [{'date', 'count', 'activities': [...]}, ...]}，每月只包含有活动的日期
+    """
+    start = timezone.make_aware(datetime(*first, 1))
+    end = timezone.make_aware(datetime(*_next_month(*last), 1))
+
+    queryset = Activity.objects.filter(
+        is_active=True, start_time__gte=start, start_time__lt=end
+    )
+    if shop_id is not None:
+        queryset = queryset.filter(shop_id=shop_id)
+    rows = queryset.order_by('start_time').values(
+        'id', 'title', 'start_time', 'end_time', 'shop_id', 'shop__name',
+        'is_featured', 'max_participants',
+    )
+
+    months = {}
+    year_month = first
+    while year_month <= last:
+        months[year_month] = {}
+        year_month = _next_month(*year_month)
+    for row in rows:
+        start_time = timezone.localtime(row['start_time'])
+        days = months[(start_time.year, start_time.month)]
+        key = start_time.date().isoformat()
+        if key not in days:
+            days[key] = {'date': key, 'count': 0, 'activities': []}
+        days[key]['count'] += 1
+        days[key]['activities'].append({
+            'id': row['id'],
+            'title': row['title'],
+            'start_time': start_time.isoformat(),
+            'end_time': timezone.localtime(row['end_time']).isoformat(),
+            'shop_id': row['shop_id'],
+            'shop_name': row['shop__name'],
+            'is_featured': row['is_featured'],
+            'max_participants': row['max_participants'],
+        })
+    return {year_month: list(days.values()) for year_month, days in months.items()}
+
+
+def get_calendar(first_month, months=1, shop_id=None):
+    """从 first_month（date，取年月）开始连续 months 个月的日历"""
+    year_months = [(first_month.year, first_month.month)]
+    for _ in range(months - 1):
+        year_months.append(_next_month(*year_months[-1]))
+
+    version = _version()
+    keys = {year_month: _cache_key(version, shop_id, *year_month) for year_month in year_months}
+    cached = cache.get_many(keys.values())
+    missing = [year_month for year_month in year_months if keys[year_month] not in cached]
+    if missing:
+        built = build_months(missing[0], missing[-1], shop_id)
+        fresh = {keys[year_month]: built[year_month] for year_month in missing}
+        cache.set_many(fresh, CACHE_TIMEOUT)
+        cached.update(fresh)
+
+    return [
+        {'month': f'{year}-{month:02d}', 'days': cached[keys[(year, month)]]}
+        for year, month in year_months
+    ]
+
+
+def parse_month(value):
+    """解析 YYYY-MM，格式错误或年份不在 MIN_YEAR–MAX_YEAR 范围内返回 None"""
+    try:
+        month = datetime.strptime(value, '%Y-%m').date()
+    except (TypeError, ValueError):
+        return None
+    return month if MIN_YEAR <= month.year <= MAX_YEAR else None
+
+
+def invalidate_calendar():
+    cache.set(VERSION_KEY, time.time_ns(), None)
@@ -0,0 +1,25 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.shop.models import Shop
+from jiuba.images import schedule_derivatives
+
+from .feed import invalidate_feed
+from .month_calendar import invalidate_calendar
+from .models import Activity
+
+
+@receiver(post_save, sender=Activity, dispatch_uid='activity_image_derivatives')
+def activity_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_derivatives(instance.image)
+
+
+@receiver(post_save, sender=Activity, dispatch_uid='activity_feed_saved')
+@receiver(post_delete, sender=Activity, dispatch_uid='activity_feed_deleted')
+@receiver(post_save, sender=Shop, dispatch_uid='activity_feed_shop_saved')
+def activity_changed(sender, raw=False, **kwargs):
+    # 首页活动聚合和日历中包含店铺名称、地址
+    if not raw:
+        invalidate_feed()
+        invalidate_calendar()
@@ -1,3 +1,113 @@
-from django.test import TestCase
+from datetime import datetime, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.shop.models import Shop
+
+from .feed import build_feed
+from .models import Activity
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE, BACKGROUND_TASK_WORKERS=0)
+class CalendarViewTests(TestCase):
+    url = '/api/activity/calendar/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.shop = Shop.objects.create(name='本店')
+        start = timezone.make_aware(datetime(2030, 5, 31, 20))
+        for title, offset in [('乐队现场', 0), ('品鉴会', 0), ('调酒课', 1)]:
+            Activity.objects.create(
+                shop=cls.shop, title=title, start_time=start + timedelta(days=offset),
+                end_time=start + timedelta(days=offset, hours=3),
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_groups_by_local_date(self):
+        response = self.client.get(self.url, {'month': '2030-05', 'months': 2})
+        self.assertEqual(response.status_code, 200)
+        may, june = response.data['months']
+        self.assertEqual([(day['date'], day['count']) for day in may['days']], [('2030-05-31', 2)])
+        self.assertEqual([(day['date'], day['count']) for day in june['days']], [('2030-06-01', 1)])
+
+    def test_one_query_for_all_months(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'month': '2030-04', 'months': 3})
+        self.assertEqual([len(month['days']) for month in response.data['months']], [0, 1, 1])
+        # 已缓存的月份不再查询，只查缺少的月份
+        with self.assertNumQueries(0):
+            self.client.get(self.url, {'month': '2030-05', 'months': 2})
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'month': '2030-06', 'months': 2})
+        self.assertEqual([month['month'] for month in response.data['months']], ['2030-06', '2030-07'])
+
+    def test_month_out_of_range(self):
+        for month in ['9999-12', '0001-01', '1999-12', '2100-01', '2030-13', 'may']:
+            self.assertEqual(self.client.get(self.url, {'month': month}).status_code, 400, month)
+
+    def test_last_supported_month_spans_next_year(self):
+        response = self.client.get(self.url, {'month': '2099-12', 'months': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([month['month'] for month in response.data['months']], ['2099-12', '2100-01', '2100-02'])
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class FeedBucketTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.now = timezone.make_aware(datetime(2030, 5, 31, 12))
+        cls.shop = Shop.objects.create(name='本店')
+        cls.other_shop = Shop.objects.create(name='他店')
+
+        def create(title, start, hours, shop=None, **fields):
+            return Activity.objects.create(
+                shop=shop or cls.shop, title=title, start_time=cls.now + start,
+                end_time=cls.now + start + timedelta(hours=hours), **fields
+            )
+
+        create('乐队现场', -timedelta(hours=1), 3, is_featured=True)
+        create('品鉴会', timedelta(hours=3), 2)
+        create('调酒课', timedelta(days=1), 2, shop=cls.other_shop)
+        create('已结束', -timedelta(hours=5), 4)
+        create('已停用', timedelta(hours=4), 2, is_active=False)
+
+    def titles(self, feed):
+        return {name: [row['title'] for row in rows] for name, rows in feed.items()}
+
+    def test_buckets(self):
+        with self.assertNumQueries(1):
+            feed, timeout = build_feed(self.shop.pk, now=self.now)
+        self.assertEqual(self.titles(feed), {
+            'featured': ['乐队现场'],
+            'ongoing': ['乐队现场'],
+            'upcoming': ['品鉴会', '调酒课'],
+            'today': ['乐队现场', '品鉴会'],
+            'shop': ['乐队现场', '品鉴会'],
+        })
+        # 最近的边界是进行中活动的结束时间
+        self.assertEqual(timeout, 2 * 60 * 60)
+        self.assertNotIn('shop', build_feed(now=self.now)[0])
+
+    def test_next_start_is_boundary(self):
+        feed, timeout = build_feed(now=self.now + timedelta(hours=2, minutes=30))
+        self.assertEqual(self.titles(feed)['ongoing'], [])
+        self.assertEqual(timeout, 30 * 60)
+
+    def test_buckets_are_capped(self):
+        for i in range(5):
+            Activity.objects.create(
+                shop=self.shop, title=f'追加{i}', start_time=self.now + timedelta(days=2, hours=i),
+                end_time=self.now + timedelta(days=2, hours=i + 1),
+            )
+        with mock.patch('apps.activity.feed.BUCKET_SIZE', 3), self.assertNumQueries(1):
+            feed, _ = build_feed(self.shop.pk, now=self.now)
+        self.assertEqual(self.titles(feed)['upcoming'], ['品鉴会', '调酒课', '追加0'])
+        self.assertEqual(len(feed['shop']), 3)
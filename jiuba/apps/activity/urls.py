@@ -6,5 +6,8 @@ router = DefaultRouter()
 router.register(r'activities', ActivityViewSet)
 
 urlpatterns = [
+    # 首页活动聚合（同 activities/feed/）
+    path('feed/', ActivityViewSet.as_view({'get': 'feed'}), name='activity-feed'),
+    path('calendar/', ActivityViewSet.as_view({'get': 'calendar'}), name='activity-calendar'),
     path('', include(router.urls)),
-]
\ No newline at end of file
+]
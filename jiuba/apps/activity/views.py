@@ -7,6 +7,10 @@ from django.utils import timezone
 from django.db.models import Q
 from .models import Activity
 from .serializers import ActivitySerializer
+from .feed import get_feed
+from .month_calendar import MAX_MONTHS, MAX_YEAR, MIN_YEAR, get_calendar, parse_month
+from apps.search.filters import IndexedSearchFilter
+from apps.search.index import search
 
 class ActivityViewSet(viewsets.ModelViewSet):
     """
@@ -14,9 +18,9 @@ class ActivityViewSet(viewsets.ModelViewSet):
     """
     queryset = Activity.objects.all()
     serializer_class = ActivitySerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, IndexedSearchFilter]
     search_fields = ['title', 'description']
-    ordering_fields = ['start_time', 'end_time', 'created_at', 'price']
+    ordering_fields = ['start_time', 'end_time', 'created_at']
     ordering = ['start_time']
     
     def get_permissions(self):
@@ -57,6 +61,41 @@ class ActivityViewSet(viewsets.ModelViewSet):
         """
         return super().list(request, *args, **kwargs)
     
+    @action(detail=False, methods=['get'])
+    def feed(self, request):
+        """
+        首页活动聚合：一次返回推荐、进行中、即将开始、今日活动（每类按开始时间最多 20 个），
+        传 shop_id 时额外返回该店铺的活动（shop）
+        """
+        shop_id = request.query_params.get('shop_id')
+        if shop_id is not None:
+            try:
+                shop_id = int(shop_id)
+            except ValueError:
+                return Response({"error": "shop_id 无效"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(get_feed(shop_id))
+
+    @action(detail=False, methods=['get'])
+    def calendar(self, request):
+        """
+        活动日历：month=YYYY-MM（默认本月），months 为连续月份数（最多 3），
+        可用 shop_id 筛选店铺，返回每天的活动数量和简要信息
+        """
+        month = request.query_params.get('month')
+        first_month = parse_month(month) if month else timezone.localdate()
+        if first_month is None:
+            return Response({"error": f"month 格式应为 YYYY-MM，年份在 {MIN_YEAR}–{MAX_YEAR} 之间"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            months = min(max(int(request.query_params.get('months', 1)), 1), MAX_MONTHS)
+            shop_id = request.query_params.get('shop_id')
+            shop_id = int(shop_id) if shop_id is not None else None
+        except ValueError:
+            return Response({"error": "参数无效"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'shop_id': shop_id,
+            'months': get_calendar(first_month, months, shop_id),
+        })
+
     @action(detail=False, methods=['get'])
     def featured(self, request):
         """
@@ -153,12 +192,9 @@ class ActivityViewSet(viewsets.ModelViewSet):
         date = request.query_params.get('date', None)
         activity_type = request.query_params.get('type', None)
         
-        # 关键词搜索
+        # 关键词搜索（索引）
         if search_term:
-            queryset = queryset.filter(
-                Q(title__icontains=search_term) | 
-                Q(description__icontains=search_term)
-            )
+            queryset = search(queryset, search_term)
         
         # 按店铺筛选
         if shop_id:
@@ -178,7 +214,9 @@ class ActivityViewSet(viewsets.ModelViewSet):
         
         # 只返回未结束的活动
         now = timezone.now()
-        queryset = queryset.filter(end_time__gt=now).order_by('start_time')
+        queryset = queryset.filter(end_time__gt=now)
+        if not search_term:
+            queryset = queryset.order_by('start_time')
         
         page = self.paginate_queryset(queryset)
         if page is not None:
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Cart, CartItem
+from apps.product.models import Product
 from apps.product.serializers import ProductSerializer
 
 class CartItemSerializer(serializers.ModelSerializer):
@@ -43,7 +44,6 @@ class AddToCartSerializer(serializers.Serializer):
     
     def validate_product_id(self, value):
         """验证商品是否存在且可用"""
-        from apps.product.models import Product
         try:
             product = Product.objects.get(id=value, is_available=True, status='published')
         except Product.DoesNotExist:
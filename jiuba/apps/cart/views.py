@@ -2,12 +2,18 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.db.models import Prefetch, prefetch_related_objects
 from django.shortcuts import get_object_or_404
 from .models import Cart, CartItem
 from .serializers import CartSerializer, CartItemSerializer, AddToCartSerializer, UpdateCartItemSerializer
 from apps.product.models import Product
 from apps.shop.models import Shop
 
+def _items_prefetch():
+    """序列化购物车时一次取出购物车项及其商品、分类和店铺"""
+    return Prefetch('items', queryset=CartItem.objects.select_related('product__category', 'product__shop'))
+
+
 class CartViewSet(viewsets.ModelViewSet):
     """购物车视图集"""
     serializer_class = CartSerializer
@@ -15,7 +21,7 @@ class CartViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """获取当前用户的购物车"""
-        return Cart.objects.filter(user=self.request.user)
+        return Cart.objects.filter(user=self.request.user).prefetch_related(_items_prefetch())
     
     def get_cart_for_shop(self, shop_id):
         """获取或创建指定店铺的购物车"""
@@ -66,6 +72,7 @@ class CartViewSet(viewsets.ModelViewSet):
             return Response({"error": "需要提供shop_id参数"}, status=status.HTTP_400_BAD_REQUEST)
         
         cart = self.get_cart_for_shop(shop_id)
+        prefetch_related_objects([cart], _items_prefetch())
         serializer = self.get_serializer(cart)
         return Response(serializer.data)
     
@@ -0,0 +1,77 @@
+"""
+接口基准测试数据
+
+bench_json_rendering、bench_compression 等命令在事务中调用 populate() 生成一家店铺的
+商品、订单、购物车、活动和公告，测完回滚。
+"""
+from datetime import timedelta
+
+from django.utils import timezone
+
+from apps.activity.models import Activity
+from apps.cart.models import Cart, CartItem
+from apps.notice.models import Notice
+from apps.order.models import Order, OrderItem
+from apps.product.models import Category, Product
+from apps.shop.models import Shop
+from apps.user.models import User
+
+# (名称, 路径)，路径中的 {shop} 替换为测试店铺 id
+ENDPOINTS = [
+    ('店铺列表', '/api/shop/shops/'),
+    ('商品列表', '/api/product/product/?shop={shop}'),
+    ('订单列表', '/api/orders/orders/'),
+    ('购物车', '/api/cart/carts/get_cart/?shop_id={shop}'),
+    ('活动列表', '/api/activity/feed/'),
+    ('公告列表', '/api/notice/notices/'),
+]
+
+
+def populate(rng, product_count, order_count):
+    """返回 (店铺, 用户)，用户属于该店铺，订单和购物车都在该用户名下"""
+    now = timezone.now()
+    shop = Shop.objects.create(name='基准测试店铺', address='基准路 1 号', phone='021-00000000')
+    categories = [Category.objects.create(name=f'分类{i}') for i in range(8)]
+    Product.objects.bulk_create([
+        Product(
+            shop=shop,
+            category=rng.choice(categories),
+            name=f'招牌特调 {i}',
+            description='精选基酒搭配当季水果，冰镇口感清爽' * 2,
+            price=rng.randint(1000, 30000) / 100,
+            original_price=rng.randint(30000, 40000) / 100,
+            points_price=rng.randint(100, 3000),
+            image=f'products/bench_{i}.jpg',
+            stock_quantity=rng.randint(0, 500),
+            sort_order=i,
+            status='published',
+        )
+        for i in range(product_count)
+    ])
+    products = list(Product.objects.filter(shop=shop))
+
+    user = User.objects.create(username=f'bench_{rng.randint(0, 10 ** 9)}', shop=shop)
+    for i in range(order_count):
+        order = Order.objects.create(
+            order_number=f'BENCH{rng.randint(0, 10 ** 12):012d}{i}',
+            user=user, shop=shop, payment_method='cash',
+            total_amount=rng.randint(1000, 100000) / 100,
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=product, product_name=product.name,
+                      product_price=product.price, quantity=rng.randint(1, 5))
+            for product in rng.sample(products, 4)
+        ])
+
+    cart = Cart.objects.create(user=user, shop=shop)
+    CartItem.objects.bulk_create([
+        CartItem(cart=cart, product=product, quantity=rng.randint(1, 3), price=product.price)
+        for product in rng.sample(products, 10)
+    ])
+    for i in range(20):
+        start = now + timedelta(days=i)
+        Activity.objects.create(shop=shop, title=f'周末派对 {i}', description='现场乐队与特调酒单',
+                                image=f'activities/bench_{i}.jpg',
+                                start_time=start, end_time=start + timedelta(hours=4))
+        Notice.objects.create(shop=shop, title=f'营业公告 {i}', content='本周营业时间调整为 18:00-02:00')
+    return shop, user
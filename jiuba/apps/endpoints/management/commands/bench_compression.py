@@ -0,0 +1,135 @@
+import mimetypes
+import os
+import random
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.text import compress_string
+from rest_framework.test import APIClient
+
+from apps.endpoints.benchdata import ENDPOINTS, populate
+from jiuba import compression
+
+# 除 API 外一并统计的页面和导出
+EXTRA_ENDPOINTS = [
+    ('菜单快照', '/api/shop/shops/{shop}/products/'),
+    ('订单导出', '/api/orders/orders/export/'),
+    ('后台订单页', '/merchant/orders/'),
+]
+
+ACCEPT_ENCODING = {'gzip': 'gzip', 'br': 'gzip, deflate, br'}
+
+
+class Command(BaseCommand):
+    help = (
+        '主要接口经 CompressionMiddleware 压缩后节省的字节数，以及 collectstatic 预压缩文件的大小'
+        '（数据在事务中生成，结束后回滚）'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=200)
+        parser.add_argument('--orders', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        encodings = ['gzip'] + (['br'] if compression.brotli is not None else [])
+        if compression.brotli is None:
+            self.stdout.write('未安装 brotli，只测试 gzip')
+
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            shop, user = populate(rng, options['products'], options['orders'])
+            user.is_staff = True
+            user.save(update_fields=['is_staff'])
+            client = APIClient()
+            client.force_login(user)
+
+            self.stdout.write(
+                f"{'接口':<10}{'原始字节':>10}"
+                + ''.join(f'{encoding + "字节":>12}{"节省":>8}{"压缩(µs)":>10}' for encoding in encodings)
+            )
+            totals = dict.fromkeys(['identity'] + encodings, 0)
+            for label, path in ENDPOINTS + EXTRA_ENDPOINTS:
+                sizes = self.measure(client, label, path.format(shop=shop.id), encodings)
+                for encoding, size in sizes.items():
+                    totals[encoding] += size
+            self.stdout.write(
+                f"{'合计':<10}{totals['identity']:>10}"
+                + ''.join(
+                    f'{totals[encoding]:>12}{1 - totals[encoding] / totals["identity"]:>8.0%}{"":>10}'
+                    for encoding in encodings
+                )
+            )
+            transaction.set_rollback(True)
+
+        self.report_static()
+
+    def fetch(self, client, path, accept_encoding):
+        response = client.get(path, HTTP_ACCEPT_ENCODING=accept_encoding)
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, content
+
+    def compress_cpu_us(self, content, encoding, repeat=20):
+        if encoding == 'br':
+            compress = compression.compress_brotli
+        else:
+            def compress(data):
+                return compress_string(data, max_random_bytes=compression.MAX_RANDOM_BYTES)
+        started = time.process_time()
+        for _ in range(repeat):
+            compress(content)
+        return (time.process_time() - started) * 1e6 / repeat
+
+    def measure(self, client, label, path, encodings):
+        response, original = self.fetch(client, path, 'identity')
+        if response.status_code != 200:
+            self.stdout.write(f'{label:<10}{path} 返回 {response.status_code}，跳过')
+            return {}
+        sizes = {'identity': len(original)}
+        columns = []
+        for encoding in encodings:
+            # 与浏览器一样同时接受 gzip，HTML 页面此时返回 gzip
+            response, content = self.fetch(client, path, ACCEPT_ENCODING[encoding])
+            used = response.get('Content-Encoding')
+            if used:
+                sizes[encoding] = len(content)
+                columns.append(
+                    f'{len(content):>12}{1 - len(content) / sizes["identity"]:>8.0%}'
+                    f'{self.compress_cpu_us(original, used):>10.0f}'
+                    + ('' if used == encoding else f'({used})')
+                )
+            else:
+                # 低于 COMPRESSION_MIN_SIZE
+                sizes[encoding] = sizes['identity']
+                columns.append(f'{"未压缩":>12}{"":>8}{"":>10}')
+        self.stdout.write(f'{label:<10}{sizes["identity"]:>10}' + ''.join(columns))
+        return sizes
+
+    def report_static(self):
+        """统计 collectstatic 生成的预压缩文件，需先执行 collectstatic"""
+        root = settings.STATIC_ROOT
+        if not root or not os.path.isdir(root):
+            self.stdout.write('\n未找到 STATIC_ROOT，先执行 collectstatic 以统计静态文件预压缩效果')
+            return
+        totals = {'files': 0, 'identity': 0, 'gz': 0, 'br': 0}
+        for directory, _, filenames in os.walk(root):
+            names = set(filenames)
+            for name in filenames:
+                content_type = mimetypes.guess_type(name)[0]
+                if name.endswith(('.gz', '.br')) or not content_type or not compression.is_compressible(content_type):
+                    continue
+                size = os.path.getsize(os.path.join(directory, name))
+                totals['files'] += 1
+                totals['identity'] += size
+                for suffix in ('gz', 'br'):
+                    variant = f'{name}.{suffix}'
+                    totals[suffix] += os.path.getsize(os.path.join(directory, variant)) if variant in names else size
+        if not totals['identity']:
+            return
+        self.stdout.write(
+            f"\n静态文件（{totals['files']} 个文本文件）：原始 {totals['identity']} 字节，"
+            f"gzip {totals['gz']}（节省 {1 - totals['gz'] / totals['identity']:.0%}），"
+            f"brotli {totals['br']}（节省 {1 - totals['br'] / totals['identity']:.0%}）"
+        )
@@ -0,0 +1,82 @@
+import itertools
+import time
+import urllib.request
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from jiuba.loadtest import (
+    REQUEST_ERRORS, gunicorn_server, memory_usage, percentile, run_concurrent, worker_shape,
+)
+
+DEFAULT_PATHS = [
+    '/api/shop/shops/',
+    '/api/product/product/',
+    '/api/activity/feed/',
+    '/api/notice/notices/',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        '对比 gunicorn.conf.py 中各运行方案的吞吐与内存：依次启动服务，并发请求主要接口，'
+        '统计每秒请求数、延迟以及压测后全部进程的 RSS / PSS（需要安装 gunicorn，ASGI 方案需要 uvicorn）'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', default='sync,gthread,asgi,lowmem', help='要测试的方案，逗号分隔')
+        parser.add_argument('--requests', type=int, default=2000, help='每个方案的请求数')
+        parser.add_argument('--concurrency', type=int, default=32, help='并发客户端数')
+        parser.add_argument('--workers', type=int, help='覆盖方案的 worker 数（默认按 CPU 计算）')
+        parser.add_argument('--path', action='append', dest='paths', help='压测路径，可重复，默认为主要列表接口')
+        parser.add_argument('--compare-preload', action='store_true', help='每个方案再以 GUNICORN_PRELOAD=0 运行一次')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or DEFAULT_PATHS
+        runs = [(profile.strip(), True) for profile in options['profiles'].split(',') if profile.strip()]
+        if options['compare_preload']:
+            runs = [(profile, preload) for profile, _ in runs for preload in (True, False)]
+
+        self.stdout.write(f"{options['requests']} 个请求，{options['concurrency']} 并发，路径：{', '.join(paths)}")
+        self.stdout.write(
+            f"{'方案':<16}{'进程':>6}{'线程':>6}{'每秒':>10}{'P50(ms)':>10}{'P95(ms)':>10}"
+            f"{'失败':>6}{'RSS(MB)':>10}{'PSS(MB)':>10}{'每秒/100MB':>12}"
+        )
+        for profile, preload in runs:
+            label = profile if preload else f'{profile}/无预加载'
+            try:
+                self.measure(label, profile, preload, paths, options)
+            except RuntimeError as e:
+                raise CommandError(f'{label}: {e}')
+
+    def measure(self, label, profile, preload, paths, options):
+        env = {} if preload else {'GUNICORN_PRELOAD': '0'}
+        with gunicorn_server(profile, options['workers'], env) as (base_url, process):
+            # 预热：每个 worker 完成导入和首次查询
+            for path in paths * 4:
+                self.fetch(base_url + path)
+            urls = [base_url + path for path in itertools.islice(itertools.cycle(paths), options['requests'])]
+            results, elapsed = run_concurrent(self.fetch, urls, options['concurrency'])
+            rss, pss = memory_usage(process.pid)
+            workers, threads = worker_shape(process.pid)
+
+        outcomes = Counter(ok for ok, _ in results)
+        latencies = [latency for ok, latency in results if ok]
+        pss_mb = pss / 1024 / 1024
+        rate = outcomes[True] / elapsed
+        self.stdout.write(
+            f"{label:<16}{workers:>6}{threads:>6}{rate:>10.1f}"
+            f"{percentile(latencies, 0.5) * 1000:>10.1f}{percentile(latencies, 0.95) * 1000:>10.1f}"
+            f"{outcomes[False]:>6}{rss / 1024 / 1024:>10.1f}{pss_mb:>10.1f}"
+            f"{rate / pss_mb * 100 if pss_mb else 0:>12.1f}"
+        )
+
+    def fetch(self, url):
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url, timeout=30) as response:
+                response.read()
+                ok = response.status == 200
+        except REQUEST_ERRORS:
+            ok = False
+        return ok, time.perf_counter() - started
@@ -0,0 +1,65 @@
+import random
+import time
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from apps.endpoints.benchdata import ENDPOINTS, populate
+from jiuba.parsers import ORJSONParser
+from jiuba.renderers import ORJSONRenderer
+
+
+class Command(BaseCommand):
+    help = (
+        '主要接口的 JSON 渲染 / 解析 CPU 耗时对比：DRF JSONRenderer / JSONParser vs orjson'
+        '（数据在事务中生成，结束后回滚）'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=200)
+        parser.add_argument('--orders', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            shop, user = populate(rng, options['products'], options['orders'])
+            client = APIClient()
+            client.force_authenticate(user)
+            self.stdout.write(
+                f"{'接口':<10}{'字节':>10}{'完整请求(µs)':>16}{'DRF渲染(µs)':>14}{'orjson(µs)':>13}{'加速':>7}"
+                f"{'DRF解析(µs)':>14}{'orjson(µs)':>13}{'加速':>7}"
+            )
+            for label, path in ENDPOINTS:
+                self.measure(client, label, path.format(shop=shop.id), options['repeat'])
+            transaction.set_rollback(True)
+
+    def cpu_us(self, repeat, func):
+        started = time.process_time()
+        for _ in range(repeat):
+            result = func()
+        return (time.process_time() - started) * 1e6 / repeat, result
+
+    def measure(self, client, label, path, repeat):
+        response = client.get(path)
+        if response.status_code != 200:
+            self.stdout.write(f'{label:<10}{path} 返回 {response.status_code}，跳过')
+            return
+        data = response.data
+        # 完整请求只跑少量次数，作为渲染耗时所占比例的参照
+        request_us, _ = self.cpu_us(max(repeat // 10, 1), lambda: client.get(path))
+        drf_us, drf_body = self.cpu_us(repeat, lambda: JSONRenderer().render(data))
+        fast_us, body = self.cpu_us(repeat, lambda: ORJSONRenderer().render(data))
+        parser_context = {'encoding': 'utf-8'}
+        drf_parse_us, _ = self.cpu_us(repeat, lambda: JSONParser().parse(BytesIO(drf_body), None, parser_context))
+        fast_parse_us, _ = self.cpu_us(repeat, lambda: ORJSONParser().parse(BytesIO(body), None, parser_context))
+        self.stdout.write(
+            f'{label:<10}{len(body):>10}{request_us:>16.0f}{drf_us:>14.0f}{fast_us:>13.0f}{drf_us / fast_us:>6.1f}x'
+            f'{drf_parse_us:>14.0f}{fast_parse_us:>13.0f}{drf_parse_us / fast_parse_us:>6.1f}x'
+            + ('' if body == drf_body else '  （输出与 DRF 不同）')
+        )
@@ -0,0 +1,114 @@
+import subprocess
+import sys
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.activity.feed import invalidate_feed
+from apps.activity.month_calendar import invalidate_calendar
+from apps.endpoints.seeding import ShopGenerator, base_day, ensure_categories, username_prefix
+from apps.user.models import User
+
+# 透传给子进程的参数
+FORWARDED_OPTIONS = [
+    'shops', 'start', 'products', 'customers', 'orders', 'max_items', 'activities', 'notices', 'days',
+    'seed', 'batch_size',
+]
+
+
+def parse_shard(value):
+    try:
+        shard, total = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise CommandError('--shard 格式为 K/N，例如 0/4')
+    if not 0 <= shard < total:
+        raise CommandError('--shard 要求 0 <= K < N')
+    return shard, total
+
+
+class Command(BaseCommand):
+    help = (
+        '生成性能测试基线数据：店铺、商品、顾客、订单及订单项、活动、预约、公告和搜索索引。'
+        '同一 --seed 生成的数据相同；--workers 启动多个进程按店铺分片并行写入，'
+        '也可以在多台机器上分别用 --shard K/N 运行。已生成的店铺会跳过，中断后重新执行即可续跑。'
+        '默认规模：2000 家店铺、20 万商品、100 万订单（约 300 万订单项）、约 60 万预约'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shops', type=int, default=2000)
+        parser.add_argument('--start', type=int, default=0, help='第一家店铺的序号，用于在已有数据后追加')
+        parser.add_argument('--products', type=int, default=100, help='每家店铺的商品数')
+        parser.add_argument('--customers', type=int, default=100, help='每家店铺的顾客数')
+        parser.add_argument('--orders', type=int, default=500, help='每家店铺的订单数')
+        parser.add_argument('--max-items', type=int, default=5, help='每个订单最多的商品种数')
+        parser.add_argument('--activities', type=int, default=10, help='每家店铺的活动数')
+        parser.add_argument('--notices', type=int, default=3, help='每家店铺最多的公告数')
+        parser.add_argument('--days', type=int, default=180, help='订单和活动分布在最近多少天内')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=1, help='并行写入的进程数')
+        parser.add_argument('--shard', help='只生成第 K 个分片（共 N 个）的店铺，格式 K/N')
+        parser.add_argument('--no-search-index', dest='search_index', action='store_false',
+                            help='不写搜索索引（之后可执行 rebuild_search_index）')
+
+    def handle(self, *args, **options):
+        if options['workers'] > 1 and not options['shard']:
+            return self.run_workers(options)
+        shard, total = parse_shard(options['shard']) if options['shard'] else (0, 1)
+        self.run_shard(options, shard, total)
+
+    def run_workers(self, options):
+        if connection.vendor == 'sqlite':
+            self.stdout.write('SQLite 同一时间只有一个写事务，多进程只能并行生成数据，写入仍是串行的')
+        # 分类为各店铺共用，先建好，避免子进程同时创建
+        ensure_categories()
+        started = time.perf_counter()
+        arguments = [f"--{name.replace('_', '-')}={options[name]}" for name in FORWARDED_OPTIONS]
+        if not options['search_index']:
+            arguments.append('--no-search-index')
+        processes = [
+            subprocess.Popen(
+                [sys.executable, 'manage.py', 'seed_benchmark_data', *arguments,
+                 f"--shard={shard}/{options['workers']}"],
+                cwd=settings.BASE_DIR,
+            )
+            for shard in range(options['workers'])
+        ]
+        failed = [process.args[-1] for process in processes if process.wait() != 0]
+        if failed:
+            raise CommandError(f"分片 {', '.join(failed)} 失败，重新执行同样的命令即可继续生成剩余店铺")
+        self.stdout.write(f'全部完成，用时 {time.perf_counter() - started:.1f} 秒')
+
+    def run_shard(self, options, shard, total):
+        label = f'分片 {shard}/{total}'
+        indices = [i for i in range(options['start'], options['start'] + options['shops']) if i % total == shard]
+        # 商家账号与店铺在同一事务中写入，存在即说明该店铺已完整生成
+        prefix = username_prefix(options['seed'])
+        done = set(User.objects.filter(
+            username__in=[f'{prefix}{i}_staff' for i in indices]
+        ).values_list('username', flat=True))
+        pending = [i for i in indices if f'{prefix}{i}_staff' not in done]
+        if done:
+            self.stdout.write(f'{label}：跳过已生成的 {len(done)} 家店铺')
+
+        generator = ShopGenerator(options['seed'], options, ensure_categories(), base_day())
+        counts = Counter()
+        started = time.perf_counter()
+        report_every = max(1, len(pending) // 20)
+        for position, index in enumerate(pending, 1):
+            counts.update(generator.generate(index))
+            if position % report_every == 0 or position == len(pending):
+                elapsed = time.perf_counter() - started
+                rows = sum(counts.values())
+                self.stdout.write(
+                    f'{label}：{position}/{len(pending)} 家店铺，{rows} 行，'
+                    f'{elapsed:.1f} 秒，{rows / elapsed:.0f} 行/秒'
+                )
+        if counts:
+            # bulk_create 不触发信号，新活动需要清除首页聚合和日历缓存后才能看到
+            invalidate_feed()
+            invalidate_calendar()
+            self.stdout.write(f'{label} 完成：' + '，'.join(f'{name} {count}' for name, count in counts.items()))
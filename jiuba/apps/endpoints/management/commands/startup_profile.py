@@ -0,0 +1,50 @@
+import statistics
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+from jiuba.startup import PHASES, budget, cold_start_seconds, excluded_imports, measure_cold_start
+
+
+class Command(BaseCommand):
+    help = (
+        '冷启动分析：在新进程中测量导入配置、django.setup()、加载中间件和第一个请求的耗时，'
+        '并按 python -X importtime 列出导入最慢的模块和包'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/', help='第一个请求的路径')
+        parser.add_argument('--repeat', type=int, default=3, help='重复次数，取中位数')
+        parser.add_argument('--top', type=int, default=20, help='列出导入最慢的模块数量')
+
+    def handle(self, *args, **options):
+        try:
+            runs = [measure_cold_start(options['path']) for _ in range(options['repeat'])]
+            profiled = measure_cold_start(options['path'], importtime=True)
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f"第一个请求 {options['path']}: {runs[0]['status']}（{options['repeat']} 次取中位数）")
+        for name, label in PHASES:
+            median = statistics.median(run['phases'][name] for run in runs)
+            self.stdout.write(f'  {label:<20}{median * 1000:>10.1f} ms')
+        total = statistics.median(cold_start_seconds(run) for run in runs)
+        process = statistics.median(run['process'] for run in runs)
+        self.stdout.write(f"  {'合计':<20}{total * 1000:>10.1f} ms（预算 {budget() * 1000:.0f} ms）")
+        self.stdout.write(f"  {'进程总用时':<20}{process * 1000:>10.1f} ms（含解释器启动）")
+        excluded = excluded_imports(runs[0])
+        if excluded:
+            self.stdout.write(self.style.WARNING(f"冷启动导入了不应加载的模块：{', '.join(excluded)}"))
+
+        imports = profiled['imports']
+        self.stdout.write(f"\n导入最慢的模块（累计，-X importtime）：")
+        for record in sorted(imports, key=lambda r: r.cumulative_us, reverse=True)[:options['top']]:
+            self.stdout.write(f'  {record.cumulative_us / 1000:>8.1f} ms  {record.module}')
+
+        # 按顶层包汇总自身耗时，定位哪些依赖拖慢启动
+        packages = defaultdict(int)
+        for record in imports:
+            packages[record.module.split('.')[0]] += record.self_us
+        self.stdout.write(f"\n按顶层包汇总（自身耗时）：")
+        for package, self_us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:options['top']]:
+            self.stdout.write(f'  {self_us / 1000:>8.1f} ms  {package}')
@@ -0,0 +1,265 @@
+"""
+性能测试基线数据
+
+seed_benchmark_data 命令按店铺生成数据：第 i 家店铺的商品、顾客、订单、活动、预约、公告
+只取决于 (seed, i)，每家店铺使用独立的随机数生成器，因此无论分几个进程、每个进程分到哪些店铺，
+同一 seed 生成的内容都相同（时间以生成当天零点为基准）。
+
+每家店铺在一个事务中用 bulk_create 分批写入，不触发 post_save 信号：
+搜索索引、活动已占用名额（confirmed_count）由这里直接写入，与逐条创建时的结果一致；
+图片只写文件名、不生成文件，首页活动聚合和日历缓存由命令在结束时清除。
+"""
+import random
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.db import transaction
+from django.utils import timezone
+
+from apps.activity.models import Activity
+from apps.notice.models import Notice
+from apps.order.models import Order, OrderItem
+from apps.product.models import Category, Product
+from apps.reservations.capacity import HOLDING_STATUSES
+from apps.reservations.models import Reservation
+from apps.search.index import build_terms
+from apps.search.models import SearchTerm
+from apps.shop.models import Shop
+from apps.user.models import User
+
+# 分类名称与价格区间（分）
+CATEGORIES = {
+    '精酿啤酒': (2800, 6800),
+    '鸡尾酒': (4800, 12800),
+    '威士忌': (6800, 38800),
+    '葡萄酒': (19800, 88800),
+    '果酒': (3800, 9800),
+    '无酒精饮品': (1800, 3800),
+    '小食': (1800, 6800),
+    '套餐': (16800, 68800),
+}
+BRANDS = ['微醺', '夜航', '拾光', '半山', '老巷', '长岛', '雾港', '月台', '栖木', '北纬']
+DISTRICTS = ['静安', '徐汇', '黄浦', '长宁', '浦东', '虹口', '杨浦', '普陀', '闵行', '宝山']
+PRODUCT_WORDS = [
+    '招牌', '经典', '限定', '冰镇', '特调', '醇香', '果味', '烟熏', '清爽', '浓郁',
+    '柚子', '青柠', '蜜桃', '椰香', '乌龙', '桂花', '海盐', '黑糖', '薄荷', '莓果',
+]
+ACTIVITY_TITLES = ['周末派对', '乐队现场', '品鉴会', '调酒课', '球赛直播', '主题之夜', '脱口秀', '爵士之夜']
+NOTICE_TITLES = ['营业时间调整', '新品上市', '会员积分活动', '节假日安排', '停车指引']
+
+# 订单按小时分布：傍晚到凌晨是高峰
+HOUR_WEIGHTS = [6, 4, 2, 1, 0, 0, 0, 0, 0, 0, 0, 1, 2, 2, 2, 2, 3, 5, 8, 10, 12, 12, 11, 9]
+
+
+def shop_rng(seed, index):
+    """第 index 家店铺的随机数生成器，与进程划分无关"""
+    return random.Random(f'{seed}:{index}')
+
+
+def username_prefix(seed):
+    return f'bm{seed}_'
+
+
+def ensure_categories():
+    """分类为各店铺共用，多进程生成前由主进程先建好"""
+    existing = {category.name: category for category in Category.objects.filter(name__in=CATEGORIES)}
+    missing = [Category(name=name) for name in CATEGORIES if name not in existing]
+    if missing:
+        Category.objects.bulk_create(missing)
+        existing = {category.name: category for category in Category.objects.filter(name__in=CATEGORIES)}
+    return existing
+
+
+def _money(cents):
+    return Decimal(cents) / 100
+
+
+def _moment(rng, day):
+    """day 当天按 HOUR_WEIGHTS 随机取一个时间"""
+    hour = rng.choices(range(24), HOUR_WEIGHTS)[0]
+    return day + timedelta(hours=hour, minutes=rng.randrange(60), seconds=rng.randrange(60))
+
+
+def _insert(model, objects, batch_size, queryset):
+    """
+    bulk_create 并保证对象带上主键：数据库不支持批量插入返回主键时（MySQL），
+    按主键顺序从 queryset（本店铺刚插入的全部行）取回。
+    """
+    model.objects.bulk_create(objects, batch_size=batch_size)
+    if objects and objects[0].pk is None:
+        for obj, pk in zip(objects, queryset.order_by('pk').values_list('pk', flat=True)):
+            obj.pk = pk
+    return objects
+
+
+class ShopGenerator:
+    """生成一家店铺的全部数据，返回各表写入的行数"""
+
+    def __init__(self, seed, options, categories, base_day):
+        self.seed = seed
+        self.options = options
+        self.categories = categories
+        self.base_day = base_day
+        self.batch_size = options['batch_size']
+
+    def generate(self, index):
+        rng = shop_rng(self.seed, index)
+        counts = {}
+        with transaction.atomic():
+            shop = Shop(
+                name=f'{rng.choice(BRANDS)}酒馆·{rng.choice(DISTRICTS)}{index}号店',
+                address=f'{rng.choice(DISTRICTS)}区{rng.choice(BRANDS)}路 {rng.randint(1, 999)} 号',
+                phone=f'021-{rng.randint(10000000, 99999999)}',
+                description='精酿、鸡尾酒与现场音乐',
+                logo=f'shop_logos/bench_{index}.jpg',
+                is_active=rng.random() > 0.05,
+            )
+            _insert(Shop, [shop], self.batch_size, Shop.objects.filter(name=shop.name, phone=shop.phone))
+            counts['shops'] = 1
+            products = self.products(rng, shop, index)
+            customers = self.customers(rng, shop, index)
+            counts['products'] = len(products)
+            counts['users'] = len(customers) + 1
+            counts['orders'], counts['order_items'] = self.orders(rng, shop, index, products, customers)
+            activities, counts['reservations'] = self.activities(rng, shop, index, customers)
+            counts['activities'] = len(activities)
+            notices = self.notices(rng, shop)
+            counts['notices'] = len(notices)
+            if self.options['search_index']:
+                counts['search_terms'] = self.index([shop], products, activities, notices)
+        return counts
+
+    def products(self, rng, shop, index):
+        names = list(self.categories)
+        products = []
+        for i in range(self.options['products']):
+            category = rng.choice(names)
+            low, high = CATEGORIES[category]
+            price = rng.randint(low, high) // 100 * 100
+            products.append(Product(
+                shop=shop,
+                category=self.categories[category],
+                name=f'{rng.choice(PRODUCT_WORDS)}{rng.choice(PRODUCT_WORDS)}{category}',
+                description=f'{rng.choice(PRODUCT_WORDS)}风味，{rng.choice(PRODUCT_WORDS)}口感',
+                price=_money(price),
+                original_price=_money(price * rng.choice([1, 1, 1, 12, 15]) // 10),
+                points_price=price // 10 if rng.random() < 0.3 else 0,
+                image=f'products/bench_{index}_{i}.jpg',
+                is_available=rng.random() > 0.05,
+                status='published' if rng.random() > 0.1 else 'draft',
+                stock_quantity=rng.randint(0, 500),
+                sort_order=i,
+            ))
+        return _insert(Product, products, self.batch_size, Product.objects.filter(shop=shop))
+
+    def customers(self, rng, shop, index):
+        """顾客之外再建一个该店铺的商家账号（bm<seed>_<店铺序号>_staff），便于登录后台压测"""
+        prefix = f'{username_prefix(self.seed)}{index}_'
+        password = UNUSABLE_PASSWORD_PREFIX
+        users = [
+            User(username=f'{prefix}{i}', password=password, phone=f'1{rng.randint(3000000000, 9999999999)}',
+                 points=rng.randint(0, 5000))
+            for i in range(self.options['customers'])
+        ]
+        users.append(User(username=f'{prefix}staff', password=password, shop=shop, is_staff=True))
+        _insert(User, users, self.batch_size, User.objects.filter(username__in=[user.username for user in users]))
+        return users[:-1]
+
+    def orders(self, rng, shop, index, products, customers):
+        if not customers or not products:
+            return 0, 0
+        # 少数商品卖得最多（近似 Zipf 分布），顾客的下单频率也不均匀
+        ranked = rng.sample(products, len(products))
+        product_weights = list(accumulate(1 / (rank + 1) for rank in range(len(ranked))))
+        customer_weights = list(accumulate(rng.paretovariate(1.5) for _ in customers))
+        days = self.options['days']
+
+        orders, lines = [], []
+        for i in range(self.options['orders']):
+            day = self.base_day - timedelta(days=rng.randrange(days))
+            created_at = _moment(rng, day)
+            by_points = rng.random() < 0.15
+            picked = {}
+            quantity_kinds = rng.randint(1, self.options['max_items'])
+            for product in rng.choices(ranked, cum_weights=product_weights, k=quantity_kinds):
+                picked[product] = picked.get(product, 0) + rng.randint(1, 3)
+            total_amount = sum(product.price * quantity for product, quantity in picked.items())
+            total_points = sum(product.points_price * quantity for product, quantity in picked.items())
+            orders.append(Order(
+                order_number=f'BM{self.seed}-{index}-{i}',
+                user=rng.choices(customers, cum_weights=customer_weights)[0],
+                shop=shop,
+                payment_method='points' if by_points else 'cash',
+                total_amount=0 if by_points else total_amount,
+                total_points=total_points if by_points else 0,
+                paid_at=created_at + timedelta(seconds=rng.randint(5, 120)),
+                transaction_id='' if by_points else f'42000{rng.randrange(10 ** 20):020d}',
+                created_at=created_at,
+                customer_notes=rng.choice(['', '', '', '少冰', '不要柠檬', '靠窗座位']),
+            ))
+            lines.append(picked)
+
+        _insert(Order, orders, self.batch_size, Order.objects.filter(shop=shop))
+        items = [
+            OrderItem(order=order, product=product, product_name=product.name, product_price=product.price,
+                      product_points_price=product.points_price, quantity=quantity)
+            for order, picked in zip(orders, lines)
+            for product, quantity in picked.items()
+        ]
+        OrderItem.objects.bulk_create(items, batch_size=self.batch_size)
+        return len(orders), len(items)
+
+    def activities(self, rng, shop, index, customers):
+        """过去的活动预约为已完成 / 已取消，未开始的为已确认 / 已取消；confirmed_count 与预约一致"""
+        activities, plans = [], []
+        now = timezone.now()
+        for i in range(self.options['activities']):
+            day = self.base_day + timedelta(days=rng.randint(-self.options['days'], 30))
+            start = day + timedelta(hours=rng.choice([19, 20, 21]))
+            capacity = rng.choice([None, 20, 30, 50, 80, 120])
+            wanted = rng.randint(0, min(capacity or 150, len(customers)))
+            holding = 'completed' if start < now else 'confirmed'
+            statuses = [holding if rng.random() > 0.15 else 'cancelled' for _ in range(wanted)]
+            activity = Activity(
+                shop=shop,
+                title=f'{rng.choice(ACTIVITY_TITLES)} 第{i + 1}期',
+                description='现场乐队与特调酒单，限时优惠',
+                image=f'activities/bench_{index}_{i}.jpg',
+                is_featured=rng.random() < 0.1,
+                start_time=start,
+                end_time=start + timedelta(hours=rng.choice([2, 3, 4])),
+                max_participants=capacity,
+                confirmed_count=sum(status in HOLDING_STATUSES for status in statuses),
+            )
+            activities.append(activity)
+            plans.append((rng.sample(customers, wanted), statuses))
+
+        _insert(Activity, activities, self.batch_size, Activity.objects.filter(shop=shop))
+        reservations = [
+            Reservation(user=user, activity=activity, shop=shop, contact_phone=user.phone, status=status)
+            for activity, (users, statuses) in zip(activities, plans)
+            for user, status in zip(users, statuses)
+        ]
+        Reservation.objects.bulk_create(reservations, batch_size=self.batch_size)
+        return activities, len(reservations)
+
+    def notices(self, rng, shop):
+        notices = [
+            Notice(shop=shop, title=title, content=f'{title}：详情请咨询店员', is_active=rng.random() > 0.2)
+            for title in rng.sample(NOTICE_TITLES, rng.randint(0, min(self.options['notices'], len(NOTICE_TITLES))))
+        ]
+        return _insert(Notice, notices, self.batch_size, Notice.objects.filter(shop=shop))
+
+    def index(self, *groups):
+        """与 post_save 信号写入的索引相同"""
+        terms = [term for group in groups for instance in group for term in build_terms(instance)]
+        SearchTerm.objects.bulk_create(terms, batch_size=self.batch_size)
+        return len(terms)
+
+
+def base_day():
+    """时间基准：生成当天零点（当前时区）"""
+    return timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+
@@ -0,0 +1,10 @@
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from jiuba.metrics import track_connection
+
+
+@receiver(connection_created)
+def count_connection(sender, connection, **kwargs):
+    """新建数据库连接计入 Prometheus 指标"""
+    track_connection(connection)
@@ -1,3 +1,375 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import decimal
+import gzip
+import json
+import random
+import statistics
+import uuid
+import zlib
+from io import BytesIO, StringIO
 
-# Create your tests here.
+import brotli
+from django.core.management import call_command
+from django.db.models import F, Sum
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import AsyncClient, Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from prometheus_client import REGISTRY
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from apps.activity.models import Activity
+from apps.endpoints.benchdata import ENDPOINTS, populate
+from apps.order.models import Order
+from apps.product.models import Category, Product
+from apps.product.serializers import ProductSerializer
+from apps.reservations.capacity import HOLDING_STATUSES
+from apps.reservations.models import Reservation
+from apps.search.index import search
+from apps.shop.models import Shop
+from apps.user.models import User
+from jiuba.compression import CompressionMiddleware
+from jiuba.nplusone import NPlusOneDetector, NPlusOneError, NPlusOneMiddleware, NPlusOneTestMixin, fingerprint
+from jiuba.parsers import ORJSONParser
+from jiuba.renderers import ORJSONRenderer
+from jiuba.startup import budget, cold_start_seconds, excluded_imports, measure_cold_start
+
+
+class ColdStartTests(SimpleTestCase):
+    """
+    冷启动（导入配置 + django.setup() + 第一个请求）：超出预算时失败，防止启动耗时回退；
+    启动过程不打印、不修改 sys.path，也不导入 EXCLUDED_MODULES
+    """
+    # 取多次运行的中位数，避免偶发的机器负载（和第一次运行编译 .pyc）造成误报
+    runs = 3
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.results = [measure_cold_start('/') for _ in range(cls.runs)]
+
+    def test_cold_start_within_budget(self):
+        for result in self.results:
+            self.assertEqual(result['status'], '200 OK')
+        elapsed = statistics.median(cold_start_seconds(result) for result in self.results)
+        self.assertLess(
+            elapsed, budget(),
+            f'冷启动 {elapsed * 1000:.0f} ms（{self.runs} 次中位数）超出预算 {budget() * 1000:.0f} ms，'
+            f'用 python manage.py startup_profile 查看各阶段和导入耗时，CI 机器较慢时可设置 STARTUP_BUDGET_SECONDS',
+        )
+
+    def test_startup_has_no_side_effects(self):
+        result = self.results[0]
+        self.assertEqual(result['output'], '')
+        self.assertFalse(result['sys_path_changed'])
+
+    def test_excluded_modules_not_imported(self):
+        result = self.results[0]
+        self.assertIn('django', result['modules'])
+        self.assertEqual(excluded_imports(result), [])
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    """orjson 渲染结果需与 DRF JSONRenderer 逐字节一致，客户端无感知"""
+
+    def test_matches_drf_renderer(self):
+        data = {
+            'name': '招牌特调\u2028', 'price': decimal.Decimal('12.30'), 'paid_at': timezone.now(),
+            'date': datetime.date(2024, 1, 1), 'uuid': uuid.uuid4(), 1: [1.5, None, True],
+            'duration': datetime.timedelta(minutes=5),
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        # 超出 64 位的整数退回标准库
+        self.assertEqual(ORJSONRenderer().render({'big': 2 ** 70}), JSONRenderer().render({'big': 2 ** 70}))
+
+    def test_image_field(self):
+        product = Product(image='products/a.jpg')
+        self.assertEqual(ORJSONRenderer().render({'image': product.image}), b'{"image":"/media/products/a.jpg"}')
+        self.assertEqual(ORJSONRenderer().render({'image': Product().image}), b'{"image":null}')
+
+    def test_indent_uses_drf_renderer(self):
+        self.assertEqual(ORJSONRenderer().render({'a': 1}, 'application/json; indent=2'), b'{\n  "a": 1\n}')
+
+    def test_parser(self):
+        context = {'encoding': 'utf-8'}
+        self.assertEqual(ORJSONParser().parse(BytesIO('{"a":"中"}'.encode()), None, context), {'a': '中'})
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(BytesIO(b'{bad'), None, context)
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    body = b'{"name":"\xe6\x8b\x9b\xe7\x89\x8c\xe7\x89\xb9\xe8\xb0\x83"}' * 200
+
+    def process(self, response, accept_encoding='gzip, deflate, br'):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_brotli_preferred(self):
+        response = self.process(HttpResponse(self.body, content_type='application/json'))
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(brotli.decompress(response.content), self.body)
+
+    def test_gzip(self):
+        response = self.process(HttpResponse(self.body, content_type='application/json'), 'gzip, br;q=0')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), self.body)
+
+    def test_html_uses_gzip(self):
+        response = self.process(HttpResponse(self.body, content_type='text/html; charset=utf-8'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    def test_skipped(self):
+        cases = [
+            HttpResponse(b'{}', content_type='application/json'),
+            HttpResponse(self.body, content_type='image/png'),
+            StreamingHttpResponse(iter([self.body]), content_type='text/event-stream'),
+        ]
+        for response in cases:
+            self.assertFalse(self.process(response).has_header('Content-Encoding'))
+        response = self.process(HttpResponse(self.body, content_type='application/json'), 'identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_strong_etag_made_weak(self):
+        response = HttpResponse(self.body, content_type='application/json')
+        response['ETag'] = '"abc"'
+        self.assertEqual(self.process(response)['ETag'], 'W/"abc"')
+
+    def test_streaming(self):
+        chunks = [self.body] * 10
+        for encoding, decompress in (('br', brotli.decompress), ('gzip', gzip.decompress)):
+            response = self.process(StreamingHttpResponse(iter(chunks), content_type='text/csv'), encoding)
+            self.assertEqual(response['Content-Encoding'], encoding)
+            self.assertFalse(response.has_header('Content-Length'))
+            self.assertEqual(decompress(b''.join(response.streaming_content)), b''.join(chunks))
+
+    def test_async_streaming(self):
+        async def chunks():
+            for _ in range(3):
+                yield self.body
+
+        async def consume(response):
+            return b''.join([chunk async for chunk in response.streaming_content])
+
+        for encoding, decompress in (('br', brotli.decompress), ('gzip', gzip.decompress)):
+            response = self.process(StreamingHttpResponse(chunks(), content_type='application/x-ndjson'), encoding)
+            self.assertEqual(decompress(asyncio.run(consume(response))), self.body * 3)
+
+    def test_async_gzip_single_member(self):
+        """整个响应是一个 gzip 成员，且每块之后都能解压出已发送的内容"""
+        async def chunks():
+            for _ in range(3):
+                yield self.body
+
+        async def consume(response):
+            return [chunk async for chunk in response.streaming_content]
+
+        response = self.process(StreamingHttpResponse(chunks(), content_type='text/csv'), 'gzip')
+        parts = asyncio.run(consume(response))
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        self.assertEqual(decompressor.decompress(parts[0]), self.body)
+        self.assertEqual(decompressor.decompress(b''.join(parts[1:])), self.body * 2)
+        self.assertTrue(decompressor.eof)
+        self.assertEqual(decompressor.unused_data, b'')
+
+
+class RequestMetricsMiddlewareTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Shop.objects.create(name='统计测试店铺')
+
+    def test_server_timing_and_log(self):
+        with self.assertLogs('jiuba.requests', 'INFO') as logs:
+            response = Client().get('/api/shop/shops/')
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="[1-9]\d* queries", app;dur=[\d.]+$')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(logs.records[0].levelname, 'INFO')
+        self.assertEqual(record['view'], 'shop-list')
+        self.assertEqual(record['status'], 200)
+        self.assertEqual(record['size'], len(response.content))
+        self.assertGreater(record['queries'], 0)
+        self.assertEqual(record['flags'], [])
+
+    @override_settings(MAX_REQUEST_QUERIES=0, SLOW_REQUEST_MS=0)
+    def test_thresholds(self):
+        with self.assertLogs('jiuba.requests', 'WARNING') as logs:
+            Client().get('/api/shop/shops/')
+        self.assertEqual(json.loads(logs.records[0].getMessage())['flags'], ['slow', 'queries'])
+
+    @override_settings(REQUEST_METRICS_ENABLED=False)
+    def test_disabled(self):
+        self.assertFalse(Client().get('/api/shop/shops/').has_header('Server-Timing'))
+
+    async def test_asgi_counts_queries(self):
+        response = await AsyncClient().get('/api/shop/shops/')
+        self.assertRegex(response['Server-Timing'], r'desc="[1-9]\d* queries"')
+
+
+class PrometheusMetricsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Shop.objects.create(name='指标测试店铺')
+
+    def sample(self, name, labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_request_metrics_exported(self):
+        labels = {'method': 'GET', 'view': 'shop-list', 'status': '200'}
+        before = self.sample('jiuba_http_request_duration_seconds_count', labels)
+        Client().get('/api/shop/shops/')
+        self.assertEqual(self.sample('jiuba_http_request_duration_seconds_count', labels), before + 1)
+
+        response = Client().get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn('jiuba_http_request_duration_seconds_bucket{', body)
+        self.assertIn('jiuba_db_connections_open{alias="default"}', body)
+
+    def test_domain_counters(self):
+        before = self.sample('jiuba_payment_callbacks_total', {'result': 'invalid'})
+        client = Client()
+        client.force_login(User.objects.create(username='metrics'))
+        client.post('/api/payment/wechat_callback/', {}, content_type='application/json')
+        self.assertEqual(self.sample('jiuba_payment_callbacks_total', {'result': 'invalid'}), before + 1)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token(self):
+        self.assertEqual(Client().get('/metrics').status_code, 401)
+        self.assertEqual(Client().get('/metrics', HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+
+    @override_settings(METRICS_TOKEN='', METRICS_PUBLIC=False)
+    def test_no_token_requires_explicit_opt_in(self):
+        self.assertEqual(Client().get('/metrics').status_code, 404)
+        with self.settings(DEBUG=True):
+            self.assertEqual(Client().get('/metrics').status_code, 404)
+        with self.settings(METRICS_PUBLIC=True):
+            self.assertEqual(Client().get('/metrics').status_code, 200)
+
+
+class NPlusOneDetectorTests(NPlusOneTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        shop = Shop.objects.create(name='检测店铺')
+        category = Category.objects.create(name='特调')
+        Product.objects.bulk_create([
+            Product(shop=shop, category=category, name=f'特调 {i}', price=10) for i in range(5)
+        ])
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'a''b' LIMIT 21"),
+            fingerprint("SELECT *  FROM t WHERE id IN (%s) AND name = 'c' LIMIT 1"),
+        )
+        self.assertNotEqual(fingerprint('SELECT * FROM t WHERE a = %s'), fingerprint('SELECT * FROM t WHERE b = %s'))
+
+    def test_reports_stack_and_serializer_field(self):
+        with NPlusOneDetector() as detector:
+            ProductSerializer(Product.objects.all(), many=True).data
+        sources = {query.source for query in detector.repeated}
+        self.assertEqual(sources, {'序列化字段 ProductSerializer.category_name', '序列化字段 ProductSerializer.shop_name'})
+        self.assertIn('apps/endpoints/tests.py', detector.report())
+        self.assertEqual(detector.repeated[0].count, 5)
+
+    def test_assert_no_n_plus_one(self):
+        with self.assertRaises(self.failureException):
+            with self.assertNoNPlusOne():
+                [product.shop.name for product in Product.objects.all()]
+        with self.assertNoNPlusOne():
+            [product.shop.name for product in Product.objects.select_related('shop')]
+
+    @override_settings(NPLUSONE_ENABLED=True)
+    def test_middleware(self):
+        def view(request):
+            [product.category.name for product in Product.objects.all()]
+            return HttpResponse()
+
+        with self.assertLogs('jiuba.nplusone', 'WARNING') as logs:
+            NPlusOneMiddleware(view)(RequestFactory().get('/products/'))
+        self.assertIn('5 次', logs.output[0])
+        with override_settings(NPLUSONE_RAISE=True), self.assertRaises(NPlusOneError):
+            NPlusOneMiddleware(view)(RequestFactory().get('/products/'))
+
+
+@override_settings(BACKGROUND_TASK_WORKERS=0)
+class EndpointNPlusOneTests(NPlusOneTestMixin, TestCase):
+    """主要接口和商家后台页面的 SQL 条数不随数据量增长"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.shop, cls.user = populate(random.Random(0), 20, 5)
+        cls.user.is_staff = True
+        cls.user.save(update_fields=['is_staff'])
+        Shop.objects.create(name='第二家店铺')
+        Order.objects.filter(user=cls.user).update(is_paid=True)
+        for activity in Activity.objects.filter(shop=cls.shop)[:5]:
+            Reservation.objects.create(user=cls.user, activity=activity, shop=cls.shop, contact_phone='13800000000')
+
+    def assertEndpoints(self, client, paths):
+        for path in paths:
+            with self.subTest(path=path), self.assertNoNPlusOne():
+                response = client.get(path)
+                self.assertEqual(response.status_code, 200)
+
+    def test_api(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        order = Order.objects.filter(user=self.user).first()
+        self.assertEndpoints(client, [path.format(shop=self.shop.id) for _, path in ENDPOINTS] + [
+            f'/api/orders/orders/{order.id}/',
+            '/api/reservations/',
+            '/api/activity/activities/',
+        ])
+
+    def test_merchant_pages(self):
+        client = Client()
+        client.force_login(self.user)
+        self.assertEndpoints(client, [
+            '/merchant/product/', '/merchant/orders/', '/merchant/reservations/', '/merchant/shops/',
+            '/merchant/activities/', '/merchant/notices/',
+        ])
+
+
+class SeedBenchmarkDataTests(TestCase):
+    options = ['--shops=3', '--products=20', '--customers=10', '--orders=30', '--activities=3', '--seed=7']
+
+    def test_seed(self):
+        call_command('seed_benchmark_data', *self.options, stdout=StringIO())
+        self.assertEqual(Shop.objects.count(), 3)
+        self.assertEqual(Order.objects.count(), 90)
+        orders = Order.objects.filter(payment_method='cash').annotate(items_total=Sum(
+            F('items__product_price') * F('items__quantity')
+        ))
+        for order in orders:
+            self.assertEqual(order.total_amount, order.items_total)
+        for activity in Activity.objects.all():
+            self.assertEqual(activity.confirmed_count, activity.reservation_set.filter(
+                status__in=HOLDING_STATUSES
+            ).count())
+        self.assertTrue(search(Product.objects.all(), Product.objects.first().name).exists())
+
+        # 已生成的店铺跳过
+        output = StringIO()
+        call_command('seed_benchmark_data', *self.options, stdout=output)
+        self.assertIn('跳过已生成的 3 家店铺', output.getvalue())
+        self.assertEqual(Shop.objects.count(), 3)
+
+    def test_deterministic_across_shards(self):
+        def snapshot():
+            return list(Order.objects.order_by('order_number').values_list(
+                'order_number', 'user__username', 'total_amount', 'created_at'
+            ))
+
+        call_command('seed_benchmark_data', *self.options, stdout=StringIO())
+        whole = snapshot()
+        Shop.objects.all().delete()
+        User.objects.all().delete()
+        for shard in range(2):
+            call_command('seed_benchmark_data', *self.options, f'--shard={shard}/2', stdout=StringIO())
+        self.assertEqual(snapshot(), whole)
@@ -3,4 +3,4 @@ from django.apps import AppConfig
 
 class MerchantConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'merchant'
+    name = 'apps.merchant'
@@ -20,6 +20,8 @@ urlpatterns = [
     path('product/<int:pk>/delete/', views.ProductDeleteView.as_view(), name='product_delete'),
     # 订单管理
     path('orders/', views.MerchantOrderListView.as_view(), name='order_list'),
+    path('orders/updates/', views.MerchantOrderUpdatesView.as_view(), name='order_updates'),
+    path('orders/stream/', views.merchant_order_stream, name='order_stream'),
     # 活动/预约管理
     path('activities/', views.ActivityListView.as_view(), name='activity_list'),
     path('activities/add/', views.ActivityCreateView.as_view(), name='activity_add'),
@@ -29,6 +31,7 @@ urlpatterns = [
     path('reservations/', views.MerchantReservationListView.as_view(), name='reservation_list'),
     path('activities/<int:pk>/reservations/', views.MerchantActivityReservationView.as_view(), name='activity_reservations'),
     path('reservations/<int:reservation_id>/complete/', views.CompleteReservationView.as_view(), name='complete_reservation'),
+    path('reservations/bulk/', views.BulkReservationTransitionView.as_view(), name='bulk_reservation_transition'),
     # 店铺管理
     path('shops/', views.ShopListView.as_view(), name='shop_list'),
     path('shops/<int:pk>/edit/', views.ShopUpdateView.as_view(), name='shop_edit'),
@@ -1,22 +1,39 @@
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView, DetailView, View
 from django.urls import reverse_lazy
-from django.shortcuts import render, redirect
+from django.shortcuts import render, redirect, get_object_or_404
+from django.contrib import messages
+from django.core.exceptions import PermissionDenied
 from django.views import View
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth import login, logout
 from django.utils import timezone
+from django.utils.http import url_has_allowed_host_and_scheme
 from datetime import date
 from django.db.models import Sum, Count, Q
 from apps.product.models import Product, Category
 from apps.order.models import Order
+from apps.order.live import CHANNEL as ORDER_CHANNEL, latest_order_id, orders_after
 from apps.shop.models import Shop
 from apps.user.models import User
 from apps.activity.models import Activity
 from apps.notice.models import Notice
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
+import asyncio
 import csv
+import json
+import time
 import xlwt
 from apps.reservations.models import Reservation
+from apps.reservations.transitions import transition
+from apps.search.index import search
+from jiuba.pubsub import subscribe
+
+# 实时订单推送：心跳 / 单次连接时长（秒），断线重连间隔（毫秒）
+ORDER_STREAM_HEARTBEAT = 15
+ORDER_STREAM_MAX_SECONDS = 300
+ORDER_STREAM_RETRY_MS = 3000
 
 def is_merchant(user):
     """检查用户是否为商家"""
@@ -29,7 +46,6 @@ class MerchantRequiredMixin:
             return redirect('/merchant/login/?next=' + request.path)
         
         if not request.user.is_staff:  # 直接使用 is_staff
-            from django.core.exceptions import PermissionDenied
             raise PermissionDenied("您没有权限访问商家后台")
         
         return super().dispatch(request, *args, **kwargs)
@@ -188,14 +204,11 @@ class ProductListView(MerchantRequiredMixin, ListView):
     paginate_by = 20
     
     def get_queryset(self):
-        queryset = Product.objects.all().order_by('-created_at')
+        queryset = Product.objects.select_related('category', 'shop').order_by('-created_at')
         
         search_query = self.request.GET.get('q')
         if search_query:
-            queryset = queryset.filter(
-                Q(name__icontains=search_query) |
-                Q(description__icontains=search_query)
-            )
+            queryset = search(queryset, search_query)
         
         shop_filter = self.request.GET.get('shop')
         if shop_filter:
@@ -261,7 +274,8 @@ class MerchantOrderListView(MerchantRequiredMixin, ListView):
     def get_queryset(self):
         """获取所有店铺的订单（商家可以看到所有店铺）"""
         # 商家用户可以看到所有已支付订单
-        queryset = Order.objects.filter(is_paid=True).select_related('user', 'shop')
+        # 列表显示商品数量（item_count），订单项随分页一次预取
+        queryset = Order.objects.filter(is_paid=True).select_related('user', 'shop').prefetch_related('items')
         
         # 店铺筛选
         shop_filter = self.request.GET.get('shop')
@@ -318,6 +332,13 @@ class MerchantOrderListView(MerchantRequiredMixin, ListView):
             'current_filters': self.request.GET.dict(),
         })
         
+        # 只有第一页且除店铺外无其它筛选时，新订单才直接插到表格顶部
+        filters = set(self.request.GET) - {'shop'}
+        if not filters:
+            shop_id = _parse_id(self.request.GET.get('shop'))
+            context['live_last_id'] = latest_order_id(shop_id)
+            context['live_shop_id'] = shop_id or ''
+        
         return context
     
     def render_to_response(self, context, **response_kwargs):
@@ -393,6 +414,67 @@ class MerchantOrderListView(MerchantRequiredMixin, ListView):
         wb.save(response)
         return response
     
+def _parse_id(value, default=None):
+    return int(value) if value and value.isdigit() else default
+
+
+class MerchantOrderUpdatesView(MerchantRequiredMixin, View):
+    """新订单轮询接口：返回 last_id 之后的订单，SSE 不可用时使用"""
+    
+    def get(self, request):
+        last_id = _parse_id(request.GET.get('last_id'), 0)
+        orders = orders_after(last_id, _parse_id(request.GET.get('shop')))
+        if orders:
+            last_id = orders[-1]['id']
+        return JsonResponse({'orders': orders, 'last_id': last_id})
+
+
+async def _order_events(last_id, shop_id):
+    """
+    SSE 事件流：先订阅再补齐 last_id 之后的订单，之后等待推送；
+    空闲超过心跳间隔时查一次数据库，补上其它 worker 创建的订单
+    """
+    deadline = time.monotonic() + ORDER_STREAM_MAX_SECONDS
+    with subscribe(ORDER_CHANNEL) as queue:
+        yield f'retry: {ORDER_STREAM_RETRY_MS}\n\n'
+        events = await sync_to_async(orders_after)(last_id, shop_id)
+        while True:
+            for event in events:
+                if event['id'] <= last_id or (shop_id and event['shop_id'] != shop_id):
+                    continue
+                last_id = event['id']
+                yield f'id: {last_id}\nevent: order\ndata: {json.dumps(event, ensure_ascii=False)}\n\n'
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                # 定期断开，浏览器带 Last-Event-ID 自动重连，便于 worker 回收
+                return
+            try:
+                events = [await asyncio.wait_for(queue.get(), min(ORDER_STREAM_HEARTBEAT, remaining))]
+            except asyncio.TimeoutError:
+                events = await sync_to_async(orders_after)(last_id, shop_id)
+                if not events:
+                    yield ': keepalive\n\n'
+
+
+async def merchant_order_stream(request):
+    """新订单 SSE 推送，需以 ASGI 方式部署；WSGI 下返回 204 让客户端改用轮询"""
+    user = await request.auser()
+    if not user.is_authenticated or not user.is_staff:
+        return HttpResponse(status=403)
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    
+    last_id = _parse_id(request.headers.get('Last-Event-ID') or request.GET.get('last_id'), 0)
+    response = StreamingHttpResponse(
+        _order_events(last_id, _parse_id(request.GET.get('shop'))),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # 关闭 nginx 代理缓冲
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 # 活动管理视图
 class ActivityListView(MerchantRequiredMixin, ListView):
     model = Activity
@@ -401,15 +483,12 @@ class ActivityListView(MerchantRequiredMixin, ListView):
     paginate_by = 20
     
     def get_queryset(self):
-        queryset = Activity.objects.all().select_related('shop').order_by('-created_at')
+        queryset = Activity.objects.select_related('shop').with_reservation_stats().order_by('-created_at')
         
         # 搜索功能
         search_query = self.request.GET.get('q')
         if search_query:
-            queryset = queryset.filter(
-                Q(title__icontains=search_query) |
-                Q(description__icontains=search_query)
-            )
+            queryset = search(queryset, search_query)
 
         # 店铺筛选
         shop_filter = self.request.GET.get('shop')
@@ -527,8 +606,6 @@ class MerchantReservationListView(MerchantRequiredMixin, ListView):
             )
             # print(f"搜索过滤后数量: {queryset.count()}")
         
-        final_count = queryset.count()
-        # print(f"最终查询集数量: {final_count}")
         # print("=== 结束获取预约数据 ===")
         
         return queryset.order_by('-created_at')
@@ -542,9 +619,8 @@ class MerchantReservationListView(MerchantRequiredMixin, ListView):
         # 获取所有活动用于筛选
         activities = Activity.objects.filter(is_active=True)
         
-        # 获取统计信息
-        queryset = self.get_queryset()
-        stats = queryset.aggregate(
+        # 获取统计信息（与列表相同的筛选条件）
+        stats = self.object_list.aggregate(
             total=Count('id'),
             confirmed=Count('id', filter=Q(status='confirmed')),
             completed=Count('id', filter=Q(status='completed')),
@@ -570,56 +646,80 @@ class MerchantActivityReservationView(MerchantRequiredMixin, DetailView):
     context_object_name = 'activity'
     
     def get_queryset(self):
-        """可以查看所有活动"""
-        return Activity.objects.all()
+        """可以查看所有活动，统计数据随活动一并查询"""
+        return Activity.objects.select_related('shop').with_reservation_stats()
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        activity = self.get_object()
+        activity = self.object
         
         # 获取该活动的所有预约
         reservations = Reservation.objects.filter(
             activity=activity
         ).select_related('user', 'shop').order_by('-created_at')
         
-        # 统计信息
-        stats = reservations.aggregate(
-            total=Count('id'),
-            confirmed=Count('id', filter=Q(status='confirmed')),
-            completed=Count('id', filter=Q(status='completed')),
-            cancelled=Count('id', filter=Q(status='cancelled'))
-        )
-        
         context.update({
             'reservations': reservations,
-            'total_reservations': stats['total'] or 0,
-            'confirmed_reservations': stats['confirmed'] or 0,
-            'completed_reservations': stats['completed'] or 0,
-            'cancelled_reservations': stats['cancelled'] or 0,
+            'total_reservations': activity.total_reservations,
+            'confirmed_reservations': activity.confirmed_reservations,
+            'completed_reservations': activity.completed_reservations,
+            'cancelled_reservations': activity.cancelled_reservations,
             'remaining_slots': activity.remaining_slots(),
         })
         
         return context
     
+def merchant_reservations(user):
+    """商家可操作的预约：绑定店铺的员工只能操作本店预约"""
+    queryset = Reservation.objects.all()
+    if not user.is_superuser and user.shop_id:
+        queryset = queryset.filter(shop_id=user.shop_id)
+    return queryset
+
+
 class CompleteReservationView(MerchantRequiredMixin, View):
     """完成预约"""
     def post(self, request, reservation_id):
         reservation = get_object_or_404(Reservation, id=reservation_id)
         
         # 检查权限：只能操作自己店铺的预约
-        if not hasattr(request.user, 'shop') or reservation.shop != request.user.shop:
+        if not merchant_reservations(request.user).filter(pk=reservation.pk).exists():
             messages.error(request, "无权操作此预约")
             return redirect('merchant:reservation_list')
         
-        if reservation.status != 'confirmed':
+        updated, _ = transition(Reservation.objects.all(), [reservation.pk], 'complete')
+        if not updated:
             messages.error(request, "只有已确认的预约才能完成")
             return redirect('merchant:reservation_list')
         
-        reservation.status = 'completed'
-        reservation.save()
-        
         messages.success(request, f"预约 #{reservation.id} 已完成")
         return redirect('merchant:reservation_list')
+
+
+class BulkReservationTransitionView(MerchantRequiredMixin, View):
+    """批量核销 / 取消预约"""
+    def post(self, request):
+        action = request.POST.get('action')
+        try:
+            ids = [int(pk) for pk in request.POST.getlist('ids')]
+        except ValueError:
+            ids = []
+        # 返回提交前的列表页（保留筛选条件）
+        next_url = request.POST.get('next', '')
+        if not url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+            next_url = reverse_lazy('merchant:reservation_list')
+        
+        if action not in ('complete', 'cancel') or not ids:
+            messages.error(request, "请选择预约和要执行的操作")
+            return redirect(next_url)
+        
+        updated, results = transition(merchant_reservations(request.user), ids, action)
+        skipped = [str(item['id']) for item in results if item['result'] in ('skipped', 'not_found')]
+        verb = '完成' if action == 'complete' else '取消'
+        messages.success(request, f"已{verb} {updated} 个预约")
+        if skipped:
+            messages.warning(request, f"以下预约未处理（非已确认状态或无权操作）：#{', #'.join(skipped)}")
+        return redirect(next_url)
     
 # 店铺管理视图
 class ShopListView(MerchantRequiredMixin, ListView):
@@ -629,16 +729,12 @@ class ShopListView(MerchantRequiredMixin, ListView):
     paginate_by = 20
     
     def get_queryset(self):
-        queryset = Shop.objects.all().order_by('-created_at')
+        queryset = Shop.objects.with_active_products_count().order_by('-created_at')
         
         # 搜索功能
         search_query = self.request.GET.get('q')
         if search_query:
-            queryset = queryset.filter(
-                Q(name__icontains=search_query) |
-                Q(address__icontains=search_query) |
-                Q(phone__icontains=search_query)
-            )
+            queryset = search(queryset, search_query)
         
         # 状态筛选
         status_filter = self.request.GET.get('status')
@@ -676,10 +772,7 @@ class NoticeListView(MerchantRequiredMixin, ListView):
         # 搜索功能
         search_query = self.request.GET.get('q')
         if search_query:
-            queryset = queryset.filter(
-                Q(title__icontains=search_query) |
-                Q(content__icontains=search_query)
-            )
+            queryset = search(queryset, search_query)
         
         # 店铺筛选
         shop_filter = self.request.GET.get('shop')
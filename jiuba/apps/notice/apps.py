@@ -3,4 +3,7 @@ from django.apps import AppConfig
 class NoticeConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.notice'
-    verbose_name = '公告管理'
\ No newline at end of file
+    verbose_name = '公告管理'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -22,6 +22,10 @@ class Notice(models.Model):
         verbose_name = "公告"
         verbose_name_plural = "公告"
         ordering = ['-created_at']
+        indexes = [
+            # 增量同步：按店铺取 updated_at 之后变更的公告
+            models.Index(fields=['shop', 'updated_at'], name='notice_shop_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.shop.name}"
\ No newline at end of file
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Notice
+from .sync import invalidate_head
+
+
+@receiver(post_save, sender=Notice, dispatch_uid='notice_head_saved')
+@receiver(post_delete, sender=Notice, dispatch_uid='notice_head_deleted')
+def notice_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_head(instance.shop_id)
@@ -0,0 +1,80 @@
+"""
+公告增量同步
+
+每个店铺缓存一个"头部"：最后变更的公告位置和启用中的公告 ID 列表。
+cursor 为 (updated_at, id)，编码为 "<ISO 时间>,<id>"：多条公告 updated_at 相同（批量修改）
+且恰好跨分页边界时，按 id 继续，不会漏掉同一时间的其余公告。
+客户端带上次同步得到的 cursor 请求时，若 cursor 不早于头部，直接返回空变更（不查库）；
+否则按 (shop, updated_at) 索引只取之后变更的公告。停用的公告以 is_active=False 返回，
+已删除的公告不在 active_ids 中，客户端据此删除本地缓存。
+"""
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Notice
+
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _cache_key(shop_id):
+    return f'notice_sync_head:{shop_id}'
+
+
+def format_cursor(cursor):
+    if cursor is None:
+        return None
+    updated_at, notice_id = cursor
+    return f'{updated_at.isoformat()},{notice_id}'
+
+
+def parse_cursor(value):
+    """
+    解析客户端传回的 cursor，格式无效时抛出 ValueError
+    只有时间的旧格式按 (时间, 0) 处理：同一时间的公告会再返回一次，不会遗漏
+    """
+    timestamp, separator, notice_id = value.rpartition(',')
+    if not separator:
+        timestamp, notice_id = value, '0'
+    updated_at = parse_datetime(timestamp)
+    if updated_at is None:
+        raise ValueError(value)
+    if timezone.is_naive(updated_at):
+        updated_at = timezone.make_aware(updated_at)
+    return updated_at, int(notice_id)
+
+
+def build_head(shop_id):
+    notices = Notice.objects.filter(shop_id=shop_id)
+    head = {
+        'cursor': notices.order_by('-updated_at', '-id').values_list('updated_at', 'id').first(),
+        'active_ids': list(notices.filter(is_active=True).order_by('-created_at').values_list('id', flat=True)),
+    }
+    cache.set(_cache_key(shop_id), head, CACHE_TIMEOUT)
+    return head
+
+
+def get_head(shop_id):
+    head = cache.get(_cache_key(shop_id))
+    if head is None:
+        head = build_head(shop_id)
+    return head
+
+
+def head_etag(shop_id, head, staff=False):
+    cursor = '%s-%s' % (head['cursor'][0].timestamp(), head['cursor'][1]) if head['cursor'] else 0
+    return '"notice-%s-%s-%d%s"' % (shop_id, cursor, len(head['active_ids']), '-staff' if staff else '')
+
+
+def changed_since(shop_id, since, limit):
+    """since（updated_at, id）之后变更的公告（按 updated_at, id 升序），多取一条用于判断是否还有更多"""
+    queryset = Notice.objects.filter(shop_id=shop_id).select_related('shop')
+    if since is not None:
+        updated_at, notice_id = since
+        queryset = queryset.filter(Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=notice_id))
+    return list(queryset.order_by('updated_at', 'id')[:limit + 1])
+
+
+def invalidate_head(*shop_ids):
+    cache.delete_many([_cache_key(shop_id) for shop_id in shop_ids])
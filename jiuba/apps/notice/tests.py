@@ -1,3 +1,64 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.shop.models import Shop
+
+from .models import Notice
+from .sync import invalidate_head, parse_cursor
+from .views import NoticeViewSet
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class NoticeSyncTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.shop = Shop.objects.create(name='公告测试店铺')
+        Notice.objects.bulk_create([
+            Notice(shop=cls.shop, title=f'公告{i}', content='内容') for i in range(5)
+        ])
+        # 批量修改后多条公告的 updated_at 完全相同
+        Notice.objects.update(updated_at=timezone.now())
+        invalidate_head(cls.shop.pk)
+
+    def sync(self, since=None):
+        params = {'shop_id': self.shop.pk}
+        if since:
+            params['since'] = since
+        response = self.client.get('/api/notice/notices/sync/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_tied_timestamps_across_pages(self):
+        seen, cursor = [], None
+        with mock.patch.object(NoticeViewSet, 'sync_limit', 2):
+            for _ in range(5):
+                data = self.sync(cursor)
+                seen += [notice['id'] for notice in data['changed']]
+                cursor = data['cursor']
+                if not data['has_more']:
+                    break
+        self.assertEqual(sorted(seen), sorted(Notice.objects.values_list('id', flat=True)))
+        self.assertEqual(len(seen), 5)
+        # 同步完成后再次请求没有变更
+        self.assertEqual(self.sync(cursor)['changed'], [])
+
+    def test_later_change_returned(self):
+        cursor = self.sync()['cursor']
+        notice = Notice.objects.order_by('id').first()
+        notice.title = '已修改'
+        notice.save()
+        self.assertEqual([row['title'] for row in self.sync(cursor)['changed']], ['已修改'])
+
+    def test_cursor_format(self):
+        cursor = self.sync()['cursor']
+        updated_at, notice_id = parse_cursor(cursor)
+        self.assertEqual(notice_id, Notice.objects.order_by('-id').first().id)
+        # 只有时间的旧 cursor：同一时间的公告重新返回
+        self.assertEqual(len(self.sync(updated_at.isoformat())['changed']), 5)
+        response = self.client.get('/api/notice/notices/sync/', {'shop_id': self.shop.pk, 'since': 'bad'})
+        self.assertEqual(response.status_code, 400)
@@ -1,10 +1,20 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.db.models import Q
+from django.http import HttpResponseNotModified
 from .models import Notice
 from .serializers import NoticeSerializer
+from .sync import changed_since, format_cursor, get_head, head_etag, parse_cursor
+
+
+class NoticePagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
 
 class NoticeViewSet(viewsets.ModelViewSet):
     """
@@ -12,6 +22,8 @@ class NoticeViewSet(viewsets.ModelViewSet):
     """
     queryset = Notice.objects.all().select_related('shop')
     serializer_class = NoticeSerializer
+    # 增量同步单次最多返回的条数
+    sync_limit = 200
     
     def get_permissions(self):
         """
@@ -27,27 +39,94 @@ class NoticeViewSet(viewsets.ModelViewSet):
         """获取公告列表，默认只显示启用的公告"""
         queryset = super().get_queryset()
         
-        # 普通用户只能看到启用的公告
-        if not self.request.user.is_authenticated:
+        # 员工以外的用户（包括已登录的普通用户）只能看到启用的公告
+        if not self.request.user.is_staff:
             queryset = queryset.filter(is_active=True)
         
         return queryset
     
+    def get_shop_id(self, request):
+        try:
+            return int(request.query_params['shop_id'])
+        except (KeyError, ValueError):
+            return None
+    
     @action(detail=False, methods=['get'])
     def shop_notices(self, request):
-        """获取指定店铺的公告列表"""
-        shop_id = request.query_params.get('shop_id')
-        if not shop_id:
+        """获取指定店铺的公告列表（分页，内容未变时返回 304）"""
+        shop_id = self.get_shop_id(request)
+        if shop_id is None:
             return Response(
                 {"error": "请提供shop_id参数"}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        # 用缓存的店铺头部生成 ETag，重复打开公告页时不查库
+        etag = head_etag(shop_id, get_head(shop_id), request.user.is_staff)
+        page_etag = etag[:-1] + '-%s-%s"' % (
+            request.query_params.get('page', 1), request.query_params.get('page_size', '')
+        )
+        if request.headers.get('If-None-Match') == page_etag:
+            return HttpResponseNotModified(headers={'ETag': page_etag})
+        
         queryset = self.get_queryset().filter(shop_id=shop_id)
+        paginator = NoticePagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        response = paginator.get_paginated_response(serializer.data)
+        response['ETag'] = page_etag
+        return response
+    
+    @action(detail=False, methods=['get'])
+    def sync(self, request):
+        """
+        增量同步：?shop_id=1&since=<上次返回的 cursor>
+        返回 since 之后新增 / 修改 / 停用的公告，以及当前启用的公告 ID（用于删除本地已删除的公告）；
+        has_more 为 true 时用返回的 cursor 继续请求
+        """
+        shop_id = self.get_shop_id(request)
+        if shop_id is None:
+            return Response(
+                {"error": "请提供shop_id参数"}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        since = request.query_params.get('since')
+        if since:
+            try:
+                since = parse_cursor(since)
+            except ValueError:
+                return Response({"error": "since 格式无效"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        head = get_head(shop_id)
+        if since and (head['cursor'] is None or since >= head['cursor']):
+            # 没有新变更，直接由缓存返回
+            return Response({
+                'cursor': format_cursor(since),
+                'changed': [],
+                'has_more': False,
+                'active_ids': head['active_ids'],
+            })
         
-        # 序列化并返回
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        notices = changed_since(shop_id, since or None, self.sync_limit)
+        has_more = len(notices) > self.sync_limit
+        notices = notices[:self.sync_limit]
+        changed = []
+        for notice in notices:
+            if notice.is_active or request.user.is_staff:
+                changed.append(self.get_serializer(notice).data)
+            else:
+                # 停用的公告只告知客户端删除，不返回内容
+                changed.append({'id': notice.id, 'is_active': False, 'updated_at': notice.updated_at})
+        
+        cursor = (notices[-1].updated_at, notices[-1].id) if notices else since
+        if not has_more and head['cursor'] and (cursor is None or head['cursor'] > cursor):
+            cursor = head['cursor']
+        return Response({
+            'cursor': format_cursor(cursor),
+            'changed': changed,
+            'has_more': has_more,
+            'active_ids': head['active_ids'],
+        })
     
     @action(detail=True, methods=['post'])
     def toggle_status(self, request, pk=None):
@@ -60,4 +139,4 @@ class NoticeViewSet(viewsets.ModelViewSet):
         return Response({
             "message": message,
             "is_active": notice.is_active
-        })
\ No newline at end of file
+        })
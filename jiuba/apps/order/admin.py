@@ -1,5 +1,9 @@
 # apps/order/admin.py
+import csv
+
 from django.contrib import admin
+from django.http import HttpResponse
+from django.utils import timezone
 from django.utils.html import format_html
 from .models import Order, OrderItem
 
@@ -89,10 +93,6 @@ class OrderAdmin(admin.ModelAdmin):
     
     def export_selected_orders(self, request, queryset):
         """导出选中订单"""
-        import csv
-        from django.http import HttpResponse
-        from django.utils import timezone
-        
         response = HttpResponse(content_type='text/csv')
         response['Content-Disposition'] = f'attachment; filename="orders_export_{timezone.now().strftime("%Y%m%d_%H%M%S")}.csv"'
         
@@ -0,0 +1,60 @@
+"""
+商家端实时订单
+
+订单创建提交后发布到进程内的 orders 频道，SSE 连接即时推送；
+SSE 连接空闲时按 last_id 查询一次数据库（覆盖其它 worker 创建的订单），
+不支持 SSE 的客户端使用同样基于 last_id 的轮询接口。
+"""
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from jiuba.pubsub import publish
+
+from .models import Order
+
+CHANNEL = 'orders'
+# 单次补齐 / 轮询返回的最大订单数
+BATCH_SIZE = 50
+
+
+def order_event(order, item_count):
+    return {
+        'id': order.id,
+        'order_number': order.order_number,
+        'shop_id': order.shop_id,
+        'shop_name': order.shop.name,
+        'username': order.user.username,
+        'payment_method': order.payment_method,
+        'payment_method_display': order.get_payment_method_display(),
+        'total_amount': str(order.total_amount),
+        'total_points': order.total_points,
+        'item_count': item_count or 0,
+        'customer_notes': order.customer_notes,
+        'created_at': timezone.localtime(order.created_at).strftime('%Y-%m-%d %H:%M'),
+        'paid_at': timezone.localtime(order.paid_at).strftime('%Y-%m-%d %H:%M'),
+    }
+
+
+def publish_order(order, item_count):
+    """事务提交后发布新订单（order 需已加载 user / shop）"""
+    event = order_event(order, item_count)
+    transaction.on_commit(lambda: publish(CHANNEL, event))
+
+
+def orders_after(last_id, shop_id=None, limit=BATCH_SIZE):
+    """last_id 之后的已支付订单（按 id 升序），一条查询"""
+    queryset = Order.objects.filter(id__gt=last_id, is_paid=True)
+    if shop_id:
+        queryset = queryset.filter(shop_id=shop_id)
+    orders = queryset.select_related('user', 'shop').annotate(
+        item_total=Sum('items__quantity')
+    ).order_by('id')[:limit]
+    return [order_event(order, order.item_total) for order in orders]
+
+
+def latest_order_id(shop_id=None):
+    queryset = Order.objects.filter(is_paid=True)
+    if shop_id:
+        queryset = queryset.filter(shop_id=shop_id)
+    return queryset.order_by('-id').values_list('id', flat=True).first() or 0
@@ -1,4 +1,7 @@
 # apps/orders/models.py
+import random
+from datetime import datetime
+
 from django.db import models
 from django.utils import timezone
 from apps.user.models import User
@@ -45,8 +48,6 @@ class Order(models.Model):
     def save(self, *args, **kwargs):
         """生成订单号"""
         if not self.order_number:
-            import random
-            from datetime import datetime
             timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
             random_str = str(random.randint(1000, 9999))
             self.order_number = f"ORD{timestamp}{random_str}"
@@ -3,6 +3,7 @@
 from rest_framework import serializers
 from .models import Order, OrderItem
 from apps.product.serializers import ProductSerializer
+from apps.shop.models import Shop
 from apps.shop.serializers import ShopSerializer
 from apps.user.serializers import UserSerializer
 
@@ -63,7 +64,6 @@ class CreateOrderSerializer(serializers.Serializer):
     
     def validate_shop_id(self, value):
         """验证店铺是否存在"""
-        from apps.shop.models import Shop
         try:
             shop = Shop.objects.get(id=value, is_active=True)
         except Shop.DoesNotExist:
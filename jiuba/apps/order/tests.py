@@ -1,3 +1,52 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+
+from apps.product.models import Category, Product
+from apps.shop.models import Shop
+from apps.user.models import User
+
+from .models import Order, OrderItem
+
+
+class OrderExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        shop = Shop.objects.create(name='导出测试店铺')
+        # 导出由商家在后台发起
+        cls.user = User.objects.create_user(username='merchant', password='secret', is_staff=True, shop=shop)
+        product = Product.objects.create(
+            shop=shop, category=Category.objects.create(name='啤酒'), name='精酿', price=30,
+        )
+        for i in range(3):
+            order = Order.objects.create(
+                user=cls.user, shop=shop, payment_method='cash', total_amount=60, order_number=f'EXP{i}',
+            )
+            OrderItem.objects.create(
+                order=order, product=product, product_name=product.name, product_price=30, quantity=2,
+            )
+
+    def assertExported(self, content):
+        rows = list(csv.reader(io.StringIO(content.decode())))
+        self.assertEqual(rows[0][0], '订单号')
+        self.assertEqual(sorted(row[0] for row in rows[1:]), ['EXP0', 'EXP1', 'EXP2'])
+        self.assertEqual({row[6] for row in rows[1:]}, {'2'})
+
+    def test_sync_export(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/api/orders/orders/export/')
+        self.assertFalse(response.is_async)
+        self.assertExported(b''.join(response.streaming_content))
+
+    @override_settings(ASYNC_VIEWS=True)
+    async def test_async_export_streams(self):
+        """ASGI 部署下返回异步迭代器，逐批查询后发送，不会被整个读入内存"""
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get('/api/orders/orders/export/', headers={'Accept-Encoding': 'gzip'})
+        self.assertTrue(response.is_async)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertExported(gzip.decompress(content))
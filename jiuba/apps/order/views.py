@@ -1,18 +1,107 @@
 # apps/order/views.py
+import csv
+import random
+import string
+
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
 from django.shortcuts import get_object_or_404
 from django.db import transaction
+from django.http import Http404, StreamingHttpResponse
+from django.utils import timezone
+from .live import publish_order
 from .models import Order, OrderItem
 from .serializers import (
     OrderSerializer, CreateOrderSerializer, OrderListSerializer
 )
 from apps.cart.models import Cart, CartItem
 from apps.shop.models import Shop
-from django.db.models import Count, Sum, Q
+from django.db.models import Count, Prefetch, Sum, Q
+from jiuba.metrics import CHECKOUTS
+
+# 流式导出时每次发送的大致字节数
+EXPORT_CHUNK_SIZE = 64 * 1024
+# 导出时每批查询的订单数（每批预取一次订单项）
+EXPORT_BATCH_SIZE = 500
+
+
+class _Echo:
+    """csv.writer 的写入目标，直接返回写入的行"""
+
+    def write(self, value):
+        return value
+
+
+class _CsvChunker:
+    """把 CSV 行攒成约 EXPORT_CHUNK_SIZE 字节的块"""
+
+    def __init__(self, header):
+        self.writer = csv.writer(_Echo())
+        self.buffer = [self.writer.writerow(header)]
+        self.size = 0
+
+    def add(self, row):
+        """加入一行，攒够一块时返回该块"""
+        line = self.writer.writerow(row)
+        self.buffer.append(line)
+        self.size += len(line)
+        if self.size >= EXPORT_CHUNK_SIZE:
+            return self.flush()
+        return None
+
+    def flush(self):
+        chunk = ''.join(self.buffer)
+        self.buffer, self.size = [], 0
+        return chunk
+
+
+def _csv_chunks(header, rows):
+    chunker = _CsvChunker(header)
+    for row in rows:
+        chunk = chunker.add(row)
+        if chunk:
+            yield chunk
+    yield chunker.flush()
+
+
+async def _acsv_chunks(header, rows):
+    """
+    _csv_chunks 的异步版本，供 ASGI 部署使用：同步迭代器在 ASGI 下会被整个读入内存后才发送，
+    rows 为异步迭代器（QuerySet.aiterator），每批订单在线程中查询
+    """
+    chunker = _CsvChunker(header)
+    async for row in rows:
+        chunk = chunker.add(row)
+        if chunk:
+            yield chunk
+    yield chunker.flush()
+
+
+def _export_row(order):
+    return [
+        order.order_number,
+        order.user.username,
+        order.shop.name,
+        order.get_payment_method_display(),
+        float(order.total_amount),
+        order.total_points,
+        order.item_count,
+        order.customer_notes,
+        order.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+        order.paid_at.strftime('%Y-%m-%d %H:%M:%S'),
+        order.transaction_id
+    ]
+
+
+async def _aexport_rows(queryset):
+    async for order in queryset.aiterator(chunk_size=EXPORT_BATCH_SIZE):
+        yield _export_row(order)
+
 
 class OrderViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
@@ -43,7 +132,11 @@ class OrderViewSet(viewsets.ModelViewSet):
         if shop_filter and self.request.user.is_staff:
             queryset = queryset.filter(shop_id=shop_filter)
         
-        return queryset.select_related('user', 'shop').prefetch_related('items')
+        # 列表和导出只用到订单项数量，详情还要序列化每个订单项的商品
+        items = OrderItem.objects.all()
+        if self.action not in ('list', 'export'):
+            items = items.select_related('product__category', 'product__shop')
+        return queryset.select_related('user', 'shop').prefetch_related(Prefetch('items', queryset=items))
     
     def get_serializer_class(self):
         """根据动作选择序列化器"""
@@ -53,9 +146,25 @@ class OrderViewSet(viewsets.ModelViewSet):
             return OrderListSerializer
         return OrderSerializer
     
-    @transaction.atomic
     def create(self, request):
-        """创建订单（从购物车）- 直接创建为已支付订单"""
+        """创建订单（从购物车）- 直接创建为已支付订单，按结果计入下单指标"""
+        try:
+            response = self._create_order(request)
+        except ValidationError:
+            CHECKOUTS.labels('invalid').inc()
+            raise
+        except Http404:
+            CHECKOUTS.labels('no_cart').inc()
+            raise
+        except Exception:
+            CHECKOUTS.labels('error').inc()
+            raise
+        # 事务已提交
+        CHECKOUTS.labels('success' if response.status_code == status.HTTP_201_CREATED else 'empty_cart').inc()
+        return response
+    
+    @transaction.atomic
+    def _create_order(self, request):
         serializer = CreateOrderSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
@@ -86,10 +195,6 @@ class OrderViewSet(viewsets.ModelViewSet):
             total_points = sum(item.points_subtotal for item in cart_items)
         
         # 创建订单（直接设置为已支付）
-        from django.utils import timezone
-        import random
-        import string
-        
         order = Order.objects.create(
             user=request.user,
             shop_id=shop_id,
@@ -116,6 +221,9 @@ class OrderViewSet(viewsets.ModelViewSet):
         # 清空购物车
         cart.items.all().delete()
         
+        # 提交后推送给商家端实时订单
+        publish_order(order, sum(item.quantity for item in cart_items))
+        
         return Response(
             OrderSerializer(order).data, 
             status=status.HTTP_201_CREATED
@@ -164,35 +272,18 @@ class OrderViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def export(self, request):
-        """导出订单数据"""
-        from django.http import HttpResponse
-        import csv
-        from django.utils import timezone
-        
+        """导出订单数据（流式生成，订单多时不占用大量内存）"""
         queryset = self.get_queryset()
-        
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="orders_export_{timezone.now().strftime("%Y%m%d_%H%M%S")}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow([
+        header = [
             '订单号', '用户', '店铺', '支付方式', '现金金额', '积分金额', 
             '商品数量', '顾客备注', '创建时间', '支付时间', '交易号'
-        ])
-        
-        for order in queryset:
-            writer.writerow([
-                order.order_number,
-                order.user.username,
-                order.shop.name,
-                order.get_payment_method_display(),
-                float(order.total_amount),
-                order.total_points,
-                order.item_count,
-                order.customer_notes,
-                order.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                order.paid_at.strftime('%Y-%m-%d %H:%M:%S'),
-                order.transaction_id
-            ])
-        
-        return response
\ No newline at end of file
+        ]
+        if settings.ASYNC_VIEWS:
+            content = _acsv_chunks(header, _aexport_rows(queryset))
+        else:
+            # 分批查询，每批预取一次订单项
+            rows = (_export_row(order) for order in queryset.iterator(chunk_size=EXPORT_BATCH_SIZE))
+            content = _csv_chunks(header, rows)
+        response = StreamingHttpResponse(content, content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="orders_export_{timezone.now().strftime("%Y%m%d_%H%M%S")}.csv"'
+        return response
@@ -0,0 +1,182 @@
+"""
+支付接口的异步版本
+
+以 ASGI 方式部署时（settings.ASYNC_VIEWS），urls.py 用这些视图替换 PaymentViewSet 中的
+create_payment / wechat_callback / query_status：等待微信支付接口期间不占用 worker，
+数据库读写使用异步 ORM，需要事务的状态变更（mark_paid、余额扣款）通过 sync_to_async 执行。
+请求参数、返回内容和权限与 PaymentViewSet 保持一致。
+"""
+import functools
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from apps.order.models import Order
+from jiuba.metrics import PAYMENT_CALLBACKS, PAYMENTS
+
+from .models import Payment
+from .serializers import PaymentCallbackSerializer, PaymentCreateSerializer, PaymentSerializer
+from .services import BalancePayService, generate_out_trade_no, mark_paid, observe_callback, payment_method_label
+from .views import PaymentViewSet
+from .wechat import AsyncWeChatPayClient, callback_params, verify_signature
+
+
+def _json(data, status=200):
+    return JsonResponse(data, status=status, safe=False, json_dumps_params={'ensure_ascii': False})
+
+
+def _error(message, status=400):
+    return _json({'error': message}, status=status)
+
+
+def _request_data(request):
+    """与 DRF 一致，同时接受 JSON 和表单提交，JSON 格式错误时返回 None"""
+    if request.content_type == 'application/json':
+        try:
+            return json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+    return request.POST
+
+
+def _check_request(request, action):
+    """
+    按 PaymentViewSet 的认证类、权限类和限流类校验请求，与 DRF 视图的行为一致：
+    会话认证要求 CSRF token，Basic 等其它认证方式不需要；失败时返回 DRF 生成的错误响应
+    """
+    view = PaymentViewSet(
+        action_map={request.method.lower(): action}, args=(), kwargs={}, format_kwarg=None, headers={}
+    )
+    drf_request = view.request = view.initialize_request(request)
+    try:
+        view.initial(drf_request)
+    except Exception as exc:
+        response = view.finalize_response(drf_request, view.handle_exception(exc))
+        return None, response.render()
+    return drf_request.user, None
+
+
+def _authenticated(view):
+    """对应 PaymentViewSet 的 authentication_classes / permission_classes（认证查询数据库，在线程中执行）"""
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user, response = await sync_to_async(_check_request)(request, view.__name__)
+        if response is not None:
+            return response
+        return await view(request, user, *args, **kwargs)
+    # CSRF 由会话认证按 DRF 的规则校验
+    return csrf_exempt(wrapper)
+
+
+@_authenticated
+@require_POST
+async def create_payment(request, user):
+    """创建支付订单"""
+    data = _request_data(request)
+    if data is None:
+        return _json({'detail': 'JSON parse error'}, status=400)
+    response = await _create_payment(data, user)
+    PAYMENTS.labels(
+        payment_method_label(data.get('payment_method')), 'success' if response.status_code == 200 else 'failure'
+    ).inc()
+    return response
+
+
+async def _create_payment(data, user):
+    serializer = PaymentCreateSerializer(data=data)
+    if not serializer.is_valid():
+        return _json(serializer.errors, status=400)
+
+    order_id = serializer.validated_data['order_id']
+    payment_method = serializer.validated_data['payment_method']
+
+    try:
+        order = await Order.objects.aget(id=order_id, user=user, is_paid=False)
+    except Order.DoesNotExist:
+        return _error('订单不存在或不可支付')
+
+    if await Payment.objects.filter(order=order).aexists():
+        return _error('该订单已存在支付记录')
+
+    payment = await Payment.objects.acreate(
+        order=order,
+        user=user,
+        amount=order.total_amount,
+        method=payment_method,
+        out_trade_no=generate_out_trade_no(),
+        status='pending'
+    )
+
+    if payment_method == 'wechat':
+        result = await AsyncWeChatPayClient().unified_order(payment)
+        if not result['success']:
+            payment.status = 'failed'
+            await payment.asave(update_fields=['status'])
+            return _error(result['error'])
+        return _json({
+            'success': True,
+            'payment_id': payment.id,
+            'out_trade_no': payment.out_trade_no,
+            'payment_data': result['payment_data']
+        })
+
+    result = await sync_to_async(BalancePayService().process_payment)(payment)
+    if not result['success']:
+        return _error(result['error'])
+    return _json({
+        'success': True,
+        'payment_id': payment.id,
+        'status': 'success',
+        'message': '支付成功'
+    })
+
+
+@csrf_exempt
+@require_POST
+async def wechat_callback(request):
+    """微信支付回调接口：与 PaymentViewSet.wechat_callback 相同，不需要登录，只认签名"""
+    params = callback_params(request.body, request.content_type)
+    if params is None or not verify_signature(params):
+        PAYMENT_CALLBACKS.labels('invalid').inc()
+        return _error('回调签名校验失败')
+    serializer = PaymentCallbackSerializer(data=params)
+    if not serializer.is_valid():
+        PAYMENT_CALLBACKS.labels('invalid').inc()
+        return _json(serializer.errors, status=400)
+
+    out_trade_no = serializer.validated_data['out_trade_no']
+    created_at = await Payment.objects.filter(out_trade_no=out_trade_no).values_list('created_at', flat=True).afirst()
+    if created_at is None:
+        PAYMENT_CALLBACKS.labels('unknown').inc()
+        return _error('支付记录不存在')
+
+    if serializer.validated_data['result_code'] == 'SUCCESS':
+        updated = await sync_to_async(mark_paid)(out_trade_no, serializer.validated_data['transaction_id'])
+        observe_callback(updated, created_at)
+        return _json({'code': 'SUCCESS', 'message': '支付成功'})
+
+    PAYMENT_CALLBACKS.labels('fail').inc()
+    await Payment.objects.filter(out_trade_no=out_trade_no, status='pending').aupdate(status='failed')
+    return _json({'code': 'FAIL', 'message': '支付失败'})
+
+
+@_authenticated
+@require_GET
+async def query_status(request, user, pk):
+    """查询支付状态，微信支付待支付时向微信查询"""
+    try:
+        payment = await Payment.objects.select_related('order', 'user').aget(pk=pk, user=user)
+    except Payment.DoesNotExist:
+        return _json({'detail': '未找到。'}, status=404)
+
+    if payment.method == 'wechat' and payment.status == 'pending':
+        result = await AsyncWeChatPayClient().query_order(payment.out_trade_no)
+        if result['success'] and result['trade_state'] == 'SUCCESS':
+            if await sync_to_async(mark_paid)(payment.out_trade_no, result['transaction_id']):
+                # 只刷新普通字段，保留已加载的 order / user
+                await payment.arefresh_from_db(fields=['status', 'transaction_id', 'paid_at'])
+
+    return _json(PaymentSerializer(payment).data)
@@ -0,0 +1,143 @@
+import json
+import threading
+import time
+import urllib.request
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.utils.crypto import get_random_string
+
+from apps.order.models import Order
+from apps.payment.models import Payment
+from apps.shop.models import Shop
+from apps.user.models import User
+from jiuba.loadtest import REQUEST_ERRORS, gunicorn_server, percentile, run_concurrent
+
+# 对比的部署方式 -> gunicorn.conf.py 中的运行方案
+PROFILES = {'wsgi': 'sync', 'asgi': 'asgi'}
+
+UNIFIED_ORDER_RESPONSE = (
+    b'<xml><return_code>SUCCESS</return_code><result_code>SUCCESS</result_code>'
+    b'<prepay_id>wx_bench</prepay_id></xml>'
+)
+ORDER_QUERY_RESPONSE = (
+    b'<xml><return_code>SUCCESS</return_code><trade_state>SUCCESS</trade_state>'
+    b'<transaction_id>bench</transaction_id></xml>'
+)
+
+
+def start_fake_wechat(latency):
+    """模拟微信支付接口：每个请求等待 latency 秒后返回成功"""
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            time.sleep(latency)
+            body = UNIFIED_ORDER_RESPONSE if self.path.endswith('unifiedorder') else ORDER_QUERY_RESPONSE
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/xml')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class Command(BaseCommand):
+    help = (
+        '支付并发容量对比：分别以 gunicorn.conf.py 的 sync 方案（WSGI）和 asgi 方案（uvicorn worker + 异步支付视图）'
+        '启动服务，在模拟的微信支付接口延迟下并发发起“下单支付 + 查询支付状态”，比较吞吐和延迟'
+        '（需要安装 gunicorn / uvicorn，数据库需支持多进程访问，测试数据结束后删除）'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--checkouts', type=int, default=200, help='每种部署方式的支付次数')
+        parser.add_argument('--concurrency', type=int, default=50, help='并发客户端数')
+        parser.add_argument('--workers', type=int, default=2, help='gunicorn worker 数（相当于一个容器的配置）')
+        parser.add_argument('--latency', type=int, default=100, help='模拟微信接口延迟（毫秒）')
+        parser.add_argument('--modes', default='wsgi,asgi', help='要测试的部署方式，逗号分隔')
+
+    def handle(self, *args, **options):
+        modes = [mode.strip() for mode in options['modes'].split(',') if mode.strip()]
+        if set(modes) - set(PROFILES):
+            raise CommandError(f'部署方式可选：{", ".join(PROFILES)}')
+
+        upstream = start_fake_wechat(options['latency'] / 1000)
+        shop = Shop.objects.create(name='支付压测店铺')
+        user = User.objects.create(username=f'bench_payment_{get_random_string(8)}')
+        client = Client()
+        client.force_login(user)
+        self.session_id = client.cookies[settings.SESSION_COOKIE_NAME].value
+        self.csrf_token = get_random_string(32)
+
+        self.stdout.write(
+            f"微信接口延迟 {options['latency']}ms，{options['workers']} 个 worker，"
+            f"{options['concurrency']} 并发，每种方式 {options['checkouts']} 次支付"
+        )
+        self.stdout.write(f"{'部署方式':<12}{'成功':>8}{'失败':>8}{'用时(s)':>10}{'每秒':>10}{'P50(ms)':>10}{'P95(ms)':>10}")
+        try:
+            for mode in modes:
+                orders = Order.objects.bulk_create([
+                    Order(user=user, shop=shop, total_amount=10, payment_method='cash',
+                          is_paid=False, order_number=f'BENCH{mode}{get_random_string(12)}')
+                    for _ in range(options['checkouts'])
+                ])
+                self.measure(mode, [order.pk for order in orders], options, upstream.server_port)
+        finally:
+            upstream.shutdown()
+            Payment.objects.filter(user=user).delete()
+            user.delete()
+            shop.delete()
+
+    def measure(self, mode, order_ids, options, upstream_port):
+        env = {
+            'WECHAT_PAY_API_BASE': f'http://127.0.0.1:{upstream_port}',
+            'JIUBA_ASYNC_VIEWS': '1' if mode == 'asgi' else '0',
+        }
+        try:
+            with gunicorn_server(PROFILES[mode], options['workers'], env) as (base_url, _):
+                results, elapsed = run_concurrent(
+                    lambda order_id: self.checkout(base_url, order_id), order_ids, options['concurrency']
+                )
+        except RuntimeError as e:
+            raise CommandError(f'{mode}: {e}')
+
+        outcomes = Counter(ok for ok, _ in results)
+        latencies = [latency for ok, latency in results if ok]
+        self.stdout.write(
+            f"{mode:<12}{outcomes[True]:>8}{outcomes[False]:>8}{elapsed:>10.2f}"
+            f"{outcomes[True] / elapsed:>10.1f}{percentile(latencies, 0.5) * 1000:>10.0f}"
+            f"{percentile(latencies, 0.95) * 1000:>10.0f}"
+        )
+
+    def request(self, url, data=None):
+        headers = {
+            'Cookie': f'{settings.SESSION_COOKIE_NAME}={self.session_id}; {settings.CSRF_COOKIE_NAME}={self.csrf_token}',
+            'X-CSRFToken': self.csrf_token,
+        }
+        if data is not None:
+            data = json.dumps(data).encode()
+            headers['Content-Type'] = 'application/json'
+        with urllib.request.urlopen(urllib.request.Request(url, data=data, headers=headers), timeout=60) as response:
+            return json.loads(response.read())
+
+    def checkout(self, base_url, order_id):
+        """一次支付：微信下单，再查询支付状态（各调用一次微信接口），返回 (是否成功, 用时)"""
+        started = time.perf_counter()
+        try:
+            created = self.request(f'{base_url}/api/payment/create_payment/',
+                                   {'order_id': order_id, 'payment_method': 'wechat'})
+            status = self.request(f"{base_url}/api/payment/{created['payment_id']}/query_status/")
+        except REQUEST_ERRORS + (KeyError, ValueError):
+            return False, time.perf_counter() - started
+        return status.get('status') == 'success', time.perf_counter() - started
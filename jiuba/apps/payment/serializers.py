@@ -4,15 +4,7 @@ from .models import Payment
 class PaymentCreateSerializer(serializers.Serializer):
     order_id = serializers.IntegerField()
     payment_method = serializers.ChoiceField(choices=['wechat', 'balance'])
-
-    def validate_order_id(self, value):
-        from apps.order.models import Order
-        user = self.context['request'].user
-        try:
-            order = Order.objects.get(id=value, user=user, status='pending')
-        except Order.DoesNotExist:
-            raise serializers.ValidationError("订单不存在或不可支付")
-        return value
+    # 订单是否可支付由视图在查询订单时一并校验，这里不再单独查询
 
 class PaymentCallbackSerializer(serializers.Serializer):
     """微信支付回调数据（简化）"""
@@ -1,16 +1,63 @@
-import time
-import hashlib
 import random
+import time
+
 import requests
 from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 
+from apps.order.models import Order
+from jiuba.metrics import PAYMENT_CALLBACK_LAG, PAYMENT_CALLBACKS
+
+from . import wechat
+from .models import Payment
+
+# 复用到微信支付接口的连接
+_session = requests.Session()
+
+
+def generate_out_trade_no():
+    """生成商户订单号：毫秒时间戳 + 6 位随机数"""
+    return f"PAY{int(time.time() * 1000)}{random.randint(100000, 999999)}"
+
+
+def mark_paid(out_trade_no, transaction_id):
+    """
+    待支付记录标记为支付成功并更新订单，返回是否发生了状态变更
+    微信回调可能重复送达，与主动查询也可能同时发生，只有第一次生效
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        # 条件更新：只有仍为待支付的记录会被更新
+        updated = Payment.objects.filter(out_trade_no=out_trade_no, status='pending').update(
+            status='success', transaction_id=transaction_id, paid_at=now
+        )
+        if updated:
+            Order.objects.filter(payment__out_trade_no=out_trade_no).update(is_paid=True, paid_at=now)
+    return bool(updated)
+
+
+def payment_method_label(method):
+    """支付指标的 method 标签，未知的支付方式记为 invalid"""
+    return method if method in dict(Payment.PAYMENT_METHOD_CHOICES) else 'invalid'
+
+
+def observe_callback(updated, created_at):
+    """记录支付成功回调：首次生效时记录从创建支付到回调的时间，重复回调只计数"""
+    if updated:
+        PAYMENT_CALLBACKS.labels('success').inc()
+        PAYMENT_CALLBACK_LAG.observe((timezone.now() - created_at).total_seconds())
+    else:
+        PAYMENT_CALLBACKS.labels('duplicate').inc()
+
+
 class WeChatPayService:
     """
     微信支付服务类
     ---
-    **当前状态**：模拟版本，用于开发和测试
-    **切换正式**：取消注释正式代码，配置微信支付参数
+    **当前状态**：未配置 WECHAT_PAY_API_BASE 时为模拟版本，用于开发和测试
+    **切换正式**：配置 WECHAT_PAY_API_BASE 和微信支付参数（退款仍需取消注释正式代码）
+    **异步版本**：见 wechat.AsyncWeChatPayClient
     """
     
     def __init__(self):
@@ -24,89 +71,21 @@ class WeChatPayService:
         """
         微信支付统一下单
         ---
-        **模拟版本**：生成模拟支付参数，前端可正常调起支付界面
+        **模拟版本**：未配置 WECHAT_PAY_API_BASE 时生成模拟支付参数，前端可正常调起支付界面
         **正式版本**：调用微信支付API，需要商户证书和签名验证
         """
-        # ==================== 模拟代码（当前使用） ====================
+        if not wechat.api_base():
+            return wechat.mock_unified_order()
         try:
-            # 模拟生成预支付ID
-            prepay_id = f"wx{int(time.time())}{random.randint(1000, 9999)}"
-            
-            # 生成前端支付参数
-            pay_params = self._generate_pay_params(prepay_id)
-            return {
-                'success': True,
-                'payment_data': pay_params
-            }
-            
-        except Exception as e:
-            return {'success': False, 'error': f'微信支付下单失败: {str(e)}'}
-        
-        # ==================== 正式微信支付代码（需要时取消注释） ====================
-        """
-        try:
-            # 构造请求参数
-            params = {
-                'appid': self.appid,
-                'mch_id': self.mch_id,
-                'nonce_str': self._generate_nonce_str(),
-                'body': f'订单支付-{payment.order.id}',
-                'out_trade_no': payment.out_trade_no,
-                'total_fee': int(payment.amount * 100),  # 单位：分
-                'spbill_create_ip': self._get_client_ip(),
-                'notify_url': self.notify_url,
-                'trade_type': 'JSAPI',
-                'openid': payment.user.wechat_openid  # 需要用户有微信openid
-            }
-            
-            # 生成签名
-            params['sign'] = self._generate_real_sign(params)
-            
-            # 调用微信支付统一下单API
-            response = requests.post(
-                'https://api.mch.weixin.qq.com/pay/unifiedorder',
-                data=self._dict_to_xml(params),
+            response = _session.post(
+                wechat.api_url(wechat.UNIFIED_ORDER_PATH),
+                data=wechat.unified_order_request(payment),
                 headers={'Content-Type': 'application/xml'},
-                timeout=10
+                timeout=wechat.TIMEOUT
             )
-            
-            # 解析XML响应
-            result = self._xml_to_dict(response.content)
-            
-            if result.get('return_code') == 'SUCCESS' and result.get('result_code') == 'SUCCESS':
-                prepay_id = result['prepay_id']
-                pay_params = self._generate_pay_params(prepay_id)
-                return {
-                    'success': True,
-                    'payment_data': pay_params
-                }
-            else:
-                error_msg = result.get('return_msg') or result.get('err_code_des', '微信支付下单失败')
-                return {'success': False, 'error': error_msg}
-                
+            return wechat.unified_order_result(response.content)
         except Exception as e:
             return {'success': False, 'error': f'微信支付下单失败: {str(e)}'}
-        """
-    
-    def _generate_pay_params(self, prepay_id):
-        """生成前端支付参数"""
-        timestamp = str(int(time.time()))
-        nonce_str = self._generate_nonce_str()
-        
-        params = {
-            'appId': self.appid,
-            'timeStamp': timestamp,
-            'nonceStr': nonce_str,
-            'package': f'prepay_id={prepay_id}',
-            'signType': 'MD5'
-        }
-        
-        # 模拟签名
-        pay_sign = "模拟签名"
-        # 正式签名：pay_sign = self._generate_real_sign(params)
-        
-        params['paySign'] = pay_sign
-        return params
     
     def process_refund(self, payment, reason):
         """
@@ -167,81 +146,34 @@ class WeChatPayService:
         """
         查询订单支付状态
         """
-        # ==================== 模拟代码 ====================
-        return {
-            'success': True, 
-            'trade_state': 'SUCCESS', 
-            'transaction_id': f'trans{int(time.time())}'
-        }
-        
-        # ==================== 正式查询代码 ====================
-        """
+        if not wechat.api_base():
+            return wechat.mock_order_query()
         try:
-            params = {
-                'appid': self.appid,
-                'mch_id': self.mch_id,
-                'out_trade_no': out_trade_no,
-                'nonce_str': self._generate_nonce_str()
-            }
-            
-            params['sign'] = self._generate_real_sign(params)
-            
-            response = requests.post(
-                'https://api.mch.weixin.qq.com/pay/orderquery',
-                data=self._dict_to_xml(params),
+            response = _session.post(
+                wechat.api_url(wechat.ORDER_QUERY_PATH),
+                data=wechat.order_query_request(out_trade_no),
                 headers={'Content-Type': 'application/xml'},
                 timeout=5
             )
-            
-            result = self._xml_to_dict(response.content)
-            
-            if result.get('return_code') == 'SUCCESS':
-                return {
-                    'success': True,
-                    'trade_state': result.get('trade_state'),
-                    'transaction_id': result.get('transaction_id')
-                }
-            else:
-                return {'success': False, 'error': result.get('return_msg', '查询失败')}
-                
+            return wechat.order_query_result(response.content)
         except Exception as e:
             return {'success': False, 'error': f'查询失败: {str(e)}'}
-        """
     
     def _generate_real_sign(self, params):
         """正式微信支付签名生成"""
-        # 按照参数名ASCII字典序排序
-        sorted_params = sorted(params.items())
-        # 拼接成URL键值对格式
-        string_a = '&'.join([f"{k}={v}" for k, v in sorted_params if v and k != 'sign'])
-        # 拼接API密钥
-        string_sign_temp = f"{string_a}&key={self.api_key}"
-        # MD5加密并转大写
-        sign = hashlib.md5(string_sign_temp.encode('utf-8')).hexdigest().upper()
-        return sign
+        return wechat.sign(params, self.api_key)
     
     def _generate_nonce_str(self, length=32):
         """生成随机字符串"""
-        chars = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
-        return ''.join(random.choice(chars) for _ in range(length))
-    
-    def _get_client_ip(self):
-        """获取客户端IP（简化）"""
-        return '127.0.0.1'
+        return wechat.nonce_str(length)
     
     def _dict_to_xml(self, params):
         """字典转XML - 正式微信支付使用"""
-        xml = ['<xml>']
-        for k, v in params.items():
-            xml.append(f'<{k}><![CDATA[{v}]]></{k}>')
-        xml.append('</xml>')
-        return ''.join(xml)
+        return wechat.to_xml(params)
     
     def _xml_to_dict(self, xml_content):
         """XML转字典 - 正式微信支付使用"""
-        # 这里需要实现XML解析逻辑
-        # 可以使用xml.etree.ElementTree等库
-        return {'return_code': 'SUCCESS', 'prepay_id': '真实预支付ID'}
+        return wechat.from_xml(xml_content)
 
 
 class BalancePayService:
@@ -272,7 +204,8 @@ class BalancePayService:
                 
                 # 更新订单状态
                 order = payment.order
-                order.status = 'paid'
+                order.is_paid = True
+                order.paid_at = payment.paid_at
                 order.save()
                 
                 return {'success': True, 'message': '支付成功'}
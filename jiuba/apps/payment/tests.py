@@ -1,3 +1,146 @@
-from django.test import TestCase
+import base64
 
-# Create your tests here.
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import include, path
+from django.utils.crypto import get_random_string
+from rest_framework.test import APIClient
+
+from apps.order.models import Order
+from apps.shop.models import Shop
+from apps.user.models import User
+
+from . import wechat
+from .models import Payment
+from .urls import async_urlpatterns, router
+
+# 异步视图的测试路由：与 ASGI 部署（settings.ASYNC_VIEWS）时的 /api/payment/ 相同
+urlpatterns = [
+    path('api/payment/', include(async_urlpatterns + router.urls)),
+]
+
+CALLBACK_URL = '/api/payment/wechat_callback/'
+
+
+def signed(params):
+    return {**params, 'sign': wechat.sign(params, wechat.config()['api_key'])}
+
+
+class WeChatCallbackTests(TestCase):
+    """微信支付回调：不需要登录、不做 CSRF 校验，只认签名"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='buyer', password='secret')
+        self.order = Order.objects.create(
+            user=self.user, shop=Shop.objects.create(name='测试店铺'), payment_method='cash',
+            total_amount=88, is_paid=False,
+        )
+        self.payment = Payment.objects.create(
+            order=self.order, user=self.user, amount=88, method='wechat', out_trade_no='PAY1', status='pending',
+        )
+        self.client = APIClient(enforce_csrf_checks=True)
+        self.params = {'out_trade_no': 'PAY1', 'transaction_id': 'T1', 'result_code': 'SUCCESS'}
+
+    def post(self, data, **kwargs):
+        kwargs.setdefault('format', 'json')
+        return self.client.post(CALLBACK_URL, data, **kwargs)
+
+    def assertPaid(self, paid):
+        self.payment.refresh_from_db()
+        self.order.refresh_from_db()
+        self.assertEqual(self.payment.status, 'success' if paid else 'pending')
+        self.assertEqual(self.order.is_paid, paid)
+
+    def test_signed_callback_marks_paid_without_login(self):
+        response = self.post(signed(self.params))
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['code'], 'SUCCESS')
+        self.assertPaid(True)
+
+    def test_signed_xml_callback(self):
+        body = wechat.to_xml(signed({**self.params, 'return_code': 'SUCCESS'}))
+        response = self.client.post(CALLBACK_URL, body, content_type='application/xml')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertPaid(True)
+
+    def test_unsigned_callback_rejected_even_when_logged_in(self):
+        self.client.force_login(self.user)
+        response = self.post(self.params)
+        self.assertEqual(response.status_code, 400)
+        self.assertPaid(False)
+
+    def test_tampered_callback_rejected(self):
+        data = signed(self.params)
+        data['transaction_id'] = 'T2'
+        self.assertEqual(self.post(data).status_code, 400)
+        forged = {**self.params, 'sign': wechat.sign(self.params, 'another-key')}
+        self.assertEqual(self.post(forged).status_code, 400)
+        self.assertPaid(False)
+
+    def test_malformed_body_rejected(self):
+        response = self.client.post(CALLBACK_URL, b'{', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertPaid(False)
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncWeChatCallbackTests(WeChatCallbackTests):
+    """ASGI 部署下的异步回调视图，校验规则相同"""
+
+
+class PaymentAuthenticationTests(TestCase):
+    """支付接口按 DRF 的认证方式登录：会话（需 CSRF token）与 Basic 认证"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='buyer', password='secret')
+        self.order = Order.objects.create(
+            user=self.user, shop=Shop.objects.create(name='测试店铺'), payment_method='cash',
+            total_amount=88, is_paid=False,
+        )
+        self.client = APIClient(enforce_csrf_checks=True)
+
+    def create_payment(self, **extra):
+        return self.client.post(
+            '/api/payment/create_payment/', {'order_id': self.order.id, 'payment_method': 'wechat'},
+            format='json', **extra
+        )
+
+    def test_anonymous_rejected(self):
+        self.assertEqual(self.create_payment().status_code, 403)
+        self.assertFalse(Payment.objects.exists())
+
+    def test_session_requires_csrf_token(self):
+        self.client.login(username='buyer', password='secret')
+        self.assertEqual(self.create_payment().status_code, 403)
+
+        token = get_random_string(32)
+        self.client.cookies[settings.CSRF_COOKIE_NAME] = token
+        response = self.create_payment(HTTP_X_CSRFTOKEN=token)
+        self.assertEqual(response.status_code, 200, response.content)
+
+        payment = Payment.objects.get(order=self.order)
+        response = self.client.get(f'/api/payment/{payment.id}/query_status/')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['out_trade_no'], payment.out_trade_no)
+
+    def test_basic_auth(self):
+        credentials = base64.b64encode(b'buyer:secret').decode()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Basic {credentials}')
+        response = self.create_payment()
+        self.assertEqual(response.status_code, 200, response.content)
+
+        payment = Payment.objects.get(order=self.order)
+        self.assertEqual(payment.user, self.user)
+        self.assertEqual(self.client.get(f'/api/payment/{payment.id}/query_status/').status_code, 200)
+
+    def test_basic_auth_wrong_password(self):
+        credentials = base64.b64encode(b'buyer:wrong').decode()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Basic {credentials}')
+        # 第一个认证类是会话认证（没有 WWW-Authenticate），DRF 返回 403
+        self.assertEqual(self.create_payment().status_code, 403)
+        self.assertFalse(Payment.objects.exists())
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncPaymentAuthenticationTests(PaymentAuthenticationTests):
+    """异步视图的认证结果与 PaymentViewSet 相同"""
@@ -1,10 +1,21 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
+from . import async_views, views
 
 router = DefaultRouter()
 router.register(r'', views.PaymentViewSet, basename='payment')
 
+# ASGI 部署时调用微信接口的动作改用异步视图，排在路由器之前优先匹配
+async_urlpatterns = [
+    path('create_payment/', async_views.create_payment, name='payment-create-payment'),
+    path('wechat_callback/', async_views.wechat_callback, name='payment-wechat-callback'),
+    path('<int:pk>/query_status/', async_views.query_status, name='payment-query-status'),
+]
+
 urlpatterns = [
     path('', include(router.urls)),
-]
\ No newline at end of file
+]
+
+if settings.ASYNC_VIEWS:
+    urlpatterns = async_urlpatterns + urlpatterns
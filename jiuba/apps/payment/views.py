@@ -1,17 +1,19 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from django.utils import timezone
-import time
-import random
 from .models import Payment
 from .serializers import (
     PaymentCreateSerializer, PaymentCallbackSerializer, 
     RefundSerializer, PaymentSerializer
 )
-from .services import WeChatPayService, BalancePayService
+from .services import (
+    WeChatPayService, BalancePayService, generate_out_trade_no, mark_paid, observe_callback, payment_method_label
+)
+from . import wechat
 from apps.order.models import Order
+from jiuba.metrics import PAYMENT_CALLBACKS, PAYMENTS
 
 class PaymentViewSet(viewsets.ModelViewSet):
     """
@@ -39,6 +41,14 @@ class PaymentViewSet(viewsets.ModelViewSet):
         """
         创建支付订单
         """
+        response = self._create_payment(request)
+        PAYMENTS.labels(
+            payment_method_label(request.data.get('payment_method')),
+            'success' if response.status_code == status.HTTP_200_OK else 'failure'
+        ).inc()
+        return response
+    
+    def _create_payment(self, request):
         serializer = self.get_serializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -47,7 +57,7 @@ class PaymentViewSet(viewsets.ModelViewSet):
         payment_method = serializer.validated_data['payment_method']
         
         try:
-            order = Order.objects.get(id=order_id, user=request.user, status='pending')
+            order = Order.objects.get(id=order_id, user=request.user, is_paid=False)
             
             # 检查是否已存在支付记录
             if hasattr(order, 'payment'):
@@ -119,56 +129,54 @@ class PaymentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
     
-    @action(detail=False, methods=['post'])
+    @action(detail=False, methods=['post'], permission_classes=[AllowAny], authentication_classes=[])
     def wechat_callback(self, request):
         """
         微信支付回调接口
         ---
-        **模拟版本**：使用JSON格式接收回调数据
-        **正式版本**：微信支付会发送XML格式数据，需要解析XML并验证签名
+        由微信支付服务器调用，不需要登录（也就不做 CSRF 校验），
+        但参数必须带有用 WECHAT_API_KEY 计算的 sign，签名不符的请求一律拒绝。
+        正式回调为 XML 格式，模拟回调也可以提交 JSON
         """
-        serializer = self.get_serializer(data=request.data)
+        params = wechat.callback_params(request.body, request.content_type)
+        if params is None or not wechat.verify_signature(params):
+            PAYMENT_CALLBACKS.labels('invalid').inc()
+            return Response({"error": "回调签名校验失败"}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = self.get_serializer(data=params)
         if not serializer.is_valid():
+            PAYMENT_CALLBACKS.labels('invalid').inc()
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
         out_trade_no = serializer.validated_data['out_trade_no']
         transaction_id = serializer.validated_data['transaction_id']
         result_code = serializer.validated_data['result_code']
         
-        try:
-            payment = Payment.objects.get(out_trade_no=out_trade_no)
-            
-            if result_code == 'SUCCESS':
-                # 支付成功
-                payment.status = 'success'
-                payment.transaction_id = transaction_id
-                payment.paid_at = timezone.now()
-                payment.save()
-                
-                # 更新订单状态
-                order = payment.order
-                order.status = 'paid'
-                order.save()
-                
-                # ========== 正式微信支付回调返回格式 ==========
-                # 正式版本需要返回XML格式：
-                # return Response(
-                #     '<xml><return_code><![CDATA[SUCCESS]]></return_code><return_msg><![CDATA[OK]]></return_msg></xml>',
-                #     content_type='application/xml'
-                # )
-                
-                return Response({'code': 'SUCCESS', 'message': '支付成功'})
-            else:
-                # 支付失败
-                payment.status = 'failed'
-                payment.save()
-                return Response({'code': 'FAIL', 'message': '支付失败'})
-                
-        except Payment.DoesNotExist:
+        created_at = Payment.objects.filter(out_trade_no=out_trade_no).values_list('created_at', flat=True).first()
+        if created_at is None:
+            PAYMENT_CALLBACKS.labels('unknown').inc()
             return Response(
                 {"error": "支付记录不存在"},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        
+        if result_code == 'SUCCESS':
+            # 支付成功，同时更新订单状态（重复回调不会重复处理）
+            observe_callback(mark_paid(out_trade_no, transaction_id), created_at)
+            
+            # ========== 正式微信支付回调返回格式 ==========
+            # 正式版本需要返回XML格式：
+            # return Response(
+            #     '<xml><return_code><![CDATA[SUCCESS]]></return_code><return_msg><![CDATA[OK]]></return_msg></xml>',
+            #     content_type='application/xml'
+            # )
+            
+            return Response({'code': 'SUCCESS', 'message': '支付成功'})
+        else:
+            # 支付失败
+            PAYMENT_CALLBACKS.labels('fail').inc()
+            Payment.objects.filter(out_trade_no=out_trade_no, status='pending').update(status='failed')
+            return Response({'code': 'FAIL', 'message': '支付失败'})
     
     @action(detail=False, methods=['post'])
     def refund(self, request):
@@ -234,21 +242,13 @@ class PaymentViewSet(viewsets.ModelViewSet):
             wechat_service = WeChatPayService()
             query_result = wechat_service.query_order(payment.out_trade_no)
             if query_result['success'] and query_result['trade_state'] == 'SUCCESS':
-                payment.status = 'success'
-                payment.transaction_id = query_result['transaction_id']
-                payment.paid_at = timezone.now()
-                payment.save()
-                
-                # 更新订单状态
-                order = payment.order
-                order.status = 'paid'
-                order.save()
+                # 同时更新订单状态
+                if mark_paid(payment.out_trade_no, query_result['transaction_id']):
+                    payment.refresh_from_db()
         
         serializer = self.get_serializer(payment)
         return Response(serializer.data)
     
     def _generate_out_trade_no(self):
         """生成商户订单号"""
-        timestamp = str(int(time.time()))
-        random_str = str(random.randint(1000, 9999))
-        return f"PAY{timestamp}{random_str}"
\ No newline at end of file
+        return generate_out_trade_no()
\ No newline at end of file
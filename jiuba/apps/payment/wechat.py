@@ -0,0 +1,203 @@
+"""
+微信支付 API 协议与异步客户端
+
+签名、XML 编解码、请求参数和结果解析由同步的 WeChatPayService（services.py）
+与异步的 AsyncWeChatPayClient 共用。WECHAT_PAY_API_BASE 为空时两者都返回模拟结果，
+不发起网络请求。
+
+异步客户端使用 httpx.AsyncClient，每个事件循环一个连接池：
+ASGI 部署下等待微信接口期间 worker 可以继续处理其它请求。
+"""
+import asyncio
+import hashlib
+import json
+import random
+import time
+import weakref
+import xml.etree.ElementTree as ElementTree
+
+import httpx
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
+
+UNIFIED_ORDER_PATH = '/pay/unifiedorder'
+ORDER_QUERY_PATH = '/pay/orderquery'
+TIMEOUT = 10
+
+NONCE_CHARS = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+
+
+def api_base():
+    return getattr(settings, 'WECHAT_PAY_API_BASE', '').rstrip('/')
+
+
+def api_url(path):
+    return api_base() + path
+
+
+def config():
+    return {
+        'appid': getattr(settings, 'WECHAT_APP_ID', 'wx_your_appid'),
+        'mch_id': getattr(settings, 'WECHAT_MCH_ID', '1230000109'),
+        'api_key': getattr(settings, 'WECHAT_API_KEY', 'your_api_key_here'),
+        'notify_url': getattr(settings, 'WECHAT_NOTIFY_URL', ''),
+    }
+
+
+def nonce_str(length=32):
+    return ''.join(random.choice(NONCE_CHARS) for _ in range(length))
+
+
+def sign(params, api_key):
+    """MD5 签名：参数按键名排序拼接，末尾拼接 API 密钥"""
+    string_a = '&'.join(f'{k}={v}' for k, v in sorted(params.items()) if v and k != 'sign')
+    return hashlib.md5(f'{string_a}&key={api_key}'.encode('utf-8')).hexdigest().upper()
+
+
+def to_xml(params):
+    return ''.join(
+        ['<xml>'] + [f'<{k}><![CDATA[{v}]]></{k}>' for k, v in params.items()] + ['</xml>']
+    ).encode('utf-8')
+
+
+def from_xml(content):
+    try:
+        root = ElementTree.fromstring(content)
+    except ElementTree.ParseError:
+        return {}
+    return {child.tag: child.text or '' for child in root}
+
+
+def callback_params(body, content_type):
+    """
+    支付回调参数：微信支付以 XML 提交，模拟回调和测试可以提交 JSON；
+    格式错误时返回 None
+    """
+    if content_type.split(';')[0].strip() in ('application/xml', 'text/xml'):
+        return from_xml(body) or None
+    try:
+        params = json.loads(body or b'{}')
+    except ValueError:
+        return None
+    return params if isinstance(params, dict) else None
+
+
+def verify_signature(params):
+    """回调参数的 sign 与用 WECHAT_API_KEY 计算的签名一致"""
+    signature = params.get('sign')
+    if not isinstance(signature, str) or not signature:
+        return False
+    return constant_time_compare(signature, sign(params, config()['api_key']))
+
+
+def _signed(params):
+    params['sign'] = sign(params, config()['api_key'])
+    return params
+
+
+def unified_order_request(payment):
+    cfg = config()
+    return to_xml(_signed({
+        'appid': cfg['appid'],
+        'mch_id': cfg['mch_id'],
+        'nonce_str': nonce_str(),
+        'body': f'订单支付-{payment.order_id}',
+        'out_trade_no': payment.out_trade_no,
+        'total_fee': int(payment.amount * 100),  # 单位：分
+        'spbill_create_ip': '127.0.0.1',
+        'notify_url': cfg['notify_url'],
+        'trade_type': 'JSAPI',
+        # 尚未接入微信登录，暂以用户名代替 openid
+        'openid': payment.user.username,
+    }))
+
+
+def order_query_request(out_trade_no):
+    cfg = config()
+    return to_xml(_signed({
+        'appid': cfg['appid'],
+        'mch_id': cfg['mch_id'],
+        'out_trade_no': out_trade_no,
+        'nonce_str': nonce_str(),
+    }))
+
+
+def pay_params(prepay_id):
+    """小程序调起支付的参数"""
+    params = {
+        'appId': config()['appid'],
+        'timeStamp': str(int(time.time())),
+        'nonceStr': nonce_str(),
+        'package': f'prepay_id={prepay_id}',
+        'signType': 'MD5',
+    }
+    params['paySign'] = sign(params, config()['api_key']) if api_base() else '模拟签名'
+    return params
+
+
+def unified_order_result(content):
+    result = from_xml(content)
+    if result.get('return_code') == 'SUCCESS' and result.get('result_code') == 'SUCCESS':
+        return {'success': True, 'payment_data': pay_params(result['prepay_id'])}
+    error = result.get('return_msg') or result.get('err_code_des') or '微信支付下单失败'
+    return {'success': False, 'error': error}
+
+
+def order_query_result(content):
+    result = from_xml(content)
+    if result.get('return_code') == 'SUCCESS':
+        return {
+            'success': True,
+            'trade_state': result.get('trade_state'),
+            'transaction_id': result.get('transaction_id'),
+        }
+    return {'success': False, 'error': result.get('return_msg', '查询失败')}
+
+
+def mock_unified_order():
+    prepay_id = f'wx{int(time.time())}{random.randint(1000, 9999)}'
+    return {'success': True, 'payment_data': pay_params(prepay_id)}
+
+
+def mock_order_query():
+    return {'success': True, 'trade_state': 'SUCCESS', 'transaction_id': f'trans{int(time.time())}'}
+
+
+# 事件循环 -> httpx.AsyncClient，循环结束后自动释放
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client():
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = httpx.AsyncClient(
+            timeout=TIMEOUT, headers={'Content-Type': 'application/xml'}
+        )
+    return client
+
+
+class AsyncWeChatPayClient:
+    """WeChatPayService 的异步版本，payment 需已加载 user"""
+
+    async def unified_order(self, payment):
+        if not api_base():
+            return mock_unified_order()
+        try:
+            response = await get_async_client().post(
+                api_url(UNIFIED_ORDER_PATH), content=unified_order_request(payment)
+            )
+            return unified_order_result(response.content)
+        except Exception as e:
+            return {'success': False, 'error': f'微信支付下单失败: {str(e)}'}
+
+    async def query_order(self, out_trade_no):
+        if not api_base():
+            return mock_order_query()
+        try:
+            response = await get_async_client().post(
+                api_url(ORDER_QUERY_PATH), content=order_query_request(out_trade_no), timeout=5
+            )
+            return order_query_result(response.content)
+        except Exception as e:
+            return {'success': False, 'error': f'查询失败: {str(e)}'}
@@ -1,6 +1,8 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from .models import Category, Product
+from .facets import invalidate_facets
+from apps.shop.menu import schedule_menu_rebuild
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -106,18 +108,26 @@ class ProductAdmin(admin.ModelAdmin):
             return format_html('<span style="color: #95a5a6;">不支持积分</span>')
     points_status.short_description = '积分状态'
 
+    def products_changed(self, queryset):
+        """批量 update 不触发信号，手动刷新分面缓存和菜单快照"""
+        shop_ids = list(queryset.values_list('shop_id', flat=True).distinct())
+        invalidate_facets(*shop_ids)
+        schedule_menu_rebuild(*shop_ids)
+
     # 自定义actions
     actions = ['make_published', 'make_draft', 'toggle_availability', 'enable_points', 'disable_points']
     
     def make_published(self, request, queryset):
         """批量上架商品"""
         updated = queryset.update(status='published')
+        self.products_changed(queryset)
         self.message_user(request, f'{updated}个商品已上架')
     make_published.short_description = "上架选中的商品"
     
     def make_draft(self, request, queryset):
         """批量下架商品"""
         updated = queryset.update(status='draft')
+        self.products_changed(queryset)
         self.message_user(request, f'{updated}个商品已下架')
     make_draft.short_description = "下架选中的商品"
     
@@ -141,5 +151,6 @@ class ProductAdmin(admin.ModelAdmin):
     def disable_points(self, request, queryset):
         """禁用积分购买"""
         updated = queryset.update(points_price=0, original_points_price=0)
+        self.products_changed(queryset)
         self.message_user(request, f'{updated}个商品已禁用积分购买')
     disable_points.short_description = "禁用积分购买"
\ No newline at end of file
@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class ProductConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.product'
-    verbose_name = '商品管理'
\ No newline at end of file
+    verbose_name = '商品管理'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,88 @@
+"""
+商品分面统计（分类数量、价格区间、库存情况）
+
+一个店铺的全部分面通过一条 GROUP BY category 的聚合查询得到，
+价格区间和库存用条件 Count 在同一条查询里计算，结果按店铺缓存。
+"""
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .models import Product
+
+# 区间为 [min, max)，max 为 None 表示无上限
+PRICE_BUCKETS = [(0, 20), (20, 50), (50, 100), (100, 200), (200, None)]
+# 积分价格为 0 表示不支持积分购买，单独统计
+POINTS_BUCKETS = [(1, 100), (100, 500), (500, 1000), (1000, None)]
+
+CACHE_TIMEOUT = 60 * 10
+
+
+def _cache_key(shop_id):
+    return f'product_facets:{shop_id}'
+
+
+def _bucket_filter(field, low, high):
+    condition = Q(**{f'{field}__gte': low})
+    if high is not None:
+        condition &= Q(**{f'{field}__lt': high})
+    return condition
+
+
+def build_facets(shop_id):
+    """查询数据库生成分面统计（单条聚合查询）"""
+    aggregates = {
+        'count': Count('id'),
+        'in_stock': Count('id', filter=Q(stock_quantity__gt=0)),
+        'no_points': Count('id', filter=Q(points_price=0)),
+    }
+    for index, (low, high) in enumerate(PRICE_BUCKETS):
+        aggregates[f'price_{index}'] = Count('id', filter=_bucket_filter('price', low, high))
+    for index, (low, high) in enumerate(POINTS_BUCKETS):
+        aggregates[f'points_{index}'] = Count('id', filter=_bucket_filter('points_price', low, high))
+
+    rows = list(
+        Product.objects.filter(shop_id=shop_id, status='published', is_available=True)
+        .values('category_id', 'category__name')
+        .annotate(**aggregates)
+        .order_by()  # 清除默认排序，避免排序字段进入 GROUP BY
+    )
+
+    def total(key):
+        return sum(row[key] for row in rows)
+
+    return {
+        'shop_id': int(shop_id),
+        'total': total('count'),
+        'categories': sorted(
+            (
+                {'id': row['category_id'], 'name': row['category__name'] or '未分类', 'count': row['count']}
+                for row in rows
+            ),
+            key=lambda item: -item['count'],
+        ),
+        'price': [
+            {'min': low, 'max': high, 'count': total(f'price_{index}')}
+            for index, (low, high) in enumerate(PRICE_BUCKETS)
+        ],
+        'points_price': [{'min': 0, 'max': 0, 'count': total('no_points')}] + [
+            {'min': low, 'max': high, 'count': total(f'points_{index}')}
+            for index, (low, high) in enumerate(POINTS_BUCKETS)
+        ],
+        'availability': {
+            'in_stock': total('in_stock'),
+            'out_of_stock': total('count') - total('in_stock'),
+        },
+    }
+
+
+def get_facets(shop_id):
+    """读取缓存的分面统计，未命中时重新计算"""
+    facets = cache.get(_cache_key(shop_id))
+    if facets is None:
+        facets = build_facets(shop_id)
+        cache.set(_cache_key(shop_id), facets, CACHE_TIMEOUT)
+    return facets
+
+
+def invalidate_facets(*shop_ids):
+    cache.delete_many([_cache_key(shop_id) for shop_id in shop_ids])
@@ -1,5 +1,6 @@
 import django_filters
 from .models import Product
+from apps.search.index import apply_search
 
 class ProductFilter(django_filters.FilterSet):
     min_price = django_filters.NumberFilter(field_name="price", lookup_expr='gte')
@@ -7,6 +8,9 @@ class ProductFilter(django_filters.FilterSet):
     category = django_filters.NumberFilter(field_name='category_id')
     shop = django_filters.NumberFilter(field_name='shop_id')
     in_stock = django_filters.BooleanFilter(method='filter_in_stock')
+    # 保留原有参数名，改为走搜索索引（按字段限定）
+    name__icontains = django_filters.CharFilter(field_name='name', method='filter_indexed_text')
+    description__icontains = django_filters.CharFilter(field_name='description', method='filter_indexed_text')
 
     
     class Meta:
@@ -16,8 +20,6 @@ class ProductFilter(django_filters.FilterSet):
             'shop_id': ['exact'],
             'status': ['exact'],
             'is_available': ['exact'],
-            'name': ['icontains'],
-            'description': ['icontains'],
         }
 
     def filter_in_stock(self, queryset, name, value):
@@ -27,4 +29,8 @@ class ProductFilter(django_filters.FilterSet):
             return queryset.filter(stock_quantity__gt=0)
         else:
             # in_stock=false: 库存等于0
-            return queryset.filter(stock_quantity=0)
\ No newline at end of file
+            return queryset.filter(stock_quantity=0)
+
+    def filter_indexed_text(self, queryset, name, value):
+        """按单个字段的索引搜索"""
+        return apply_search(queryset, value, fields=[name])
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Category, Product
+from jiuba.images import ImageDerivativesField
 
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -9,6 +10,7 @@ class CategorySerializer(serializers.ModelSerializer):
 class ProductSerializer(serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
     shop_name = serializers.CharField(source='shop.name', read_only=True)
+    image_thumbnails = ImageDerivativesField(source='image')
     
     class Meta:
         model = Product
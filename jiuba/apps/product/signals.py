@@ -0,0 +1,39 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from jiuba.images import schedule_derivatives
+
+from .facets import invalidate_facets
+from .models import Category, Product
+
+
+@receiver([pre_save, pre_delete], sender=Product, dispatch_uid='product_remember_shop')
+def remember_stored_shop(sender, instance, raw=False, **kwargs):
+    """记下数据库中原来的店铺：商品换店时，旧店铺的分面和菜单缓存也要失效"""
+    if raw or instance.pk is None:
+        instance._stored_shop_id = None
+    else:
+        instance._stored_shop_id = Product.objects.filter(pk=instance.pk).values_list('shop_id', flat=True).first()
+
+
+def affected_shop_ids(instance):
+    """商品保存 / 删除影响的店铺：当前店铺和数据库中原来的店铺"""
+    return {shop_id for shop_id in (instance.shop_id, getattr(instance, '_stored_shop_id', None)) if shop_id}
+
+
+@receiver([post_save, post_delete], sender=Product, dispatch_uid='product_invalidate_facets')
+def product_changed(sender, instance, **kwargs):
+    invalidate_facets(*affected_shop_ids(instance))
+
+
+@receiver([post_save, pre_delete], sender=Category, dispatch_uid='category_invalidate_facets')
+def category_changed(sender, instance, **kwargs):
+    """分类改名会影响分面里的名称，清除使用该分类的店铺缓存"""
+    shop_ids = Product.objects.filter(category=instance).values_list('shop_id', flat=True).distinct()
+    invalidate_facets(*shop_ids)
+
+
+@receiver(post_save, sender=Product, dispatch_uid='product_image_derivatives')
+def product_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_derivatives(instance.image)
@@ -1,3 +1,58 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 
-# Create your tests here.
+from apps.shop.models import Shop
+
+from .facets import get_facets
+from .models import Category, Product
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE, BACKGROUND_TASK_WORKERS=0)
+class FacetInvalidationTests(TestCase):
+    """商品和分类变更后，受影响店铺的分面缓存失效"""
+
+    def setUp(self):
+        cache.clear()
+        self.shop = Shop.objects.create(name='本店')
+        self.other_shop = Shop.objects.create(name='他店')
+        self.category = Category.objects.create(name='精酿')
+        self.product = self.create(name='招牌IPA', price=38)
+
+    def create(self, **fields):
+        fields.setdefault('shop', self.shop)
+        return Product.objects.create(category=self.category, status='published', **fields)
+
+    def categories(self, shop):
+        return [(row['name'], row['count']) for row in get_facets(shop.pk)['categories']]
+
+    def test_create_and_edit(self):
+        self.assertEqual(self.categories(self.shop), [('精酿', 1)])
+        self.create(name='海盐拉格', price=120)
+        self.assertEqual(get_facets(self.shop.pk)['total'], 2)
+
+        self.product.price = 250
+        self.product.save()
+        prices = {(row['min'], row['max']): row['count'] for row in get_facets(self.shop.pk)['price']}
+        self.assertEqual(prices[(20, 50)], 0)
+        self.assertEqual(prices[(200, None)], 1)
+
+    def test_move_between_shops(self):
+        self.assertEqual(self.categories(self.shop), [('精酿', 1)])
+        self.assertEqual(self.categories(self.other_shop), [])
+        self.product.shop = self.other_shop
+        self.product.save()
+        self.assertEqual(self.categories(self.shop), [])
+        self.assertEqual(self.categories(self.other_shop), [('精酿', 1)])
+
+    def test_delete(self):
+        self.assertEqual(get_facets(self.shop.pk)['total'], 1)
+        self.product.delete()
+        self.assertEqual(get_facets(self.shop.pk)['total'], 0)
+
+    def test_category_renamed(self):
+        self.assertEqual(self.categories(self.shop), [('精酿', 1)])
+        self.category.name = '精酿啤酒'
+        self.category.save()
+        self.assertEqual(self.categories(self.shop), [('精酿啤酒', 1)])
@@ -1,11 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CategoryViewSet, ProductViewSet
+from .views import CategoryViewSet, ProductViewSet, ProductFacetView
 
 router = DefaultRouter()
 router.register(r'categories', CategoryViewSet)
 router.register(r'product', ProductViewSet)
 
 urlpatterns = [
+    path('facets/', ProductFacetView.as_view(), name='product-facets'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,10 +1,13 @@
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import Product, Category
 from .serializers import ProductSerializer, CategorySerializer
 from .filters import ProductFilter
+from .facets import get_facets
+from apps.search.filters import IndexedSearchFilter
 
 class CategoryViewSet(viewsets.ModelViewSet):
     """商品分类视图集"""
@@ -16,7 +19,7 @@ class ProductViewSet(viewsets.ModelViewSet):
     """商品视图集"""
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, IndexedSearchFilter]
     filterset_class = ProductFilter  # 使用新的过滤器
     search_fields = ['name', 'description']
     ordering_fields = ['price', 'created_at', 'sort_order']
@@ -24,7 +27,7 @@ class ProductViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """默认只返回已发布的商品"""
-        queryset = super().get_queryset()
+        queryset = super().get_queryset().select_related('category', 'shop')
         return queryset.filter(status='published', is_available=True)
     
     @action(detail=True, methods=['post'])
@@ -53,4 +56,20 @@ class ProductViewSet(viewsets.ModelViewSet):
             return self.get_paginated_response(serializer.data)
         
         serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(serializer.data)
+
+
+class ProductFacetView(APIView):
+    """
+    商品分面统计：分类数量、现金/积分价格区间、库存情况
+    GET /api/product/facets/?shop_id=1
+    """
+
+    def get(self, request):
+        shop_id = request.query_params.get('shop_id')
+        if not shop_id or not shop_id.isdigit():
+            return Response(
+                {"error": "请提供有效的shop_id参数"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(get_facets(int(shop_id)))
@@ -1,7 +1,9 @@
 # apps/reservation/admin.py
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Reservation
+from .models import Reservation, WaitlistEntry
+from .capacity import recount
+from .waitlist import promote_waiting
 
 @admin.register(Reservation)
 class ReservationAdmin(admin.ModelAdmin):
@@ -80,20 +82,50 @@ class ReservationAdmin(admin.ModelAdmin):
         )
     action_buttons.short_description = '操作'
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # 后台直接修改状态/活动时校正名额计数（包括原活动）
+        activity_ids = [obj.activity_id]
+        if form.initial.get('activity'):
+            activity_ids.append(form.initial['activity'])
+        recount(*activity_ids)
+        for activity_id in activity_ids:
+            promote_waiting(activity_id)
+
+    def update_status(self, queryset, status):
+        activity_ids = list(queryset.values_list('activity_id', flat=True).distinct())
+        updated = queryset.update(status=status)
+        recount(*activity_ids)
+        # 释放出的名额按顺序转给候补用户
+        for activity_id in activity_ids:
+            promote_waiting(activity_id)
+        return updated
+
     # 自定义actions
     actions = ['mark_as_confirmed', 'mark_as_completed', 'mark_as_cancelled']
     
     def mark_as_confirmed(self, request, queryset):
-        updated = queryset.update(status='confirmed')
+        updated = self.update_status(queryset, 'confirmed')
         self.message_user(request, f'{updated}个预约已标记为已确认')
     mark_as_confirmed.short_description = "标记为已确认"
     
     def mark_as_completed(self, request, queryset):
-        updated = queryset.update(status='completed')
+        updated = self.update_status(queryset, 'completed')
         self.message_user(request, f'{updated}个预约已标记为已完成')
     mark_as_completed.short_description = "标记为已完成"
     
     def mark_as_cancelled(self, request, queryset):
-        updated = queryset.update(status='cancelled')
+        updated = self.update_status(queryset, 'cancelled')
         self.message_user(request, f'{updated}个预约已标记为已取消')
-    mark_as_cancelled.short_description = "标记为已取消"
\ No newline at end of file
+    mark_as_cancelled.short_description = "标记为已取消"
+
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'activity', 'contact_phone', 'status', 'created_at', 'promoted_at']
+    list_filter = ['status', 'activity__shop']
+    search_fields = ['user__username', 'activity__title', 'contact_phone']
+    list_select_related = ['user', 'activity']
+    readonly_fields = ['reservation', 'created_at', 'promoted_at']
+    raw_id_fields = ['user', 'activity']
+
@@ -0,0 +1,42 @@
+"""
+活动名额控制
+
+Activity.confirmed_count 记录已占用名额（已确认 + 已完成的预约）。
+占位使用带条件的 UPDATE（confirmed_count < max_participants），由数据库保证原子性，
+与预约记录的插入放在同一个事务中，避免先查后写导致的超额预约。
+"""
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from apps.activity.models import Activity
+
+from .models import Reservation
+
+# 占用名额的预约状态
+HOLDING_STATUSES = ('confirmed', 'completed')
+
+
+def admit(activity_id, seats=1):
+    """尝试占用名额，成功返回 True；名额不足返回 False（需在事务中调用）"""
+    updated = Activity.objects.filter(pk=activity_id).filter(
+        Q(max_participants__isnull=True) |
+        Q(confirmed_count__lte=F('max_participants') - seats)
+    ).update(confirmed_count=F('confirmed_count') + seats)
+    return updated == 1
+
+
+def release(activity_id, seats=1):
+    """释放名额，计数不足时减到 0"""
+    Activity.objects.filter(pk=activity_id).update(
+        confirmed_count=Greatest(F('confirmed_count') - seats, 0)
+    )
+
+
+def recount(*activity_ids):
+    """按预约记录重新统计名额（批量修改预约状态后校正计数）"""
+    counts = Reservation.objects.filter(
+        activity=OuterRef('pk'), status__in=HOLDING_STATUSES
+    ).order_by().values('activity').annotate(total=Count('id')).values('total')
+    Activity.objects.filter(pk__in=activity_ids).update(
+        confirmed_count=Coalesce(Subquery(counts), 0)
+    )
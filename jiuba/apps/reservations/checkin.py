@@ -0,0 +1,77 @@
+"""
+二维码核销
+
+每个已确认的预约签发一个紧凑令牌：预约 ID、店铺 ID（均为 64 位主键）、过期时间（活动结束时间）
+打包为 20 字节，附 10 字节 HMAC-SHA256 截断签名，base64url 后 40 个字符，
+二维码内容为 QR_PREFIX + 令牌。
+门口扫码时先验证签名和有效期（纯计算，不查库），再用一条按主键的条件更新完成核销。
+"""
+import base64
+import binascii
+import hmac
+import struct
+import time
+
+from django.utils.crypto import salted_hmac
+
+from .models import Reservation
+
+QR_PREFIX = 'JB1:'
+KEY_SALT = 'apps.reservations.checkin'
+SIGNATURE_BYTES = 10
+PAYLOAD = struct.Struct('>QQI')
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def _sign(payload):
+    return salted_hmac(KEY_SALT, payload, algorithm='sha256').digest()[:SIGNATURE_BYTES]
+
+
+def make_token(reservation):
+    """为预约签发核销令牌（需要 activity.end_time，不查库时请 select_related('activity')）"""
+    payload = PAYLOAD.pack(
+        reservation.pk, reservation.shop_id, int(reservation.activity.end_time.timestamp())
+    )
+    return _b64encode(payload + _sign(payload))
+
+
+def qr_payload(reservation):
+    return QR_PREFIX + make_token(reservation)
+
+
+def verify_token(token, now=None):
+    """校验令牌，返回 (reservation_id, shop_id)；签名错误或已过期时抛出 InvalidToken"""
+    if token.startswith(QR_PREFIX):
+        token = token[len(QR_PREFIX):]
+    try:
+        raw = _b64decode(token)
+    except (binascii.Error, ValueError):
+        raise InvalidToken('令牌格式错误')
+    if len(raw) != PAYLOAD.size + SIGNATURE_BYTES:
+        raise InvalidToken('令牌格式错误')
+
+    payload, signature = raw[:PAYLOAD.size], raw[PAYLOAD.size:]
+    if not hmac.compare_digest(signature, _sign(payload)):
+        raise InvalidToken('令牌签名无效')
+    reservation_id, shop_id, expires = PAYLOAD.unpack(payload)
+    if (now or time.time()) > expires:
+        raise InvalidToken('活动已结束，令牌已过期')
+    return reservation_id, shop_id
+
+
+def check_in(reservation_id, shop_id):
+    """核销：一条按主键的条件更新，成功返回 True；已核销 / 已取消返回 False"""
+    return Reservation.objects.filter(
+        pk=reservation_id, shop_id=shop_id, status='confirmed'
+    ).update(status='completed') == 1
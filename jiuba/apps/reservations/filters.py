@@ -0,0 +1,28 @@
+from datetime import datetime, time, timedelta
+
+import django_filters
+from django.utils import timezone
+
+from .models import Reservation
+
+
+def _day_start(value):
+    return timezone.make_aware(datetime.combine(value, time.min))
+
+
+class ReservationFilter(django_filters.FilterSet):
+    status = django_filters.ChoiceFilter(choices=Reservation.STATUS_CHOICES)
+    activity = django_filters.NumberFilter(field_name='activity_id')
+    # 按活动日期（本地时间）筛选，转换为 start_time 区间以使用索引
+    date_from = django_filters.DateFilter(method='filter_date_from')
+    date_to = django_filters.DateFilter(method='filter_date_to')
+
+    class Meta:
+        model = Reservation
+        fields = ['status', 'activity']
+
+    def filter_date_from(self, queryset, name, value):
+        return queryset.filter(activity__start_time__gte=_day_start(value))
+
+    def filter_date_to(self, queryset, name, value):
+        return queryset.filter(activity__start_time__lt=_day_start(value + timedelta(days=1)))
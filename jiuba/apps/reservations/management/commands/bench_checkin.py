@@ -0,0 +1,93 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.activity.models import Activity
+from apps.reservations.checkin import check_in, qr_payload, verify_token
+from apps.reservations.models import Reservation
+from apps.shop.models import Shop
+from apps.user.models import User
+
+
+class Command(BaseCommand):
+    help = '扫码核销吞吐对比：按电话/用户名 icontains 查找后保存 vs 签名令牌 + 条件更新（数据在事务中生成，结束后回滚）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scans', type=int, default=500, help='一波入场扫码数')
+        parser.add_argument('--background', type=int, default=50000, help='历史预约数量')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            tonight = self.populate(rng, options['scans'], options['background'])
+            staff = User.objects.create(username='bench_checkin_staff', is_staff=True, is_superuser=True)
+            self.stdout.write(f"{'方式':<28}{'扫码数':>8}{'总耗时(ms)':>14}{'每秒':>10}{'SQL/次':>10}")
+
+            self.measure('icontains 查找 + save()', tonight, self.search_and_save)
+            self.measure('令牌校验 + 条件更新', tonight, lambda payload, reservation: check_in(*verify_token(payload)))
+
+            client = APIClient()
+            client.force_authenticate(staff)
+            self.measure('令牌核销 API（完整请求）', tonight, lambda payload, reservation: client.post(
+                '/api/reservations/checkin/', {'token': payload}, format='json'
+            ))
+            transaction.set_rollback(True)
+
+    def populate(self, rng, scans, background):
+        shop = Shop.objects.create(name='核销基准测试店铺')
+        now = timezone.now()
+        past = Activity.objects.create(shop=shop, title='历史活动', start_time=now - timedelta(days=30),
+                                       end_time=now - timedelta(days=30) + timedelta(hours=4))
+        tonight = Activity.objects.create(shop=shop, title='今晚活动', start_time=now - timedelta(hours=1),
+                                          end_time=now + timedelta(hours=4), max_participants=scans)
+        # 每个预约一个用户
+        User.objects.bulk_create([
+            User(username=f'bench_checkin_{i}') for i in range(scans + min(background, 5000))
+        ], batch_size=2000)
+        users = list(User.objects.filter(username__startswith='bench_checkin_').values_list('id', flat=True))
+        Reservation.objects.bulk_create([
+            Reservation(user_id=rng.choice(users[scans:]), activity=past, shop=shop,
+                        contact_phone=f'13{rng.randint(0, 999999999):09d}', status='completed')
+            for _ in range(background)
+        ], batch_size=2000)
+        Reservation.objects.bulk_create([
+            Reservation(user_id=user_id, activity=tonight, shop=shop,
+                        contact_phone=f'139{i:08d}')
+            for i, user_id in enumerate(users[:scans])
+        ], batch_size=2000)
+        reservations = Reservation.objects.filter(activity=tonight).select_related('activity', 'user')
+        return [(qr_payload(reservation), reservation) for reservation in reservations]
+
+    def search_and_save(self, payload, reservation):
+        # 原流程：门口按电话后四位或用户名搜索，再逐条保存
+        found = Reservation.objects.filter(
+            Q(contact_phone__icontains=reservation.contact_phone) |
+            Q(user__username__icontains=reservation.user.username),
+            status='confirmed',
+        ).select_related('user', 'activity').first()
+        if found:
+            found.status = 'completed'
+            found.save()
+
+    def measure(self, label, scans, func):
+        # 每种方式都从同样的未核销状态开始
+        with transaction.atomic(), CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for payload, reservation in scans:
+                func(payload, reservation)
+            elapsed = time.perf_counter() - started
+            completed = Reservation.objects.filter(pk__in=[r.pk for _, r in scans], status='completed').count()
+            transaction.set_rollback(True)
+        count = len(scans)
+        self.stdout.write(
+            f'{label:<28}{count:>8}{elapsed * 1000:>14.1f}{count / elapsed:>10.0f}{(len(queries) - 1) / count:>10.1f}'
+            f'  已核销 {completed}'
+        )
@@ -0,0 +1,134 @@
+import logging
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.activity.models import Activity
+from apps.reservations.models import Reservation, WaitlistEntry
+from apps.shop.models import Shop
+from apps.user.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        '并发预约压测：大量用户同时预约同一活动，校验成功数量恰好等于名额；'
+        '随后未抢到的用户加入候补，并发重复取消预约，校验候补按顺序转正且不重复（测试数据结束后删除）'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000, help='预约请求数（每个请求一个用户）')
+        parser.add_argument('--seats', type=int, default=50, help='活动名额')
+        parser.add_argument('--concurrency', type=int, default=50, help='并发线程数')
+        parser.add_argument('--waitlist', type=int, default=100, help='加入候补的用户数')
+        parser.add_argument('--cancellations', type=int, default=20, help='取消的预约数（每个取消请求并发发送两次）')
+
+    def handle(self, *args, **options):
+        total, seats = options['requests'], options['seats']
+        self.concurrency = options['concurrency']
+        shop = Shop.objects.create(name='预约压测店铺')
+        activity = Activity.objects.create(
+            shop=shop,
+            title='预约压测活动',
+            start_time=timezone.now() + timedelta(days=1),
+            end_time=timezone.now() + timedelta(days=1, hours=2),
+            max_participants=seats,
+        )
+        User.objects.bulk_create([
+            User(username=f'load_test_{activity.pk}_{i}') for i in range(total)
+        ])
+        users = list(User.objects.filter(username__startswith=f'load_test_{activity.pk}_'))
+
+        # 名额已满的 400 响应不逐条打印
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+        try:
+            self.check_admission(activity, users)
+            if options['waitlist'] and options['cancellations']:
+                self.check_promotion(activity, users, options['waitlist'], options['cancellations'])
+        finally:
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+            shop.delete()
+
+    def run(self, calls):
+        """并发执行 (user, method, path, data) 请求，返回状态码计数和用时"""
+        def call(args):
+            user, method, path, data = args
+            client = APIClient()
+            client.force_authenticate(user)
+            try:
+                return getattr(client, method)(path, data, format='json').status_code
+            except Exception as exc:  # 例如 SQLite 的 database is locked
+                return type(exc).__name__
+            finally:
+                connections.close_all()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            results = Counter(pool.map(call, calls))
+        return results, time.perf_counter() - started
+
+    def report(self, title, results, elapsed):
+        self.stdout.write(f'{title}：{sum(results.values())} 个请求，并发 {self.concurrency}，用时 {elapsed:.2f}s')
+        for outcome, count in sorted(results.items(), key=lambda item: str(item[0])):
+            self.stdout.write(f'  {outcome}: {count}')
+
+    def check_admission(self, activity, users):
+        seats = activity.max_participants
+        results, elapsed = self.run([
+            (user, 'post', '/api/reservations/', {'activity': activity.pk, 'contact_phone': '13800000000'})
+            for user in users
+        ])
+        self.report('预约', results, elapsed)
+
+        activity.refresh_from_db()
+        admitted = results.get(201, 0)
+        stored = Reservation.objects.filter(activity=activity, status='confirmed').count()
+        self.stdout.write(f'成功 {admitted}，预约记录 {stored}，名额计数 {activity.confirmed_count}/{seats}')
+
+        expected = min(seats, len(users) - sum(c for k, c in results.items() if k not in (201, 400)))
+        if not (admitted == stored == activity.confirmed_count and admitted <= seats):
+            raise CommandError('名额计数与预约记录不一致，出现超额或丢失')
+        if admitted != expected:
+            raise CommandError(f'成功预约 {admitted} 个，预期 {expected} 个')
+        self.stdout.write(self.style.SUCCESS('名额控制正确'))
+
+    def check_promotion(self, activity, users, waiting, cancellations):
+        reserved = set(Reservation.objects.filter(activity=activity).values_list('user_id', flat=True))
+        candidates = [user for user in users if user.pk not in reserved][:waiting]
+        # 按顺序加入候补，保证队列顺序确定
+        for user in candidates:
+            self.run([(user, 'post', '/api/reservations/waitlist/', {'activity': activity.pk, 'contact_phone': '13900000000'})])
+        queue = list(WaitlistEntry.objects.filter(activity=activity, status='waiting').order_by('id').values_list('id', flat=True))
+
+        targets = list(Reservation.objects.filter(activity=activity, status='confirmed').select_related('user')[:cancellations])
+        calls = []
+        for reservation in targets:
+            # 同一预约并发取消两次，模拟重复点击
+            calls += [(reservation.user, 'patch', f'/api/reservations/{reservation.pk}/cancel/', None)] * 2
+        results, elapsed = self.run(calls)
+        self.report('取消', results, elapsed)
+
+        activity.refresh_from_db()
+        cancelled = results.get(200, 0)
+        promoted = list(WaitlistEntry.objects.filter(activity=activity, status='promoted').order_by('id'))
+        confirmed = Reservation.objects.filter(activity=activity, status='confirmed').count()
+        self.stdout.write(
+            f'取消成功 {cancelled}，候补转正 {len(promoted)}，已确认预约 {confirmed}，名额计数 {activity.confirmed_count}'
+        )
+
+        if cancelled > len(targets):
+            raise CommandError('同一预约被重复取消')
+        if len(promoted) != min(cancelled, len(queue)):
+            raise CommandError('转正数量与释放的名额不一致')
+        if [entry.pk for entry in promoted] != queue[:len(promoted)]:
+            raise CommandError('候补未按先后顺序转正')
+        if any(entry.reservation_id is None for entry in promoted):
+            raise CommandError('存在未生成预约的转正记录')
+        if confirmed != activity.confirmed_count or confirmed > activity.max_participants:
+            raise CommandError('名额计数与预约记录不一致')
+        self.stdout.write(self.style.SUCCESS('候补转正正确'))
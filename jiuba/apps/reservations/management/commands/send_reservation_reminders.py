@@ -0,0 +1,36 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.reservations.reminders import get_sender, send_due_reminders
+
+
+class Command(BaseCommand):
+    help = '发送活动开始前提醒；默认常驻运行，每隔 --interval 秒扫描一次，--once 只扫描一次'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='扫描一次后退出（适合 cron / Cloud Scheduler）')
+        parser.add_argument('--interval', type=int, default=60, help='扫描间隔（秒）')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--lead-minutes', type=int, default=settings.RESERVATION_REMINDER_LEAD_MINUTES,
+                            help='提前多少分钟提醒')
+        parser.add_argument('--sender', default=settings.RESERVATION_REMINDER_SENDER,
+                            help='发送器类的导入路径')
+
+    def handle(self, *args, **options):
+        sender = get_sender(options['sender'])
+        lead = timedelta(minutes=options['lead_minutes'])
+        while True:
+            started = time.perf_counter()
+            sent, failed = send_due_reminders(lead=lead, batch_size=options['batch_size'], sender=sender)
+            elapsed = time.perf_counter() - started
+            if sent or failed or options['verbosity'] > 1:
+                self.stdout.write(f'发送 {sent} 条，失败 {failed} 条，用时 {elapsed:.2f}s')
+            if options['once']:
+                break
+            try:
+                time.sleep(max(0, options['interval'] - elapsed))
+            except KeyboardInterrupt:
+                break
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activity', '0004_activity_confirmed_count'),
+        ('reservations', '0002_alter_reservation_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('contact_phone', models.CharField(max_length=20, verbose_name='联系电话')),
+                ('note', models.TextField(blank=True, verbose_name='备注')),
+                ('status', models.CharField(choices=[('waiting', '候补中'), ('promoted', '已转正'), ('cancelled', '已取消')], default='waiting', max_length=20, verbose_name='状态')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='加入时间')),
+                ('promoted_at', models.DateTimeField(blank=True, null=True, verbose_name='转正时间')),
+                ('activity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='activity.activity', verbose_name='候补活动')),
+                ('reservation', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='waitlist_entry', to='reservations.reservation', verbose_name='转正后的预约')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='用户')),
+            ],
+            options={
+                'verbose_name': '候补记录',
+                'verbose_name_plural': '候补记录',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['activity', 'status', 'id'], name='waitlist_queue_idx'), models.Index(fields=['activity', 'promoted_at'], name='waitlist_promoted_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 'waiting')), fields=('user', 'activity'), name='waitlist_unique_waiting_user')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activity', '0005_activity_start_time_indexes'),
+        ('reservations', '0003_waitlistentry'),
+        ('shop', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['shop', 'status', '-created_at'], name='reservation_shop_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['user', '-created_at'], name='reservation_user_created_idx'),
+        ),
+    ]
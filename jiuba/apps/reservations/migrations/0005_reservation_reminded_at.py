@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activity', '0005_activity_start_time_indexes'),
+        ('reservations', '0004_reservation_listing_indexes'),
+        ('shop', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='reminded_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='提醒发送时间'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['activity', 'status', 'reminded_at'], name='reservation_reminder_idx'),
+        ),
+    ]
@@ -19,11 +19,20 @@ class Reservation(models.Model):
     note = models.TextField("备注", blank=True)
     status = models.CharField("状态", max_length=20, choices=STATUS_CHOICES, default='confirmed')
     created_at = models.DateTimeField("创建时间", auto_now_add=True)
+    reminded_at = models.DateTimeField("提醒发送时间", null=True, blank=True, editable=False)
 
     class Meta:
         verbose_name = "预约记录"
         verbose_name_plural = "预约记录"
         ordering = ['-created_at']
+        indexes = [
+            # 店铺端按状态筛选并按时间倒序分页
+            models.Index(fields=['shop', 'status', '-created_at'], name='reservation_shop_status_idx'),
+            # 用户端"我的预约"
+            models.Index(fields=['user', '-created_at'], name='reservation_user_created_idx'),
+            # 提醒任务：按活动取未提醒的有效预约
+            models.Index(fields=['activity', 'status', 'reminded_at'], name='reservation_reminder_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} 预约 {self.activity.title}"
@@ -31,4 +40,47 @@ class Reservation(models.Model):
     def save(self, *args, **kwargs):
         if not self.shop_id:
             self.shop = self.activity.shop
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+class WaitlistEntry(models.Model):
+    """活动候补队列，同一活动内按 id 先到先得"""
+    STATUS_CHOICES = [
+        ('waiting', '候补中'),
+        ('promoted', '已转正'),
+        ('cancelled', '已取消'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="用户")
+    activity = models.ForeignKey(
+        Activity, on_delete=models.CASCADE, verbose_name="候补活动", related_name="waitlist_entries"
+    )
+    contact_phone = models.CharField("联系电话", max_length=20)
+    note = models.TextField("备注", blank=True)
+    status = models.CharField("状态", max_length=20, choices=STATUS_CHOICES, default='waiting')
+    reservation = models.OneToOneField(
+        Reservation, on_delete=models.SET_NULL, null=True, blank=True,
+        verbose_name="转正后的预约", related_name="waitlist_entry"
+    )
+    created_at = models.DateTimeField("加入时间", auto_now_add=True)
+    promoted_at = models.DateTimeField("转正时间", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "候补记录"
+        verbose_name_plural = "候补记录"
+        ordering = ['id']
+        indexes = [
+            # 取队首、计算排位：activity + status 定位队列，id 即先后顺序
+            models.Index(fields=['activity', 'status', 'id'], name='waitlist_queue_idx'),
+            # 估算等待时间：统计最近一段时间的转正数量
+            models.Index(fields=['activity', 'promoted_at'], name='waitlist_promoted_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'activity'],
+                condition=models.Q(status='waiting'),
+                name='waitlist_unique_waiting_user',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} 候补 {self.activity.title}"
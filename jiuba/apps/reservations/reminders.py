@@ -0,0 +1,120 @@
+"""
+活动开始前提醒
+
+调度任务（send_reservation_reminders）周期性扫描即将开始的活动：
+先按 start_time 索引取出时间窗口内的活动，再按 (activity, status, reminded_at)
+索引分批取未提醒的有效预约，每批 3 条 SQL（取数据、认领、确认认领结果），
+与预约数量无关。
+
+认领时把 reminded_at 写为本批唯一的时间戳，再按该时间戳查回认领成功的行，
+多个任务实例并行时同一预约不会重复发送；发送失败的预约清空 reminded_at 留待下次重试。
+"""
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from apps.activity.models import Activity
+
+from .models import Reservation
+
+logger = logging.getLogger(__name__)
+
+
+class ConsoleSender:
+    """打印到日志，用于本地开发"""
+
+    def send_many(self, messages):
+        """发送一批消息，返回发送失败的预约 ID 列表"""
+        for message in messages:
+            logger.info('活动提醒 -> %s: %s', message['touser'], json.dumps(message['data'], ensure_ascii=False))
+        return []
+
+
+class FileSender:
+    """以 JSON Lines 追加写入文件，代替微信订阅消息接口"""
+
+    def __init__(self, path=None):
+        self.path = path or settings.RESERVATION_REMINDER_OUTBOX
+
+    def send_many(self, messages):
+        with open(self.path, 'a', encoding='utf-8') as outbox:
+            for message in messages:
+                outbox.write(json.dumps(message, ensure_ascii=False) + '\n')
+        return []
+
+
+def get_sender(path=None):
+    return import_string(path or settings.RESERVATION_REMINDER_SENDER)()
+
+
+def build_message(reservation):
+    """按微信订阅消息格式组装提醒内容"""
+    activity = reservation.activity
+    return {
+        'reservation_id': reservation.pk,
+        # 尚未接入微信登录，暂以用户名代替 openid
+        'touser': reservation.user.username,
+        'template_id': settings.WECHAT_REMINDER_TEMPLATE_ID,
+        'page': f'pages/reservation/detail?id={reservation.pk}',
+        'data': {
+            'thing1': {'value': activity.title[:20]},
+            'time2': {'value': timezone.localtime(activity.start_time).strftime('%Y-%m-%d %H:%M')},
+            'thing3': {'value': reservation.shop.name[:20]},
+        },
+    }
+
+
+def send_due_reminders(now=None, lead=None, batch_size=500, sender=None):
+    """
+    发送 lead 时间内即将开始的活动的提醒，返回 (发送数, 失败数)
+    """
+    now = now or timezone.now()
+    lead = lead or timedelta(minutes=settings.RESERVATION_REMINDER_LEAD_MINUTES)
+    sender = sender or get_sender()
+
+    activity_ids = list(Activity.objects.filter(
+        is_active=True, start_time__gt=now, start_time__lte=now + lead
+    ).values_list('id', flat=True))
+    if not activity_ids:
+        return 0, 0
+
+    due = Reservation.objects.filter(
+        activity_id__in=activity_ids, status='confirmed', reminded_at__isnull=True
+    ).select_related('activity', 'shop', 'user').only(
+        'id', 'activity__title', 'activity__start_time', 'shop__name', 'user__username'
+    ).order_by('id')
+
+    sent = failed = 0
+    last_id = 0
+    while True:
+        batch = list(due.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            break
+        last_id = batch[-1].pk
+
+        # 认领：本批唯一的时间戳作为标记
+        claim = timezone.now()
+        Reservation.objects.filter(
+            pk__in=[reservation.pk for reservation in batch], reminded_at__isnull=True
+        ).update(reminded_at=claim)
+        claimed = set(Reservation.objects.filter(
+            pk__in=[reservation.pk for reservation in batch], reminded_at=claim
+        ).values_list('id', flat=True))
+
+        messages = [build_message(reservation) for reservation in batch if reservation.pk in claimed]
+        if not messages:
+            continue
+        try:
+            errors = list(sender.send_many(messages))
+        except Exception:
+            logger.exception('活动提醒发送失败')
+            errors = [message['reservation_id'] for message in messages]
+        if errors:
+            Reservation.objects.filter(pk__in=errors, reminded_at=claim).update(reminded_at=None)
+        sent += len(messages) - len(errors)
+        failed += len(errors)
+    return sent, failed
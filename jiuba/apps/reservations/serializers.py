@@ -1,20 +1,36 @@
 # apps/reservation/serializers.py
 
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Reservation
+from .models import Reservation, WaitlistEntry
+from .capacity import admit
+from .checkin import qr_payload
+from .transitions import TRANSITIONS
+from .waitlist import join
 
 class ReservationSerializer(serializers.ModelSerializer):
     activity_title = serializers.CharField(source='activity.title', read_only=True)
     shop_name = serializers.CharField(source='shop.name', read_only=True)
     reservation_id = serializers.IntegerField(source='id', read_only=True)
+    checkin_code = serializers.SerializerMethodField()
 
     class Meta:
         model = Reservation
         fields = [
             'reservation_id', 'activity', 'activity_title', 'shop_name',
-            'contact_phone', 'note', 'status', 'created_at'
+            'contact_phone', 'note', 'status', 'checkin_code', 'created_at'
         ]
-        read_only_fields = ['reservation_id', 'status', 'created_at']
+        # 活动只能在创建时指定（ReservationCreateSerializer 负责占位），
+        # 修改预约时不能换活动，否则会绕过名额计数；换活动需取消后重新预约
+        read_only_fields = ['reservation_id', 'activity', 'status', 'created_at']
+
+    def get_checkin_code(self, obj):
+        """核销二维码内容，仅预约本人且预约有效时返回"""
+        request = self.context.get('request')
+        if obj.status != 'confirmed' or request is None or obj.user_id != request.user.pk:
+            return None
+        return qr_payload(obj)
 
 class ReservationCreateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -26,7 +42,6 @@ class ReservationCreateSerializer(serializers.ModelSerializer):
         }
 
     def validate_activity(self, value):
-        from django.utils import timezone
         if value.start_time <= timezone.now():
             raise serializers.ValidationError("该活动已开始，无法预约。")
         return value
@@ -41,16 +56,72 @@ class ReservationCreateSerializer(serializers.ModelSerializer):
         ).exists():
             raise serializers.ValidationError("您已预约过该活动。")
         
-        # 检查名额（如果有限制）
-        if activity.max_participants is not None:
-            current_count = Reservation.objects.filter(
-                activity=activity,
-                status='confirmed'
-            ).count()
-            if current_count >= activity.max_participants:
-                raise serializers.ValidationError("该活动名额已满。")
+        # 名额预检（读取计数器，不做 COUNT），最终以 create 中的占位结果为准
+        if activity.remaining_slots() <= 0:
+            raise serializers.ValidationError("该活动名额已满，可加入候补队列。", code='full')
         return data
 
+    @transaction.atomic
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
-        return super().create(validated_data)
\ No newline at end of file
+        # 条件更新占位，与插入预约在同一事务中，失败则整体回滚
+        if not admit(validated_data['activity'].pk):
+            raise serializers.ValidationError("该活动名额已满，可加入候补队列。", code='full')
+        return super().create(validated_data)
+
+
+class WaitlistEntrySerializer(serializers.ModelSerializer):
+    activity_title = serializers.CharField(source='activity.title', read_only=True)
+    # 由视图查询集注解，不在队列中时为 None
+    position = serializers.IntegerField(read_only=True, default=None)
+
+    class Meta:
+        model = WaitlistEntry
+        fields = [
+            'id', 'activity', 'activity_title', 'contact_phone', 'note',
+            'status', 'position', 'reservation', 'created_at', 'promoted_at'
+        ]
+        read_only_fields = fields
+
+
+class WaitlistJoinSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WaitlistEntry
+        fields = ['activity', 'contact_phone', 'note']
+        extra_kwargs = {
+            'activity': {'required': True},
+            'contact_phone': {'required': True},
+        }
+
+    def validate_activity(self, value):
+        if value.start_time <= timezone.now():
+            raise serializers.ValidationError("该活动已开始，无法候补。")
+        return value
+
+    def validate(self, data):
+        activity = data['activity']
+        if Reservation.objects.filter(
+            user=self.context['request'].user,
+            activity=activity,
+            status__in=['confirmed', 'completed']
+        ).exists():
+            raise serializers.ValidationError("您已预约过该活动。")
+        if activity.remaining_slots() > 0:
+            raise serializers.ValidationError("该活动还有名额，请直接预约。")
+        return data
+
+    def create(self, validated_data):
+        return join(self.context['request'].user, **validated_data)
+
+
+class BulkTransitionSerializer(serializers.Serializer):
+    """批量核销 / 取消"""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=500
+    )
+    action = serializers.ChoiceField(choices=list(TRANSITIONS))
+
+
+class CheckinSerializer(serializers.Serializer):
+    token = serializers.CharField(max_length=100)
+
@@ -0,0 +1,22 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .capacity import HOLDING_STATUSES, release
+from .models import Reservation
+from .waitlist import promote_next
+
+
+def _deleting_reservations(origin):
+    """删除是直接针对预约发起的（不是删除活动 / 用户时的级联删除）"""
+    return isinstance(origin, Reservation) or (isinstance(origin, QuerySet) and origin.model is Reservation)
+
+
+@receiver(post_delete, sender=Reservation, dispatch_uid='reservation_release_capacity')
+def reservation_deleted(sender, instance, origin=None, **kwargs):
+    # 删除仍占用名额的预约时归还名额，并与取消预约一样转给候补队首；
+    # 级联删除时活动或候补用户本身也在被删除，不转正
+    if instance.status in HOLDING_STATUSES:
+        release(instance.activity_id)
+        if _deleting_reservations(origin):
+            promote_next(instance.activity_id)
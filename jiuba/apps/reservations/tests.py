@@ -1,3 +1,399 @@
-from django.test import TestCase
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.activity.models import Activity
+from apps.shop.models import Shop
+from apps.user.models import User
+
+from . import transitions
+from .capacity import admit, recount, release
+from .checkin import InvalidToken, _b64decode, _b64encode, make_token, qr_payload, verify_token
+from .models import Reservation, WaitlistEntry
+from .transitions import transition
+from .waitlist import join, promote_next
+
+
+@override_settings(BACKGROUND_TASK_WORKERS=0)
+class ReservationListingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.shop = Shop.objects.create(name='本店')
+        cls.other_shop = Shop.objects.create(name='他店')
+        start = timezone.now() + timedelta(days=1)
+        cls.activity = Activity.objects.create(
+            shop=cls.shop, title='周五派对', start_time=start, end_time=start + timedelta(hours=4)
+        )
+        cls.later_activity = Activity.objects.create(
+            shop=cls.shop, title='周末派对', start_time=start + timedelta(days=2),
+            end_time=start + timedelta(days=2, hours=4)
+        )
+        cls.other_activity = Activity.objects.create(
+            shop=cls.other_shop, title='他店活动', start_time=start, end_time=start + timedelta(hours=4)
+        )
+        cls.customer = User.objects.create(username='customer')
+        cls.staff = User.objects.create(username='staff', is_staff=True, shop=cls.shop)
+
+        reservations = []
+        for i in range(30):
+            user = User.objects.create(username=f'guest{i}')
+            reservations.append(Reservation(
+                user=user, activity=cls.activity, shop=cls.shop, contact_phone='13800000000',
+                status='cancelled' if i % 3 == 0 else 'confirmed',
+            ))
+        reservations.append(Reservation(
+            user=cls.customer, activity=cls.later_activity, shop=cls.shop, contact_phone='13900000000'
+        ))
+        reservations.append(Reservation(
+            user=cls.customer, activity=cls.other_activity, shop=cls.other_shop, contact_phone='13900000000'
+        ))
+        Reservation.objects.bulk_create(reservations)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def test_staff_list_is_scoped_to_shop(self):
+        response = self.client_for(self.staff).get('/api/reservations/', {'page_size': 100})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 31)
+        self.assertEqual({row['shop_name'] for row in response.data['results']}, {'本店'})
+
+    def test_customer_only_sees_own_reservations(self):
+        response = self.client_for(self.customer).get('/api/reservations/')
+        self.assertEqual(response.data['count'], 2)
+
+    def test_list_query_count_is_constant(self):
+        client = self.client_for(self.staff)
+        # COUNT + 一条 JOIN 活动 / 店铺的查询，与每页行数无关
+        with self.assertNumQueries(2):
+            small = client.get('/api/reservations/', {'page_size': 5})
+        with self.assertNumQueries(2):
+            large = client.get('/api/reservations/', {'page_size': 30})
+        self.assertEqual(len(small.data['results']), 5)
+        self.assertEqual(len(large.data['results']), 30)
+
+    def test_shop_reservations_query_count(self):
+        with self.assertNumQueries(2):
+            response = self.client_for(self.staff).get(
+                '/api/reservations/shop_reservations/', {'status': 'confirmed'}
+            )
+        self.assertEqual(response.data['count'], 21)
+
+    def test_pagination_is_enforced(self):
+        response = self.client_for(self.staff).get('/api/reservations/', {'page_size': 1000})
+        self.assertEqual(len(response.data['results']), 31)
+        response = self.client_for(self.staff).get('/api/reservations/')
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_filter_by_activity_date(self):
+        day = timezone.localtime(self.later_activity.start_time).date()
+        response = self.client_for(self.staff).get('/api/reservations/', {
+            'date_from': day.isoformat(), 'date_to': day.isoformat(),
+        })
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['results'][0]['activity_title'], '周末派对')
+
+    def test_my_reservations_query_count(self):
+        with self.assertNumQueries(2):
+            response = self.client_for(self.customer).get('/api/reservations/my_reservations/')
+        self.assertEqual(response.data['count'], 2)
+        self.assertTrue(all(row['checkin_code'] for row in response.data['results']))
+
+    def test_my_reservations_not_scoped_to_staff_shop(self):
+        Reservation.objects.create(
+            user=self.staff, activity=self.later_activity, shop=self.shop, contact_phone='13700000000'
+        )
+        Reservation.objects.create(
+            user=self.staff, activity=self.other_activity, shop=self.other_shop, contact_phone='13700000000'
+        )
+        with self.assertNumQueries(2):
+            response = self.client_for(self.staff).get('/api/reservations/my_reservations/')
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual({row['shop_name'] for row in response.data['results']}, {'本店', '他店'})
+
+
+@override_settings(BACKGROUND_TASK_WORKERS=0)
+class CapacityCounterTests(TestCase):
+    """Activity.confirmed_count 随创建、取消、删除预约同步变化"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.shop = Shop.objects.create(name='本店')
+        start = timezone.now() + timedelta(days=1)
+        cls.activity = Activity.objects.create(
+            shop=cls.shop, title='品鉴会', start_time=start, end_time=start + timedelta(hours=2), max_participants=2
+        )
+        cls.other_activity = Activity.objects.create(
+            shop=cls.shop, title='调酒课', start_time=start, end_time=start + timedelta(hours=2), max_participants=2
+        )
+        cls.users = [User.objects.create(username=f'guest{i}') for i in range(3)]
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def reserve(self, user, activity=None):
+        return self.client_for(user).post('/api/reservations/', {
+            'activity': (activity or self.activity).pk, 'contact_phone': '13800000000',
+        })
+
+    def reserve_id(self, user):
+        self.assertEqual(self.reserve(user).status_code, 201)
+        return Reservation.objects.get(user=user, activity=self.activity).pk
+
+    def assertCount(self, expected, activity=None):
+        activity = activity or self.activity
+        activity.refresh_from_db()
+        self.assertEqual(activity.confirmed_count, expected)
+
+    def test_admit_stops_at_capacity(self):
+        self.assertEqual(self.reserve(self.users[0]).status_code, 201)
+        self.assertEqual(self.reserve(self.users[1]).status_code, 201)
+        self.assertCount(2)
+        response = self.reserve(self.users[2])
+        self.assertEqual(response.status_code, 400)
+        self.assertCount(2)
+        self.assertEqual(Reservation.objects.filter(activity=self.activity).count(), 2)
+
+    def test_admit_and_release(self):
+        self.assertTrue(admit(self.activity.pk, seats=2))
+        self.assertFalse(admit(self.activity.pk))
+        release(self.activity.pk, seats=2)
+        self.assertCount(0)
+        # 不会减到负数；计数偏小时批量释放减到 0
+        release(self.activity.pk)
+        self.assertCount(0)
+        self.assertTrue(admit(self.activity.pk))
+        release(self.activity.pk, seats=2)
+        self.assertCount(0)
+
+    def test_cancel_releases_seat(self):
+        reservation_id = self.reserve_id(self.users[0])
+        client = self.client_for(self.users[0])
+        self.assertEqual(client.patch(f'/api/reservations/{reservation_id}/cancel/').status_code, 200)
+        self.assertCount(0)
+        # 重复取消不会再次释放
+        self.assertEqual(client.patch(f'/api/reservations/{reservation_id}/cancel/').status_code, 400)
+        self.assertCount(0)
+
+    def test_delete_releases_only_holding_reservations(self):
+        first = self.reserve_id(self.users[0])
+        second = self.reserve_id(self.users[1])
+        self.assertCount(2)
+        self.assertEqual(self.client_for(self.users[0]).delete(f'/api/reservations/{first}/').status_code, 204)
+        self.assertCount(1)
+
+        Reservation.objects.filter(pk=second).update(status='cancelled')
+        recount(self.activity.pk)
+        self.assertCount(0)
+        Reservation.objects.get(pk=second).delete()
+        self.assertCount(0)
+
+    def test_update_cannot_move_reservation_to_another_activity(self):
+        reservation_id = self.reserve_id(self.users[0])
+        response = self.client_for(self.users[0]).patch(
+            f'/api/reservations/{reservation_id}/', {'activity': self.other_activity.pk, 'note': '靠窗'}
+        )
+        self.assertEqual(response.status_code, 200)
+        reservation = Reservation.objects.get(pk=reservation_id)
+        self.assertEqual(reservation.activity_id, self.activity.pk)
+        self.assertEqual(reservation.note, '靠窗')
+        self.assertCount(1)
+        self.assertCount(0, self.other_activity)
+
+
+    def test_saving_activity_keeps_concurrent_admission(self):
+        """加载活动后其它请求占了名额，再 save() 活动不会把计数写回旧值"""
+        activity = Activity.objects.get(pk=self.activity.pk)
+        self.assertTrue(admit(self.activity.pk))
+        activity.is_featured = True
+        activity.save()
+        self.assertCount(1)
+        self.assertTrue(Activity.objects.get(pk=self.activity.pk).is_featured)
+
+
+@override_settings(BACKGROUND_TASK_WORKERS=0)
+class WaitlistPromotionTests(TestCase):
+    """释放名额后候补队首转正为预约"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.shop = Shop.objects.create(name='本店')
+        start = timezone.now() + timedelta(days=1)
+        cls.activity = Activity.objects.create(
+            shop=cls.shop, title='品鉴会', start_time=start, end_time=start + timedelta(hours=2),
+            max_participants=1, confirmed_count=1,
+        )
+        cls.holder = User.objects.create(username='holder')
+        cls.reservation = Reservation.objects.create(
+            user=cls.holder, activity=cls.activity, shop=cls.shop, contact_phone='13800000000'
+        )
+        cls.waiting = [User.objects.create(username=f'waiting{i}') for i in range(2)]
+        for user in cls.waiting:
+            join(user, cls.activity, '13900000000')
+
+    def statuses(self):
+        return list(WaitlistEntry.objects.order_by('id').values_list('status', flat=True))
+
+    def assertPromotedFirst(self):
+        self.assertEqual(self.statuses(), ['promoted', 'waiting'])
+        self.assertTrue(Reservation.objects.filter(
+            user=self.waiting[0], activity=self.activity, status='confirmed'
+        ).exists())
+        self.activity.refresh_from_db()
+        self.assertEqual(self.activity.confirmed_count, 1)
+
+    def test_cancel_promotes_exactly_one(self):
+        client = APIClient()
+        client.force_authenticate(self.holder)
+        response = client.patch(f'/api/reservations/{self.reservation.pk}/cancel/')
+        self.assertEqual(response.status_code, 200)
+        self.assertPromotedFirst()
+
+    def test_delete_promotes(self):
+        client = APIClient()
+        client.force_authenticate(self.holder)
+        self.assertEqual(client.delete(f'/api/reservations/{self.reservation.pk}/').status_code, 204)
+        self.assertPromotedFirst()
+
+    def test_started_activity_not_promoted(self):
+        Activity.objects.filter(pk=self.activity.pk).update(start_time=timezone.now() - timedelta(minutes=5))
+        client = APIClient()
+        client.force_authenticate(self.holder)
+        self.assertEqual(client.patch(f'/api/reservations/{self.reservation.pk}/cancel/').status_code, 200)
+        self.assertEqual(self.statuses(), ['waiting', 'waiting'])
+        self.assertIsNone(promote_next(self.activity.pk))
+        self.activity.refresh_from_db()
+        self.assertEqual(self.activity.confirmed_count, 0)
+
+    def test_deleting_activity_does_not_promote(self):
+        self.activity.delete()
+        self.assertFalse(Reservation.objects.exists())
+        self.assertFalse(WaitlistEntry.objects.exists())
+
+
+@override_settings(BACKGROUND_TASK_WORKERS=0)
+class TransitionRaceTests(TestCase):
+    """两次批量取消读到相同的已确认预约时，名额只释放一次"""
+
+    @classmethod
+    def setUpTestData(cls):
+        shop = Shop.objects.create(name='本店')
+        start = timezone.now() + timedelta(days=1)
+        cls.activity = Activity.objects.create(
+            shop=shop, title='品鉴会', start_time=start, end_time=start + timedelta(hours=2),
+            max_participants=2, confirmed_count=2,
+        )
+        cls.ids = [
+            Reservation.objects.create(
+                user=User.objects.create(username=f'holder{i}'), activity=cls.activity, shop=shop,
+                contact_phone='13800000000',
+            ).pk
+            for i in range(2)
+        ]
+        cls.waiting = User.objects.create(username='waiting')
+        join(cls.waiting, cls.activity, '13900000000')
+
+    def test_cancel_on_stale_read(self):
+        lock_rows = transitions._lock_rows
+
+        def stale(queryset, ids):
+            # 读取之后、更新之前，另一个请求取消了第一条预约
+            rows = lock_rows(queryset, ids)
+            with mock.patch.object(transitions, '_lock_rows', lock_rows):
+                self.assertEqual(transition(Reservation.objects.all(), self.ids[:1], 'cancel')[0], 1)
+            return rows
+
+        with mock.patch.object(transitions, '_lock_rows', stale):
+            updated, results = transition(Reservation.objects.all(), self.ids, 'cancel')
+
+        self.assertEqual(updated, 1)
+        self.assertEqual(results, [
+            {'id': self.ids[0], 'result': 'skipped', 'status': 'cancelled'},
+            {'id': self.ids[1], 'result': 'cancelled'},
+        ])
+        # 第一次取消转正了候补用户，第二次只释放自己取消的一个名额
+        self.activity.refresh_from_db()
+        self.assertEqual(self.activity.confirmed_count, 1)
+        self.assertEqual(Reservation.objects.filter(activity=self.activity, status='confirmed').count(), 1)
+        self.assertTrue(Reservation.objects.filter(user=self.waiting, status='confirmed').exists())
+
+
+class CheckinTokenTests(SimpleTestCase):
+
+    def reservation(self, pk=1, shop_id=2, end_time=None):
+        end_time = end_time or timezone.now() + timedelta(hours=2)
+        return SimpleNamespace(pk=pk, shop_id=shop_id, activity=SimpleNamespace(end_time=end_time))
+
+    def test_round_trip_large_ids(self):
+        token = qr_payload(self.reservation(pk=2 ** 40 + 7, shop_id=2 ** 33))
+        self.assertEqual(verify_token(token), (2 ** 40 + 7, 2 ** 33))
+
+    def test_tampered_token(self):
+        raw = bytearray(_b64decode(make_token(self.reservation())))
+        raw[7] ^= 1
+        with self.assertRaisesMessage(InvalidToken, '令牌签名无效'):
+            verify_token(_b64encode(bytes(raw)))
+        with self.assertRaisesMessage(InvalidToken, '令牌格式错误'):
+            verify_token(make_token(self.reservation())[:-2])
+
+    def test_expired_token(self):
+        token = make_token(self.reservation(end_time=timezone.now() - timedelta(minutes=1)))
+        with self.assertRaisesMessage(InvalidToken, '令牌已过期'):
+            verify_token(token)
+
+
+@override_settings(BACKGROUND_TASK_WORKERS=0)
+class CheckinViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.shop = Shop.objects.create(name='本店')
+        cls.other_shop = Shop.objects.create(name='他店')
+        start = timezone.now() - timedelta(hours=1)
+        activity = Activity.objects.create(
+            shop=cls.shop, title='今晚派对', start_time=start, end_time=start + timedelta(hours=4)
+        )
+        cls.reservation = Reservation.objects.create(
+            user=User.objects.create(username='guest'), activity=activity, shop=cls.shop,
+            contact_phone='13800000000',
+        )
+        cls.token = qr_payload(cls.reservation)
+
+    def checkin(self, user, token=None):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.post('/api/reservations/checkin/', {'token': token or self.token}, format='json')
+
+    def test_checkin_once(self):
+        staff = User.objects.create(username='staff', is_staff=True, shop=self.shop)
+        self.assertEqual(self.checkin(staff).status_code, 200)
+        self.reservation.refresh_from_db()
+        self.assertEqual(self.reservation.status, 'completed')
+        self.assertEqual(self.checkin(staff).status_code, 409)
+
+    def test_other_shop_rejected(self):
+        for user in [
+            User.objects.create(username='other_staff', is_staff=True, shop=self.other_shop),
+            User.objects.create(username='unbound_staff', is_staff=True),
+            User.objects.create(username='customer'),
+        ]:
+            self.assertEqual(self.checkin(user).status_code, 403, user.username)
+        self.reservation.refresh_from_db()
+        self.assertEqual(self.reservation.status, 'confirmed')
+
+    def test_superuser_checks_in_any_shop(self):
+        admin = User.objects.create(username='admin', is_staff=True, is_superuser=True)
+        self.assertEqual(self.checkin(admin).status_code, 200)
+
+    def test_invalid_token(self):
+        staff = User.objects.create(username='staff', is_staff=True, shop=self.shop)
+        self.assertEqual(self.checkin(staff, 'JB1:' + 'A' * 40).status_code, 400)
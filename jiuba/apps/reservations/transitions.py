@@ -0,0 +1,70 @@
+"""
+预约批量状态变更（核销 / 取消）
+
+只有已确认的预约可以变更，逐条 UPDATE ... WHERE status='confirmed' 并按影响行数确认是否由本次变更
+（SQLite 不支持 select_for_update，并发的两次操作可能读到相同的已确认预约），
+只有本次变更的预约才释放名额并转给候补用户，释放在同一事务中完成。
+"""
+from collections import Counter
+
+from django.db import transaction
+
+from .capacity import release
+from .models import Reservation
+from .waitlist import promote_waiting
+
+# 操作名 -> 目标状态
+TRANSITIONS = {
+    'complete': 'completed',
+    'cancel': 'cancelled',
+}
+
+
+def transition(queryset, ids, action):
+    """
+    将 queryset 范围内的 ids 从已确认变更为 action 对应的状态
+    返回 (变更数量, 逐条结果列表)，结果为：
+        {'id': 1, 'result': 'completed'}                      已变更
+        {'id': 2, 'result': 'skipped', 'status': 'cancelled'} 当前状态不是已确认
+        {'id': 3, 'result': 'not_found'}                      不存在或无权操作
+    """
+    target = TRANSITIONS[action]
+    ids = list(dict.fromkeys(ids))
+    with transaction.atomic():
+        rows = _lock_rows(queryset, ids)
+        confirmed = [pk for pk, (status, _) in rows.items() if status == 'confirmed']
+        changed = [
+            pk for pk in confirmed
+            if Reservation.objects.filter(pk=pk, status='confirmed').update(status=target)
+        ]
+        # 读取之后被其它请求抢先变更的预约，按当前状态报告为跳过
+        lost = set(confirmed) - set(changed)
+        if lost:
+            for pk, status in Reservation.objects.filter(pk__in=lost).values_list('id', 'status'):
+                rows[pk] = (status, rows[pk][1])
+
+        if target == 'cancelled' and changed:
+            freed = Counter(rows[pk][1] for pk in changed)
+            for activity_id, seats in freed.items():
+                release(activity_id, seats)
+                promote_waiting(activity_id)
+
+    changed = set(changed)
+    results = []
+    for pk in ids:
+        if pk not in rows:
+            results.append({'id': pk, 'result': 'not_found'})
+        elif pk in changed:
+            results.append({'id': pk, 'result': target})
+        else:
+            results.append({'id': pk, 'result': 'skipped', 'status': rows[pk][0]})
+    return len(changed), results
+
+
+def _lock_rows(queryset, ids):
+    """{id: (status, activity_id)}，支持行锁的数据库上锁定这些预约直到事务结束"""
+    return {
+        pk: (status, activity_id)
+        for pk, status, activity_id in queryset.filter(pk__in=ids)
+        .select_for_update().order_by().values_list('id', 'status', 'activity_id')
+    }
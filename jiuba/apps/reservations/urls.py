@@ -6,6 +6,8 @@ from . import views
 
 # 创建路由器并注册 ViewSet
 router = DefaultRouter()
+# 需在空前缀之前注册，否则 waitlist/ 会被当作预约 ID 匹配
+router.register(r'waitlist', views.WaitlistViewSet, basename='waitlist')
 router.register(r'', views.ReservationViewSet, basename='reservation')
 
 urlpatterns = [
@@ -1,18 +1,54 @@
-from rest_framework import viewsets, status
+from rest_framework import mixins, viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
-from .models import Reservation
-from .serializers import ReservationSerializer, ReservationCreateSerializer
+from django.db import transaction
+from django.db.models import Case, Count, OuterRef, Subquery, When
+from jiuba.metrics import RESERVATION_ADMISSIONS
+from .models import Reservation, WaitlistEntry
+from .capacity import release
+from .checkin import InvalidToken, check_in, verify_token
+from .filters import ReservationFilter
+from .transitions import transition
+from .waitlist import estimate_wait, position, promote_next
+from .serializers import (
+    ReservationSerializer, ReservationCreateSerializer, BulkTransitionSerializer, CheckinSerializer,
+    WaitlistEntrySerializer, WaitlistJoinSerializer,
+)
+
+class ReservationPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+def _error_codes(codes):
+    """把 ValidationError.get_codes() 的嵌套结构展开为错误码列表"""
+    if isinstance(codes, dict):
+        return [code for value in codes.values() for code in _error_codes(value)]
+    if isinstance(codes, list):
+        return [code for value in codes for code in _error_codes(value)]
+    return [codes]
+
 
 class ReservationViewSet(viewsets.ModelViewSet):
     """
     预约视图集
     - 客户可以创建、查看、取消自己的预约
     - 店铺员工/店主可以完成预约
+    - 列表支持 status / activity / date_from / date_to 筛选，强制分页
     """
     queryset = Reservation.objects.all()
     permission_classes = [IsAuthenticated]  # 默认需要登录
+    pagination_class = ReservationPagination
+    filterset_class = ReservationFilter
+    # 列表序列化只需要的列，活动 / 店铺随预约一并 JOIN 查询
+    list_fields = [
+        'id', 'user_id', 'activity_id', 'shop_id', 'contact_phone', 'note', 'status', 'created_at',
+        'activity__title', 'activity__end_time', 'shop__name',
+    ]
     
     def get_serializer_class(self):
         """根据动作选择序列化器"""
@@ -23,29 +59,39 @@ class ReservationViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         """根据用户权限返回对应的查询集"""
         user = self.request.user
-        
-        # 普通用户只能看到自己的预约
-        if not user.is_staff:
-            return Reservation.objects.filter(user=user)
+        queryset = self.base_queryset()
         
         # 管理员可以看到所有预约
         if user.is_superuser:
-            return Reservation.objects.all()
+            return queryset
+        
+        # 员工用户只能看到所属店铺的预约
+        if user.is_staff and user.shop_id:
+            return queryset.filter(shop_id=user.shop_id)
         
-        # 员工用户可以看到自己店铺的预约（需要根据您的业务逻辑调整）
-        # 这里假设员工通过其他方式关联到店铺
-        return Reservation.objects.all()
+        # 普通用户（及未绑定店铺的员工）只能看到自己的预约
+        return queryset.filter(user=user)
+
+    def base_queryset(self):
+        """未按用户限定范围的预约查询集"""
+        return Reservation.objects.select_related('activity', 'shop').only(*self.list_fields)
 
     def get_permissions(self):
         """根据动作动态设置权限"""
-        if self.action in ['complete', 'shop_reservations']:
+        if self.action in ['complete', 'bulk_transition', 'checkin', 'shop_reservations']:
             # 完成预约和查看店铺预约需要员工权限
             return [IsAuthenticated()]  # 可以根据需要改为 [IsAdminUser()]
         return [IsAuthenticated()]
 
     def create(self, request, *args, **kwargs):
-        """创建预约"""
-        return super().create(request, *args, **kwargs)
+        """创建预约，按占位结果计入预约指标"""
+        try:
+            response = super().create(request, *args, **kwargs)
+        except ValidationError as exc:
+            RESERVATION_ADMISSIONS.labels('full' if 'full' in _error_codes(exc.get_codes()) else 'invalid').inc()
+            raise
+        RESERVATION_ADMISSIONS.labels('admitted').inc()
+        return response
 
     def list(self, request, *args, **kwargs):
         """获取预约列表"""
@@ -61,21 +107,29 @@ class ReservationViewSet(viewsets.ModelViewSet):
         reservation = self.get_object()
         
         # 检查权限：用户只能取消自己的预约
-        if reservation.user != request.user and not request.user.is_staff:
+        if reservation.user_id != request.user.pk and not request.user.is_staff:
             return Response(
                 {"error": "无权取消此预约"},
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        if reservation.status != 'confirmed':
+        # 条件更新，并发取消同一预约时只有一次生效并释放名额，
+        # 释放的名额在同一事务中直接转给候补队首
+        with transaction.atomic():
+            cancelled = Reservation.objects.filter(
+                pk=reservation.pk, status='confirmed'
+            ).update(status='cancelled')
+            if cancelled:
+                release(reservation.activity_id)
+                promote_next(reservation.activity_id)
+        
+        if not cancelled:
             return Response(
                 {"error": "只有已确认的预约才能取消"},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
         reservation.status = 'cancelled'
-        reservation.save()
-        
         serializer = self.get_serializer(reservation)
         return Response(serializer.data)
 
@@ -91,31 +145,85 @@ class ReservationViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        if reservation.status != 'confirmed':
+        updated, _ = transition(Reservation.objects.all(), [reservation.pk], 'complete')
+        if not updated:
             return Response(
                 {"error": "只有已确认的预约才能完成"},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
         reservation.status = 'completed'
-        reservation.save()
-        
         serializer = self.get_serializer(reservation)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['post'])
+    def bulk_transition(self, request):
+        """
+        批量核销 / 取消（店铺端）
+        请求：{"ids": [1, 2, 3], "action": "complete" | "cancel"}
+        返回每个 ID 的处理结果，只有已确认的预约会被变更
+        """
+        if not request.user.is_staff:
+            return Response(
+                {"error": "无权操作预约"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        serializer = BulkTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        updated, results = transition(
+            self.get_queryset(),
+            serializer.validated_data['ids'],
+            serializer.validated_data['action'],
+        )
+        return Response({'updated': updated, 'results': results})
+
+    @action(detail=False, methods=['post'])
+    def checkin(self, request):
+        """
+        扫码核销（店铺端）
+        请求：{"token": "<二维码内容>"}，签名校验不查库，核销为一条条件更新
+        """
+        if not request.user.is_staff:
+            return Response(
+                {"error": "无权核销预约"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        serializer = CheckinSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            reservation_id, shop_id = verify_token(serializer.validated_data['token'])
+        except InvalidToken as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # 员工只能核销所属店铺的预约，未绑定店铺的员工不能核销
+        if not request.user.is_superuser and request.user.shop_id != shop_id:
+            return Response(
+                {"error": "该预约不属于本店"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        if not check_in(reservation_id, shop_id):
+            current = Reservation.objects.filter(pk=reservation_id).values_list('status', flat=True).first()
+            return Response(
+                {
+                    "error": "预约已核销" if current == 'completed' else "预约已取消或不存在",
+                    "reservation_id": reservation_id,
+                    "status": current,
+                },
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response({"reservation_id": reservation_id, "status": 'completed'})
+
     @action(detail=False, methods=['get'])
     def my_reservations(self, request):
-        """获取当前用户的预约列表（客户端）"""
-        queryset = self.get_queryset().filter(user=request.user)
+        """获取当前用户的预约列表（客户端），员工在其它店铺的个人预约也包括在内"""
+        queryset = self.filter_queryset(self.base_queryset().filter(user=request.user))
         
-        # 支持分页
         page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     @action(detail=False, methods=['get'])
     def shop_reservations(self, request):
@@ -127,18 +235,76 @@ class ReservationViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        queryset = self.get_queryset()
-        
-        # 支持状态过滤
-        status_filter = request.query_params.get('status')
-        if status_filter:
-            queryset = queryset.filter(status=status_filter)
+        # 状态、活动、日期筛选由 ReservationFilter 处理
+        queryset = self.filter_queryset(self.get_queryset())
         
-        # 支持分页
         page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+class WaitlistViewSet(mixins.CreateModelMixin,
+                      mixins.ListModelMixin,
+                      mixins.RetrieveModelMixin,
+                      viewsets.GenericViewSet):
+    """
+    候补队列视图集
+    - 活动名额已满时加入候补，有人取消后按先后顺序自动转正为预约
+    - 查询排位和预计等待时间，代替反复重试创建预约
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get_serializer_class(self):
+        if self.action == 'create':
+            return WaitlistJoinSerializer
+        return WaitlistEntrySerializer
+
+    def get_queryset(self):
+        """只能看到自己的候补，附带当前排位"""
+        ahead = WaitlistEntry.objects.filter(
+            activity=OuterRef('activity'), status='waiting', id__lte=OuterRef('id')
+        ).order_by().values('activity').annotate(total=Count('id')).values('total')
+        return WaitlistEntry.objects.filter(user=self.request.user).select_related(
+            'activity'
+        ).annotate(
+            position=Case(When(status='waiting', then=Subquery(ahead)), default=None)
+        ).order_by('-id')
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        entry = serializer.save()
+        entry.position = position(entry)
+        return Response(
+            WaitlistEntrySerializer(entry, context=self.get_serializer_context()).data,
+            status=status.HTTP_201_CREATED
+        )
+
+    @action(detail=True, methods=['get'], url_path='position')
+    def queue_position(self, request, pk=None):
+        """排位与预计等待时间，next_check_seconds 为建议的下次查询间隔"""
+        entry = self.get_object()
+        eta = estimate_wait(entry.activity_id, entry.position)
+        return Response({
+            'id': entry.id,
+            'status': entry.status,
+            'position': entry.position,
+            'eta_seconds': eta,
+            'reservation': entry.reservation_id,
+            'next_check_seconds': min(max((eta or 600) // 4, 30), 600) if entry.status == 'waiting' else None,
+        })
+
+    @action(detail=True, methods=['patch'])
+    def cancel(self, request, pk=None):
+        """退出候补"""
+        entry = self.get_object()
+        left = WaitlistEntry.objects.filter(pk=entry.pk, status='waiting').update(status='cancelled')
+        if not left:
+            return Response(
+                {"error": "只有候补中的记录才能取消"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        entry.status = 'cancelled'
+        entry.position = None
+        return Response(self.get_serializer(entry).data)
+
@@ -0,0 +1,103 @@
+"""
+活动候补队列
+
+名额已满时用户加入候补，取消或删除预约释放名额的同一事务内把队首转正为预约（活动开始后不再转正），
+客户端通过排位 / 预计等待时间接口查询进度，不必反复重试创建预约。
+转正使用 waiting -> promoted 的条件更新，并发取消时同一候补只会被转正一次。
+"""
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from jiuba.metrics import RESERVATION_ADMISSIONS
+
+from .capacity import HOLDING_STATUSES, admit
+from .models import Reservation, WaitlistEntry
+
+# 估算等待时间时参考的转正统计窗口
+ETA_WINDOW = timedelta(hours=24)
+
+
+def promote_next(activity_id):
+    """
+    将队首候补转正为预约（需在事务中调用，通常紧跟在释放名额之后）
+    返回新建的预约；队列为空、没有空余名额或活动已开始时返回 None
+    """
+    while True:
+        entry = WaitlistEntry.objects.filter(
+            activity_id=activity_id, status='waiting', activity__start_time__gt=timezone.now()
+        ).order_by('id').select_related('activity').first()
+        if entry is None:
+            return None
+
+        with transaction.atomic():
+            # 条件更新抢占队首，失败说明已被并发的取消操作转正，继续看下一位
+            claimed = WaitlistEntry.objects.filter(pk=entry.pk, status='waiting').update(
+                status='promoted', promoted_at=timezone.now()
+            )
+            if not claimed:
+                continue
+
+            if Reservation.objects.filter(
+                user_id=entry.user_id, activity_id=activity_id, status__in=HOLDING_STATUSES
+            ).exists():
+                # 候补期间已通过其它途径预约成功
+                WaitlistEntry.objects.filter(pk=entry.pk).update(status='cancelled', promoted_at=None)
+                continue
+
+            if not admit(activity_id):
+                # 没有空余名额，撤销本次抢占，保持队首位置
+                transaction.set_rollback(True)
+                return None
+            reservation = Reservation.objects.create(
+                user_id=entry.user_id,
+                activity=entry.activity,
+                shop_id=entry.activity.shop_id,
+                contact_phone=entry.contact_phone,
+                note=entry.note,
+            )
+            WaitlistEntry.objects.filter(pk=entry.pk).update(reservation=reservation)
+            transaction.on_commit(RESERVATION_ADMISSIONS.labels('promoted').inc)
+        return reservation
+
+
+def promote_waiting(activity_id):
+    """名额有空余时持续转正，返回转正数量（用于后台批量修改状态之后）"""
+    promoted = 0
+    with transaction.atomic():
+        while promote_next(activity_id) is not None:
+            promoted += 1
+    return promoted
+
+
+def join(user, activity, contact_phone, note=''):
+    """加入候补队列，已在队列中时返回原记录"""
+    try:
+        with transaction.atomic():
+            return WaitlistEntry.objects.create(
+                user=user, activity=activity, contact_phone=contact_phone, note=note
+            )
+    except IntegrityError:
+        return WaitlistEntry.objects.get(user=user, activity=activity, status='waiting')
+
+
+def position(entry):
+    """当前排位（从 1 开始），不在队列中返回 None"""
+    if entry.status != 'waiting':
+        return None
+    return WaitlistEntry.objects.filter(
+        activity_id=entry.activity_id, status='waiting', id__lte=entry.id
+    ).count()
+
+
+def estimate_wait(activity_id, rank):
+    """按最近的转正速度估算等待秒数，暂无转正记录时返回 None"""
+    if rank is None:
+        return None
+    promoted = WaitlistEntry.objects.filter(
+        activity_id=activity_id, promoted_at__gte=timezone.now() - ETA_WINDOW
+    ).count()
+    if not promoted:
+        return None
+    return int(ETA_WINDOW.total_seconds() / promoted * rank)
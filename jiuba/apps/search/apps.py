@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class SearchConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.search'
+    verbose_name = '搜索索引'
+
+    def ready(self):
+        # 注册保存/删除信号，保持索引与业务数据同步
+        from . import signals  # noqa: F401
@@ -0,0 +1,23 @@
+from rest_framework.filters import SearchFilter
+
+from .index import apply_search, is_indexed, search
+
+
+class IndexedSearchFilter(SearchFilter):
+    """
+    ?search= 参数的索引搜索
+    - 已建索引的模型：走倒排索引，按相关度排序
+    - 其它模型：回退到 DRF 默认的 icontains 搜索
+
+    需要放在 OrderingFilter 之后，才能以相关度为第一排序；
+    请求显式指定 ?ordering= 时以请求的排序为准。
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if not is_indexed(queryset.model):
+            return super().filter_queryset(request, queryset, view)
+
+        query = request.query_params.get(self.search_param, '')
+        if request.query_params.get('ordering'):
+            return apply_search(queryset, query)
+        return search(queryset, query)
@@ -0,0 +1,130 @@
+"""
+搜索索引的写入与查询
+
+INDEXED_FIELDS 定义每个模型参与索引的字段及权重，标题类字段权重更高，
+查询时按命中词项的权重之和排序。
+"""
+from functools import reduce
+from operator import and_, or_
+
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Sum, Value
+
+from .models import SearchTerm
+from .tokenizer import index_terms, is_prefix_only, query_terms
+
+INDEXED_FIELDS = {
+    'product.product': {'name': 3, 'description': 1},
+    'activity.activity': {'title': 3, 'description': 1},
+    'shop.shop': {'name': 3, 'address': 1, 'phone': 1},
+    'notice.notice': {'title': 3, 'content': 1},
+}
+
+
+def is_indexed(model):
+    return model._meta.label_lower in INDEXED_FIELDS
+
+
+def build_terms(instance):
+    """生成对象的全部索引行（未保存）"""
+    label = instance._meta.label_lower
+    rows = []
+    for field, weight in INDEXED_FIELDS[label].items():
+        for term, count in index_terms(getattr(instance, field)).items():
+            rows.append(SearchTerm(
+                model_label=label,
+                object_id=instance.pk,
+                field=field,
+                term=term,
+                weight=weight * count,
+            ))
+    return rows
+
+
+def index_instance(instance):
+    """重建单个对象的索引"""
+    label = instance._meta.label_lower
+    with transaction.atomic():
+        SearchTerm.objects.filter(model_label=label, object_id=instance.pk).delete()
+        SearchTerm.objects.bulk_create(build_terms(instance))
+
+
+def remove_instance(instance):
+    SearchTerm.objects.filter(
+        model_label=instance._meta.label_lower, object_id=instance.pk
+    ).delete()
+
+
+def rebuild(model, batch_size=1000):
+    """全量重建某个模型的索引，返回处理的对象数量"""
+    label = model._meta.label_lower
+    total = 0
+    with transaction.atomic():
+        SearchTerm.objects.filter(model_label=label).delete()
+        rows = []
+        for instance in model.objects.only(*INDEXED_FIELDS[label]).iterator(chunk_size=batch_size):
+            rows.extend(build_terms(instance))
+            total += 1
+            if len(rows) >= batch_size:
+                SearchTerm.objects.bulk_create(rows, batch_size=batch_size)
+                rows = []
+        SearchTerm.objects.bulk_create(rows, batch_size=batch_size)
+    return total
+
+
+def ranked_matches(model, query, fields=None):
+    """
+    返回命中全部查询词项的 (object_id, rank) 查询集；关键词无有效词项时返回 None
+    """
+    terms = query_terms(query)
+    if not terms:
+        return None
+
+    matches = SearchTerm.objects.filter(
+        model_label=model._meta.label_lower, term__in=terms
+    )
+    if fields:
+        matches = matches.filter(field__in=fields)
+
+    return matches.values('object_id').annotate(
+        rank=Sum('weight'),
+        matched=Count('term', distinct=True),
+    ).filter(matched=len(terms)).values('object_id', 'rank')
+
+
+def _icontains_search(queryset, query, fields=None):
+    """与 DRF SearchFilter 相同：每个关键词命中任一字段即可，search_rank 均为 0"""
+    fields = fields or INDEXED_FIELDS[queryset.model._meta.label_lower]
+    condition = reduce(and_, (
+        reduce(or_, (Q(**{f'{field}__icontains': word}) for field in fields))
+        for word in query.split()
+    ))
+    return queryset.filter(condition).annotate(search_rank=Value(0, output_field=IntegerField()))
+
+
+def apply_search(queryset, query, fields=None):
+    """
+    用索引过滤查询集，并添加 search_rank 注解（越大越相关）
+
+    字母词项只索引了前缀，关键词含字母且索引没有命中时，回退到 icontains 匹配词中间的子串
+    """
+    matches = ranked_matches(queryset.model, query, fields)
+    if matches is None:
+        return queryset
+
+    results = queryset.filter(
+        pk__in=matches.values('object_id')
+    ).annotate(
+        search_rank=Subquery(matches.filter(object_id=OuterRef('pk')).values('rank')[:1])
+    )
+    if any(is_prefix_only(term) for term in query_terms(query)) and not results.exists():
+        return _icontains_search(queryset, query, fields)
+    return results
+
+
+def search(queryset, query, fields=None):
+    """索引搜索并按相关度排序，相关度相同时保留原有排序"""
+    if not query_terms(query):
+        return queryset
+    ordering = queryset.query.order_by or queryset.model._meta.ordering
+    return apply_search(queryset, query, fields).order_by('-search_rank', *ordering)
@@ -0,0 +1,68 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from apps.product.models import Product
+from apps.search.index import rebuild, search
+from apps.shop.models import Shop
+
+WORDS = [
+    '青岛', '啤酒', '精酿', '威士忌', '白兰地', '鸡尾酒', '果酒', '红酒', '香槟', '伏特加',
+    '小食', '薯条', '炸鸡', '坚果', '拼盘', '冰镇', '特调', '招牌', '限定', '经典',
+    'IPA', 'Lager', 'Stout', 'Mojito', 'Highball', 'Gin', 'Tonic', 'Rum', 'Cola', 'Soda',
+]
+QUERIES = ['啤酒', '精酿啤酒', '威士忌', '招牌特调', 'mojito', 'gin tonic', '炸鸡']
+# 用于生成长尾词汇，使词项分布接近真实商品库
+CHARS = '金银红白黑蓝绿紫醇香甜酸苦辣麦果花茶桃梅柚橙柠檬椰乳冰火烈夜星月海山林城巷街港湾岛'
+
+
+class Command(BaseCommand):
+    help = '对比 icontains 与倒排索引的搜索耗时（数据在事务中生成，结束后回滚）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            self.populate(rng, options['rows'])
+            self.stdout.write(f"{'关键词':<12}{'icontains(ms)':>16}{'索引(ms)':>12}{'命中':>8}")
+            for query in QUERIES:
+                scan_ms, scan_hits = self.measure(options['repeat'], lambda: Product.objects.filter(
+                    Q(name__icontains=query) | Q(description__icontains=query)
+                ))
+                index_ms, index_hits = self.measure(options['repeat'], lambda: search(Product.objects.all(), query))
+                self.stdout.write(f'{query:<12}{scan_ms:>16.1f}{index_ms:>12.1f}{index_hits:>8}')
+            transaction.set_rollback(True)
+
+    def populate(self, rng, rows):
+        vocabulary = WORDS + [''.join(rng.sample(CHARS, 2)) for _ in range(2000)]
+        shop = Shop.objects.create(name='基准测试店铺')
+        products = [
+            Product(
+                shop=shop,
+                name=''.join(rng.sample(vocabulary, 2)),
+                description=' '.join(rng.sample(vocabulary, 6)),
+                price=rng.randint(10, 300),
+                image='products/bench.jpg',
+            )
+            for _ in range(rows)
+        ]
+        started = time.perf_counter()
+        Product.objects.bulk_create(products, batch_size=2000)
+        rebuild(Product, batch_size=5000)
+        self.stdout.write(f'生成并索引 {rows} 个商品，用时 {time.perf_counter() - started:.1f}s')
+
+    def measure(self, repeat, build_queryset):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            # 与分页接口一致：总数 + 第一页
+            queryset = build_queryset()
+            hits = queryset.count()
+            list(queryset.values_list('pk', flat=True)[:20])
+        return (time.perf_counter() - started) * 1000 / repeat, hits
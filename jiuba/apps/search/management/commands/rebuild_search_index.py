@@ -0,0 +1,19 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from apps.search.index import INDEXED_FIELDS, rebuild
+
+
+class Command(BaseCommand):
+    help = '全量重建搜索索引（商品、活动、店铺、公告）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', help='只重建指定模型，如 product.product')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        labels = options['models'] or list(INDEXED_FIELDS)
+        for label in labels:
+            model = apps.get_model(label)
+            total = rebuild(model, batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'{label}: 已索引 {total} 条'))
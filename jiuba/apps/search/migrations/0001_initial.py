@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_label', models.CharField(max_length=50, verbose_name='模型')),
+                ('object_id', models.BigIntegerField(verbose_name='对象ID')),
+                ('field', models.CharField(max_length=30, verbose_name='字段')),
+                ('term', models.CharField(max_length=20, verbose_name='词项')),
+                ('weight', models.PositiveIntegerField(default=1, verbose_name='权重')),
+            ],
+            options={
+                'verbose_name': '搜索词项',
+                'verbose_name_plural': '搜索词项',
+                'indexes': [models.Index(fields=['term', 'model_label', 'object_id'], name='search_term_lookup_idx'), models.Index(fields=['object_id', 'model_label'], name='search_term_object_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations
+
+from apps.search.index import INDEXED_FIELDS
+from apps.search.tokenizer import index_terms
+
+BATCH_SIZE = 1000
+
+
+def build_index(apps, schema_editor):
+    """为已有的商品、活动、店铺、公告建立索引（之后由 post_save 信号维护）"""
+    SearchTerm = apps.get_model('search', 'SearchTerm')
+    SearchTerm.objects.all().delete()
+    for label, fields in INDEXED_FIELDS.items():
+        model = apps.get_model(label)
+        rows = []
+        for instance in model.objects.only(*fields).iterator(chunk_size=BATCH_SIZE):
+            for field, weight in fields.items():
+                for term, count in index_terms(getattr(instance, field)).items():
+                    rows.append(SearchTerm(
+                        model_label=label, object_id=instance.pk, field=field, term=term, weight=weight * count,
+                    ))
+            if len(rows) >= BATCH_SIZE:
+                SearchTerm.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+                rows = []
+        SearchTerm.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+
+
+def clear_index(apps, schema_editor):
+    apps.get_model('search', 'SearchTerm').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+        ('activity', '0005_activity_start_time_indexes'),
+        ('notice', '0002_notice_shop_updated_index'),
+        ('product', '0002_product_original_points_price_product_points_price_and_more'),
+        ('shop', '0002_shop_menu_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_index, clear_index),
+    ]
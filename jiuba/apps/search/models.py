@@ -0,0 +1,23 @@
+from django.db import models
+
+
+class SearchTerm(models.Model):
+    """搜索倒排索引 - 每行记录一个对象某字段中出现的一个词项"""
+    model_label = models.CharField("模型", max_length=50)
+    object_id = models.BigIntegerField("对象ID")
+    field = models.CharField("字段", max_length=30)
+    term = models.CharField("词项", max_length=20)
+    weight = models.PositiveIntegerField("权重", default=1)
+
+    class Meta:
+        verbose_name = "搜索词项"
+        verbose_name_plural = "搜索词项"
+        indexes = [
+            # 查询：按词项定位对象（词项在前，选择性最高）
+            models.Index(fields=['term', 'model_label', 'object_id'], name='search_term_lookup_idx'),
+            # 重建：按对象删除旧词项
+            models.Index(fields=['object_id', 'model_label'], name='search_term_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model_label}#{self.object_id} {self.field}:{self.term}"
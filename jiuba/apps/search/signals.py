@@ -0,0 +1,24 @@
+from django.db.models.signals import post_delete, post_save
+
+from apps.activity.models import Activity
+from apps.notice.models import Notice
+from apps.product.models import Product
+from apps.shop.models import Shop
+
+from .index import index_instance, remove_instance
+
+
+def update_search_index(sender, instance, raw=False, **kwargs):
+    """保存后重建该对象的索引（loaddata 导入时跳过）"""
+    if raw:
+        return
+    index_instance(instance)
+
+
+def delete_search_index(sender, instance, **kwargs):
+    remove_instance(instance)
+
+
+for model in (Product, Activity, Shop, Notice):
+    post_save.connect(update_search_index, sender=model, dispatch_uid=f'search_index_{model.__name__}')
+    post_delete.connect(delete_search_index, sender=model, dispatch_uid=f'search_delete_{model.__name__}')
@@ -0,0 +1,90 @@
+from importlib import import_module
+
+from django.apps import apps
+from django.test import TestCase, SimpleTestCase
+
+from apps.product.models import Category, Product
+from apps.shop.models import Shop
+
+from .index import rebuild, search
+from .models import SearchTerm
+from .tokenizer import index_terms, query_terms
+
+
+class TokenizerTests(SimpleTestCase):
+
+    def test_cjk_unigrams_and_bigrams(self):
+        self.assertEqual(set(index_terms('精酿啤酒')), {'精', '酿', '啤', '酒', '精酿', '酿啤', '啤酒'})
+        self.assertEqual(query_terms('精酿啤酒'), ['精酿', '酿啤', '啤酒'])
+        self.assertEqual(query_terms('酒'), ['酒'])
+
+    def test_words_indexed_by_prefix(self):
+        self.assertEqual(set(index_terms('IPA')), {'i', 'ip', 'ipa'})
+        self.assertEqual(query_terms('ＩＰＡ Beer'), ['ipa', 'beer'])
+
+    def test_kana_hangul_and_accented_letters(self):
+        self.assertTrue({'ラー', 'メン', '김치'} <= set(index_terms('ラーメン 김치')))
+        self.assertEqual(query_terms('ラーメン'), ['ラー', 'ーメ', 'メン'])
+        self.assertTrue({'c', 'caf', 'café'} <= set(index_terms('Café')))
+        self.assertEqual(query_terms('CAFÉ'), ['café'])
+
+    def test_digits_indexed_by_substring(self):
+        terms = index_terms('021-5678')
+        self.assertTrue({'021', '21', '2', '5678', '678', '67'} <= set(terms))
+        self.assertEqual(terms['5'], 1)
+
+
+class IndexedSearchTests(TestCase):
+
+    def setUp(self):
+        self.shop = Shop.objects.create(name='夜航酒馆', address='静安区月台路 12 号', phone='021-12345678')
+        self.category = Category.objects.create(name='精酿')
+        self.title_hit = Product.objects.create(
+            shop=self.shop, category=self.category, name='海盐IPA', description='清爽', price=38,
+        )
+        self.description_hit = Product.objects.create(
+            shop=self.shop, category=self.category, name='黑糖拉格', description='比IPA更柔和', price=32,
+        )
+
+    def names(self, query):
+        return list(search(Product.objects.all(), query).values_list('name', flat=True))
+
+    def test_title_outranks_description(self):
+        self.assertEqual(self.names('ipa'), ['海盐IPA', '黑糖拉格'])
+        self.assertEqual(self.names('黑糖'), ['黑糖拉格'])
+
+    def test_single_character(self):
+        self.assertEqual(self.names('海'), ['海盐IPA'])
+        self.assertEqual(self.names('i'), ['海盐IPA', '黑糖拉格'])
+
+    def test_infix_falls_back_to_icontains(self):
+        Product.objects.create(shop=self.shop, category=self.category, name='HazyIPA', price=40)
+        self.assertEqual(self.names('zyip'), ['HazyIPA'])
+        self.assertEqual(self.names('zyip 精酿'), [])
+
+    def test_shop_phone_substring(self):
+        for query in ['021', '5678', '2345']:
+            response = self.client.get('/api/shop/shops/', {'search': query})
+            self.assertEqual([shop['name'] for shop in response.data], ['夜航酒馆'], query)
+
+    def test_index_follows_save_and_delete(self):
+        self.title_hit.name = '桂花乌龙'
+        self.title_hit.save()
+        self.assertEqual(self.names('海盐'), [])
+        self.assertEqual(self.names('乌龙'), ['桂花乌龙'])
+
+        pk = self.title_hit.pk
+        self.title_hit.delete()
+        self.assertFalse(SearchTerm.objects.filter(model_label='product.product', object_id=pk).exists())
+
+    def test_rebuild(self):
+        SearchTerm.objects.all().delete()
+        self.assertEqual(rebuild(Product), 2)
+        self.assertEqual(self.names('拉格'), ['黑糖拉格'])
+
+    def test_migration_indexes_existing_rows(self):
+        SearchTerm.objects.all().delete()
+        import_module('apps.search.migrations.0002_build_index').build_index(apps, None)
+        self.assertEqual(self.names('黑糖'), ['黑糖拉格'])
+        response = self.client.get('/api/shop/shops/', {'search': '夜航'})
+        self.assertEqual([shop['name'] for shop in response.data], ['夜航酒馆'])
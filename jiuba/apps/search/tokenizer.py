@@ -0,0 +1,63 @@
+"""
+搜索分词
+
+中文没有空格分隔，这里采用 n-gram 方式：
+- 中日韩文字（汉字、假名、谚文）：索引单字和相邻双字（bigram），查询时两字以上只用双字匹配
+- 其它文字的字母数字（含 é、ü 等非 ASCII 字母）：按词切分并转小写，索引前缀（edge n-gram），
+  使 "b"、"bee" 能匹配 "beer"
+- 纯数字（电话、门牌号）：索引全部子串，使 "5678" 能匹配 "021-12345678"
+
+字母词中间的子串（"ipa" 匹配 "hazyipa"）不在索引中，由 index.apply_search 回退到 icontains
+"""
+import re
+import unicodedata
+from collections import Counter
+
+MAX_TERM_LENGTH = 20
+
+# 假名、谚文兼容字母、汉字、谚文音节、兼容汉字
+_CJK = '\u3040-\u30ff\u3130-\u318f\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff'
+_TOKEN_RE = re.compile(rf'[{_CJK}]+|[^\W_{_CJK}]+')
+_CJK_RE = re.compile(rf'[{_CJK}]')
+
+
+def _is_cjk(run):
+    return _CJK_RE.match(run) is not None
+
+
+def _normalize(text):
+    """全角转半角、统一小写"""
+    return unicodedata.normalize('NFKC', text or '').lower()
+
+
+def index_terms(text):
+    """将文档文本切分为索引词项，返回 {词项: 出现次数}"""
+    counts = Counter()
+    for run in _TOKEN_RE.findall(_normalize(text)):
+        if _is_cjk(run):
+            counts.update(run)
+            counts.update(run[i:i + 2] for i in range(len(run) - 1))
+        elif run.isdigit():
+            run = run[:MAX_TERM_LENGTH]
+            # 同一子串在一串数字中重复出现只计一次
+            counts.update({run[i:j] for i in range(len(run)) for j in range(i + 1, len(run) + 1)})
+        else:
+            run = run[:MAX_TERM_LENGTH]
+            counts.update(run[:i] for i in range(1, len(run) + 1))
+    return counts
+
+
+def is_prefix_only(term):
+    """含字母的词项只索引了前缀，词中间的子串需要回退到 icontains"""
+    return not _is_cjk(term) and not term.isdigit()
+
+
+def query_terms(text):
+    """将搜索关键词切分为查询词项（去重，保持顺序）"""
+    terms = []
+    for run in _TOKEN_RE.findall(_normalize(text)):
+        if _is_cjk(run) and len(run) > 1:
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            terms.append(run[:MAX_TERM_LENGTH])
+    return list(dict.fromkeys(terms))
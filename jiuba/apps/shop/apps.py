@@ -5,3 +5,6 @@ class ShopConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.shop'
     verbose_name = '店铺管理'
+
+    def ready(self):
+        from . import signals  # noqa: F401
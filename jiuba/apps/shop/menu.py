@@ -0,0 +1,102 @@
+"""
+店铺菜单快照
+
+小程序进店后拉取的菜单（分类 + 已上架商品）预先编码为 JSON 存入缓存，
+请求时只查询一次店铺的菜单版本号，命中后直接返回字节串并带 ETag（内容哈希）。
+
+商品、分类、店铺变更时在同一事务中把 Shop.menu_version 加一，并在后台重建快照。
+快照以 (店铺, 版本号) 为缓存键：多实例 / 多 worker 各自的本地缓存不会返回过期的菜单，
+并发重建时较旧的版本只会写入旧版本的键，不会覆盖新版本的快照。
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import F
+from django.core.files.storage import default_storage
+
+from apps.product.models import Product
+from jiuba.background import submit
+from jiuba.images import derivative_urls
+from jiuba.renderers import dumps
+
+from .models import Shop
+
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _cache_key(shop_id, version):
+    return f'shop_menu:{shop_id}:{version}'
+
+
+def build_menu(shop_id):
+    """
+    生成菜单快照并写入缓存，店铺不存在时返回 None
+    快照结构：{'body': JSON字节串, 'etag': str, 'is_active': bool, 'version': int}
+    """
+    # 先读版本号再读商品：变更先写数据、后加版本号，读到的数据不会比版本号旧
+    shop = Shop.objects.filter(pk=shop_id).values('id', 'name', 'is_active', 'menu_version').first()
+    if shop is None:
+        return None
+
+    products = Product.objects.filter(
+        shop_id=shop_id, is_available=True, status='published'
+    ).values(
+        'id', 'name', 'description', 'price', 'original_price',
+        'points_price', 'original_points_price', 'image',
+        'stock_quantity', 'sort_order', 'category_id', 'category__name',
+    ).order_by('sort_order', '-created_at')
+
+    # 按分类分组，分类顺序取其商品首次出现的位置
+    categories = {}
+    for product in products:
+        category_id = product.pop('category_id')
+        category_name = product.pop('category__name')
+        if category_id not in categories:
+            categories[category_id] = {
+                'id': category_id,
+                'name': category_name or '未分类',
+                'products': [],
+            }
+        product['price'] = str(product['price'])
+        if product['original_price'] is not None:
+            product['original_price'] = str(product['original_price'])
+        product['thumbnails'] = derivative_urls(product['image'])
+        product['image'] = default_storage.url(product['image']) if product['image'] else None
+        categories[category_id]['products'].append(product)
+
+    document = {
+        'version': shop['menu_version'],
+        'shop_id': shop['id'],
+        'shop': shop['name'],
+        'categories': list(categories.values()),
+    }
+    body = dumps(document)
+    snapshot = {
+        'body': body,
+        'etag': '"%s"' % hashlib.sha1(body).hexdigest(),
+        'is_active': shop['is_active'],
+        'version': shop['menu_version'],
+    }
+    cache.set(_cache_key(shop_id, shop['menu_version']), snapshot, CACHE_TIMEOUT)
+    return snapshot
+
+
+def get_menu(shop_id):
+    """读取当前版本的菜单快照，缓存未命中时同步生成；店铺不存在时返回 None"""
+    version = Shop.objects.filter(pk=shop_id).values_list('menu_version', flat=True).first()
+    if version is None:
+        return None
+    snapshot = cache.get(_cache_key(shop_id, version))
+    if snapshot is None:
+        snapshot = build_menu(shop_id)
+    return snapshot
+
+
+def schedule_menu_rebuild(*shop_ids):
+    """菜单版本号加一（在调用方的事务中），事务提交后在后台重建菜单快照"""
+    shop_ids = set(shop_ids)
+    if not shop_ids:
+        return
+    Shop.objects.filter(pk__in=shop_ids).update(menu_version=F('menu_version') + 1)
+    for shop_id in shop_ids:
+        submit(build_menu, shop_id, key=('shop_menu', shop_id))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shop',
+            name='menu_version',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='菜单版本'),
+        ),
+    ]
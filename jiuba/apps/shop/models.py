@@ -1,6 +1,18 @@
 from django.db import models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
+
+class ShopQuerySet(models.QuerySet):
+    def with_active_products_count(self):
+        """一次查询附带活跃商品数量（active_products_total），用子查询计数，不受搜索等其它连接影响"""
+        products = self.model._meta.get_field('products').related_model.objects.filter(
+            shop=OuterRef('pk'), is_available=True
+        ).order_by().values('shop').annotate(total=Count('id')).values('total')
+        return self.annotate(active_products_total=Coalesce(Subquery(products), 0))
+
+
 class Shop(models.Model):
     """店铺模型"""
     name = models.CharField(max_length=100, verbose_name="店铺名称")
@@ -11,6 +23,10 @@ class Shop(models.Model):
     is_active = models.BooleanField(default=True, verbose_name="是否激活")
     created_at = models.DateTimeField(default=timezone.now, verbose_name="创建时间")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+    # 菜单（店铺、商品、分类）每次变更加一，菜单快照按版本号缓存（见 apps/shop/menu.py）
+    menu_version = models.PositiveIntegerField(default=0, editable=False, verbose_name="菜单版本")
+
+    objects = ShopQuerySet.as_manager()
     
     class Meta:
         verbose_name = "店铺"
@@ -19,8 +35,19 @@ class Shop(models.Model):
     
     def __str__(self):
         return self.name
+
+    def save(self, *args, **kwargs):
+        # menu_version 只由 schedule_menu_rebuild 原子加一，修改店铺时不写回内存中可能已过期的值
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'menu_version'
+            ]
+        super().save(*args, **kwargs)
     
     @property
     def active_products_count(self):
-        """获取该店铺的活跃商品数量"""
+        """获取该店铺的活跃商品数量，已用 with_active_products_count() 查出的直接使用"""
+        if hasattr(self, 'active_products_total'):
+            return self.active_products_total
         return self.products.filter(is_available=True).count()
\ No newline at end of file
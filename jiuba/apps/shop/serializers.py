@@ -1,14 +1,16 @@
 from rest_framework import serializers
 from .models import Shop
+from jiuba.images import ImageDerivativesField
 
 class ShopSerializer(serializers.ModelSerializer):
     active_products_count = serializers.ReadOnlyField()
+    logo_thumbnails = ImageDerivativesField(source='logo')
     
     class Meta:
         model = Shop
         fields = [
             'id', 'name', 'address', 'phone', 'description', 
-            'logo', 'is_active', 'active_products_count',
+            'logo', 'logo_thumbnails', 'is_active', 'active_products_count',
             'created_at', 'updated_at'
         ]
         read_only_fields = ['created_at', 'updated_at', 'active_products_count']
@@ -0,0 +1,31 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from apps.product.models import Category, Product
+from apps.product.signals import affected_shop_ids
+from jiuba.images import schedule_derivatives
+
+from .menu import schedule_menu_rebuild
+from .models import Shop
+
+
+@receiver([post_save, post_delete], sender=Product, dispatch_uid='product_rebuild_menu')
+def product_changed(sender, instance, **kwargs):
+    schedule_menu_rebuild(*affected_shop_ids(instance))
+
+
+@receiver([post_save, pre_delete], sender=Category, dispatch_uid='category_rebuild_menu')
+def category_changed(sender, instance, **kwargs):
+    shop_ids = Product.objects.filter(category=instance).values_list('shop_id', flat=True).distinct()
+    schedule_menu_rebuild(*shop_ids)
+
+
+@receiver([post_save, post_delete], sender=Shop, dispatch_uid='shop_rebuild_menu')
+def shop_changed(sender, instance, **kwargs):
+    schedule_menu_rebuild(instance.pk)
+
+
+@receiver(post_save, sender=Shop, dispatch_uid='shop_logo_derivatives')
+def shop_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_derivatives(instance.logo)
@@ -1,3 +1,90 @@
-from django.test import TestCase
+import json
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from apps.product.models import Category, Product
+
+from .menu import _cache_key, build_menu, get_menu
+from .models import Shop
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE, BACKGROUND_TASK_WORKERS=0)
+class MenuSnapshotTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.shop = Shop.objects.create(name='菜单测试店铺')
+        self.category = Category.objects.create(name='精酿')
+        self.product = Product.objects.create(
+            shop=self.shop, category=self.category, name='招牌IPA', price=38, status='published',
+        )
+        self.url = f'/api/shop/shops/{self.shop.pk}/products/'
+
+    def names(self, snapshot):
+        document = json.loads(snapshot['body'])
+        return [product['name'] for category in document['categories'] for product in category['products']]
+
+    def test_etag_derived_from_content(self):
+        first = build_menu(self.shop.pk)
+        second = build_menu(self.shop.pk)
+        self.assertEqual(first['etag'], second['etag'])
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_change_bumps_version(self):
+        version = Shop.objects.get(pk=self.shop.pk).menu_version
+        self.product.name = '海盐IPA'
+        self.product.save()
+        self.assertEqual(Shop.objects.get(pk=self.shop.pk).menu_version, version + 1)
+        self.assertEqual(self.names(get_menu(self.shop.pk)), ['海盐IPA'])
+
+    def test_other_instance_serves_current_version(self):
+        """本实例没有收到重建任务（其它实例上的修改），版本号变化后也不会返回旧快照"""
+        stale = get_menu(self.shop.pk)
+        with mock.patch('apps.shop.menu.submit'):
+            self.product.name = '海盐IPA'
+            self.product.save()
+        self.assertEqual(self.names(stale), ['招牌IPA'])
+        self.assertEqual(self.names(get_menu(self.shop.pk)), ['海盐IPA'])
+
+    def test_late_build_of_old_version_does_not_overwrite(self):
+        old = get_menu(self.shop.pk)
+        self.product.name = '海盐IPA'
+        self.product.save()
+        current = get_menu(self.shop.pk)
+        # 旧版本的重建晚到，只会写入旧版本的键
+        cache.set(_cache_key(self.shop.pk, old['version']), old)
+        self.assertEqual(get_menu(self.shop.pk)['etag'], current['etag'])
+
+    def test_saving_stale_shop_instance_keeps_version(self):
+        stale = Shop.objects.get(pk=self.shop.pk)
+        self.product.save()
+        version = Shop.objects.get(pk=self.shop.pk).menu_version
+        stale.description = '新的介绍'
+        stale.save()
+        # 店铺自身的修改再加一，而不是写回旧值
+        self.assertEqual(Shop.objects.get(pk=self.shop.pk).menu_version, version + 1)
+
+    def test_moving_product_rebuilds_both_shops(self):
+        other = Shop.objects.create(name='另一家店铺')
+        self.assertEqual(self.names(get_menu(self.shop.pk)), ['招牌IPA'])
+        self.assertEqual(self.names(get_menu(other.pk)), [])
+        self.product.shop = other
+        self.product.save()
+        self.assertEqual(self.names(get_menu(self.shop.pk)), [])
+        self.assertEqual(self.names(get_menu(other.pk)), ['招牌IPA'])
+
+        # 删除时按数据库中的店铺失效，即使内存中的对象已改了店铺
+        self.product.shop = self.shop
+        self.product.delete()
+        self.assertEqual(self.names(get_menu(other.pk)), [])
+
+    def test_missing_shop(self):
+        self.assertIsNone(get_menu(0))
+        self.assertEqual(self.client.get('/api/shop/shops/0/products/').status_code, 404)
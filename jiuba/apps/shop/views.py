@@ -4,12 +4,16 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
 from .models import Shop
 from .serializers import ShopSerializer, ShopCreateSerializer, ShopUpdateSerializer
+from .menu import get_menu
+from apps.search.filters import IndexedSearchFilter
 
 class ShopViewSet(viewsets.ModelViewSet):
     queryset = Shop.objects.all()
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, IndexedSearchFilter]
     search_fields = ['name', 'address', 'phone']
     ordering_fields = ['name', 'created_at', 'updated_at']
     ordering = ['-created_at']
@@ -36,7 +40,8 @@ class ShopViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """获取店铺列表，管理员可以看到所有店铺，普通用户只能看到活跃店铺"""
-        queryset = super().get_queryset()
+        # 活跃商品数随列表一次查出，避免序列化时逐个 COUNT
+        queryset = super().get_queryset().with_active_products_count()
         
         # 如果是管理员，返回所有店铺
         if self.request.user.is_staff:
@@ -79,15 +84,20 @@ class ShopViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['get'])
     def products(self, request, pk=None):
-        """获取指定店铺的商品列表"""
-        shop = self.get_object()
-        products = shop.products.filter(is_available=True, status='published')
-        
-        # 这里可以添加商品分页逻辑
-        from apps.product.serializers import ProductSerializer
-        serializer = ProductSerializer(products, many=True)
+        """
+        获取指定店铺的菜单（按分类分组的已上架商品）
+        直接返回预编码的菜单快照，支持 If-None-Match 协商缓存
+        """
+        snapshot = get_menu(pk) if pk.isdigit() else None
+        if snapshot is None or not (snapshot['is_active'] or request.user.is_staff):
+            return Response({"error": "店铺不存在"}, status=status.HTTP_404_NOT_FOUND)
         
-        return Response({
-            'shop': shop.name,
-            'products': serializer.data
-        })
\ No newline at end of file
+        # 压缩后返回的是弱 ETag（W/"..."），按弱比较匹配
+        client_etags = parse_etags(request.headers.get('If-None-Match', ''))
+        if snapshot['etag'] in {etag.removeprefix('W/') for etag in client_etags}:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(snapshot['body'], content_type='application/json; charset=utf-8')
+        response['ETag'] = snapshot['etag']
+        response['Cache-Control'] = 'no-cache'
+        return response
\ No newline at end of file
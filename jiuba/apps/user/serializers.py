@@ -1,11 +1,14 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from .models import User
+from jiuba.images import ImageDerivativesField
 
 class UserSerializer(serializers.ModelSerializer):
+    avatar_thumbnails = ImageDerivativesField(source='avatar')
+
     class Meta:
         model = User
-        fields = ['id', 'username', 'email', 'phone', 'balance', 'points', 'avatar', 'date_joined']
+        fields = ['id', 'username', 'email', 'phone', 'balance', 'points', 'avatar', 'avatar_thumbnails', 'date_joined']
         read_only_fields = ['id', 'date_joined']
 
 class UserBalancePointsSerializer(serializers.ModelSerializer):
@@ -0,0 +1,14 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from jiuba.images import schedule_derivatives
+
+from .models import User
+
+
+@receiver(post_save, sender=User, dispatch_uid='user_avatar_derivatives')
+def user_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    # 登录时只更新 last_login，跳过
+    if raw or (update_fields and 'avatar' not in update_fields):
+        return
+    schedule_derivatives(instance.avatar)
@@ -0,0 +1,124 @@
+"""
+gunicorn 运行配置（在项目根目录执行 gunicorn 时自动加载）
+
+按 GUNICORN_PROFILE 选择运行方式，worker / 线程数按容器可用 CPU 计算：
+    gthread   同步 WSGI，每个 worker 多线程，适合 I/O 等待多、内存受限的容器（默认）
+    asgi      uvicorn worker，异步视图与 SSE 推送（Dockerfile.prod 使用）
+    sync      同步 WSGI，每个 worker 单线程，CPU 密集场景吞吐最高、内存占用最大
+    lowmem    单 worker 多线程，最小内存，适合 512MB 以下的实例或预发环境
+
+WEB_CONCURRENCY / GUNICORN_THREADS 可覆盖 worker / 线程数，GUNICORN_PRELOAD=0 关闭预加载，
+PORT 为监听端口（Cloud Run 注入），命令行参数优先于本文件。
+默认方案是 WSGI：命令行只指定 jiuba.wsgi:application 时，worker 类型与应用保持一致；
+使用 asgi 方案时不要在命令行另行指定应用。
+对比各方案的吞吐与内存：python manage.py bench_gunicorn_profiles
+"""
+import math
+import os
+import shutil
+import tempfile
+
+
+def cpu_count():
+    """容器可用 CPU 数：优先读取 cgroup 配额（Cloud Run / Docker --cpus），其次 CPU 亲和性"""
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            return max(1, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+CPUS = cpu_count()
+
+PROFILES = {
+    'asgi': {
+        'wsgi_app': 'jiuba.asgi:application',
+        'worker_class': 'uvicorn.workers.UvicornWorker',
+        'workers': CPUS + 1,
+        'threads': 1,
+    },
+    'gthread': {
+        'wsgi_app': 'jiuba.wsgi:application',
+        'worker_class': 'gthread',
+        'workers': CPUS + 1,
+        'threads': 4,
+    },
+    'sync': {
+        'wsgi_app': 'jiuba.wsgi:application',
+        'worker_class': 'sync',
+        'workers': CPUS * 2 + 1,
+        'threads': 1,
+    },
+    'lowmem': {
+        'wsgi_app': 'jiuba.wsgi:application',
+        'worker_class': 'gthread',
+        'workers': 1,
+        'threads': 8,
+    },
+}
+
+profile_name = os.environ.get('GUNICORN_PROFILE', 'gthread')
+if profile_name not in PROFILES:
+    raise RuntimeError(f'未知的 GUNICORN_PROFILE: {profile_name}，可选 {", ".join(PROFILES)}')
+profile = PROFILES[profile_name]
+
+wsgi_app = profile['wsgi_app']
+worker_class = profile['worker_class']
+workers = int(os.environ.get('WEB_CONCURRENCY', profile['workers']))
+threads = int(os.environ.get('GUNICORN_THREADS', profile['threads']))
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# 在 master 中导入应用，worker fork 后以写时复制共享代码页，启动更快、总内存更低
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+# 处理一定数量请求后平滑重启 worker，回收内存碎片与泄漏；加随机抖动避免同时重启
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = max_requests // 10
+
+# 请求超时（同步 worker 超时即被重启）与平滑退出时间，小于 Cloud Run 的请求超时
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 20
+# 前置负载均衡会复用连接
+keepalive = 5
+
+# worker 心跳文件放在内存文件系统，避免容器磁盘 I/O 阻塞心跳
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+# Prometheus 多进程指标（jiuba/metrics.py）：各 worker 把指标写入该目录，/metrics 汇总读取。
+# 需在导入应用（preload）之前设置，每次启动清空上次运行留下的文件
+metrics_dir = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', os.path.join(worker_tmp_dir or tempfile.gettempdir(), 'jiuba-metrics')
+)
+shutil.rmtree(metrics_dir, ignore_errors=True)
+os.makedirs(metrics_dir, exist_ok=True)
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-') or None
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def when_ready(server):
+    server.log.info(
+        'profile=%s worker_class=%s workers=%s threads=%s cpus=%s',
+        profile_name, worker_class, workers, threads, CPUS,
+    )
+
+
+def post_fork(server, worker):
+    # preload 时 master 若打开过数据库连接，不能在 worker 之间共享
+    if preload_app:
+        from django.db import connections
+        connections.close_all()
+
+
+def child_exit(server, worker):
+    # 退出的 worker 不再计入当前值类指标（打开的数据库连接数等）
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'jiuba.settings')
+# 启用支付等接口的异步视图（settings.ASYNC_VIEWS）
+os.environ.setdefault('JIUBA_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
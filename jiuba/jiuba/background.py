@@ -0,0 +1,60 @@
+"""
+进程内后台任务
+
+用于不需要阻塞请求的派生数据重建（菜单快照、图片缩略图等）。
+任务在数据库事务提交后提交到线程池执行；相同 key 的任务在执行前会被合并，
+避免批量修改商品时重复重建。BACKGROUND_TASK_WORKERS = 0 时同步执行。
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_pending = set()
+_executor = None
+
+
+def _get_executor():
+    # 延迟创建：gunicorn preload 时线程池不能在 fork 之前启动
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.BACKGROUND_TASK_WORKERS,
+                thread_name_prefix='jiuba-background',
+            )
+        return _executor
+
+
+def _run(key, func, args):
+    if key is not None:
+        with _lock:
+            # 开始执行即移出队列，执行期间的新修改会再排一次
+            _pending.discard(key)
+    try:
+        func(*args)
+    except Exception:
+        logger.exception('后台任务执行失败: %s%r', func.__name__, args)
+    finally:
+        connections.close_all()
+
+
+def submit(func, *args, key=None):
+    """事务提交后在后台线程执行 func(*args)"""
+    def enqueue():
+        if not settings.BACKGROUND_TASK_WORKERS:
+            func(*args)
+            return
+        if key is not None:
+            with _lock:
+                if key in _pending:
+                    return
+                _pending.add(key)
+        _get_executor().submit(_run, key, func, args)
+
+    transaction.on_commit(enqueue)
@@ -0,0 +1,162 @@
+"""
+动态响应压缩
+
+按 Accept-Encoding 选择 brotli（已安装 brotli 时）或 gzip，只压缩文本类内容
+（JSON、HTML、CSV、JS 等），图片、已压缩的文件和 SSE 推送不处理：
+- 普通响应小于 COMPRESSION_MIN_SIZE 字节时不压缩，压缩后没有变小时返回原内容
+- 流式响应（订单导出等）逐块压缩，不把整个响应读入内存
+- HTML 页面可能包含 CSRF 令牌，只用带随机填充的 gzip（与 Django GZipMiddleware 相同的 BREACH 缓解）
+- 带 Cache-Control: no-transform 或已有 Content-Encoding 的响应原样返回
+
+静态文件由 WhiteNoise 直接返回 collectstatic 时生成的 .br / .gz 预压缩文件，不经过这里。
+各接口节省的字节数：python manage.py bench_compression
+"""
+import secrets
+from gzip import GzipFile
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import StreamingBuffer, compress_sequence, compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'application/x-ndjson',
+    'image/svg+xml',
+}
+# 逐条推送的事件流压缩后会被缓冲，失去实时性
+UNCOMPRESSIBLE_TEXT_TYPES = {'text/event-stream'}
+
+# Django GZipMiddleware 的随机文件名填充长度
+MAX_RANDOM_BYTES = 100
+
+
+def min_size():
+    return getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+
+
+def brotli_quality():
+    # 动态内容用中等质量：压缩率接近 gzip -9，CPU 开销与 gzip -6 相当
+    return getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 5)
+
+
+def is_compressible(content_type):
+    media_type = content_type.split(';', 1)[0].strip().lower()
+    if media_type.startswith('text/'):
+        return media_type not in UNCOMPRESSIBLE_TEXT_TYPES
+    return media_type in COMPRESSIBLE_TYPES or media_type.endswith('+json')
+
+
+def accepted_encodings(header):
+    """解析 Accept-Encoding，忽略 q=0 的编码"""
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        params = params.replace(' ', '')
+        if params.startswith('q='):
+            try:
+                if float(params[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def choose_encoding(header, content_type):
+    accepted = accepted_encodings(header)
+    is_html = content_type.startswith('text/html')
+    if brotli is not None and not is_html and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress_brotli(content):
+    return brotli.compress(content, quality=brotli_quality())
+
+
+def compress_brotli_sequence(sequence):
+    compressor = brotli.Compressor(quality=brotli_quality())
+    for item in sequence:
+        data = compressor.process(item)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def acompress_sequence(aiterator, encoding):
+    """
+    异步流式响应：整个响应使用同一个压缩器（一个 gzip 成员 / 一个 brotli 流），
+    每块之后刷出，避免客户端一直等不到数据
+    """
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=brotli_quality())
+        async for chunk in aiterator:
+            yield compressor.process(chunk) + compressor.flush()
+        yield compressor.finish()
+        return
+
+    buf = StreamingBuffer()
+    filename = b'a' * secrets.randbelow(MAX_RANDOM_BYTES)
+    with GzipFile(filename=filename, mode='wb', compresslevel=6, fileobj=buf, mtime=0) as zfile:
+        async for chunk in aiterator:
+            zfile.write(chunk)
+            zfile.flush()
+            yield buf.read()
+    yield buf.read()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """放在 WhiteNoiseMiddleware 之后，其余会读取或修改响应内容的中间件之前"""
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or response.status_code in (204, 206, 304):
+            return response
+        if not is_compressible(response.get('Content-Type', '')):
+            return response
+        if 'no-transform' in response.get('Cache-Control', ''):
+            return response
+        if not response.streaming and len(response.content) < min_size():
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), response['Content-Type'])
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = acompress_sequence(response.streaming_content, encoding)
+            elif encoding == 'br':
+                response.streaming_content = compress_brotli_sequence(response.streaming_content)
+            else:
+                response.streaming_content = compress_sequence(
+                    response.streaming_content, max_random_bytes=MAX_RANDOM_BYTES
+                )
+            # 压缩后的长度在发送完之前未知
+            del response.headers['Content-Length']
+        else:
+            if encoding == 'br':
+                compressed = compress_brotli(response.content)
+            else:
+                compressed = compress_string(response.content, max_random_bytes=MAX_RANDOM_BYTES)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # 压缩后的内容与原内容不再逐字节相同，强 ETag 改为弱 ETag（RFC 9110 8.8.1）
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,113 @@
+"""
+上传图片的缩略图生成
+
+原图保存后在后台线程生成 JPEG + WebP 两种格式、多个尺寸的缩略图，
+与原图放在同一目录，文件名为 原文件名.尺寸名.格式，例如：
+    products/2025/10/01/beer.jpg
+    products/2025/10/01/beer.jpg.small.webp
+    products/2025/10/01/beer.jpg.small.jpg
+"""
+import logging
+import re
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+from rest_framework import serializers
+
+from .background import submit
+
+logger = logging.getLogger(__name__)
+
+# 尺寸名 -> 最长边像素
+DERIVATIVE_SIZES = {
+    'small': 240,
+    'medium': 750,
+}
+DERIVATIVE_FORMATS = {
+    'jpeg': ('jpg', 'JPEG', {'quality': 80, 'optimize': True, 'progressive': True}),
+    'webp': ('webp', 'WEBP', {'quality': 78, 'method': 4}),
+}
+
+# 缩略图文件名的后缀：.尺寸名.格式
+DERIVATIVE_SUFFIX_RE = re.compile(r'\.(?:%s)\.(?:%s)$' % (
+    '|'.join(DERIVATIVE_SIZES), '|'.join(ext for ext, _, _ in DERIVATIVE_FORMATS.values())
+))
+
+
+def derivative_name(name, size, fmt):
+    return f'{name}.{size}.{DERIVATIVE_FORMATS[fmt][0]}'
+
+
+def original_name(name):
+    """缩略图对应的原图文件名，不是缩略图时返回 None"""
+    match = DERIVATIVE_SUFFIX_RE.search(name)
+    return name[:match.start()] if match else None
+
+
+def is_derivative_name(name):
+    return original_name(name) is not None
+
+
+def generate_derivatives(name):
+    """为一张已保存的图片生成全部缩略图（已存在的跳过），有新生成时返回 True"""
+    missing = [
+        (size, fmt)
+        for size in DERIVATIVE_SIZES
+        for fmt in DERIVATIVE_FORMATS
+        if not default_storage.exists(derivative_name(name, size, fmt))
+    ]
+    if not missing:
+        return False
+
+    with default_storage.open(name, 'rb') as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image.load()
+
+    if image.mode not in ('RGB', 'L'):
+        # 透明背景铺白，JPEG 不支持透明通道
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.convert('RGBA').getchannel('A'))
+        image = background
+
+    for size, fmt in missing:
+        resized = image.copy()
+        longest = DERIVATIVE_SIZES[size]
+        resized.thumbnail((longest, longest), Image.LANCZOS)
+        _, pil_format, options = DERIVATIVE_FORMATS[fmt]
+        buffer = BytesIO()
+        resized.save(buffer, pil_format, **options)
+        default_storage.save(derivative_name(name, size, fmt), ContentFile(buffer.getvalue()))
+    return True
+
+
+def schedule_derivatives(field_file, task=generate_derivatives, *args):
+    """事务提交后在后台生成缩略图，task 可替换为生成后还需做其它处理的函数"""
+    if field_file:
+        submit(task, field_file.name, *args, key=('image_derivatives', field_file.name))
+
+
+def derivative_urls(name, request=None):
+    """
+    返回 {'small': {'jpeg': url, 'webp': url}, ...}
+    地址按文件名约定生成，不逐个检查文件是否存在（列表每行不再访问存储）；
+    缩略图尚未生成时，媒体服务（jiuba/media.py）临时重定向到原图并补生成
+    """
+    if not name:
+        return None
+
+    def absolute(url):
+        return request.build_absolute_uri(url) if request is not None else url
+
+    return {
+        size: {fmt: absolute(default_storage.url(derivative_name(name, size, fmt))) for fmt in DERIVATIVE_FORMATS}
+        for size in DERIVATIVE_SIZES
+    }
+
+
+class ImageDerivativesField(serializers.ReadOnlyField):
+    """序列化图片字段对应的缩略图地址"""
+
+    def to_representation(self, value):
+        return derivative_urls(value.name, self.context.get('request'))
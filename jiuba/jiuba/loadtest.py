@@ -0,0 +1,119 @@
+"""
+压测工具
+
+在子进程中按 gunicorn.conf.py 的运行方案启动服务，并发发送请求并统计吞吐、延迟和内存，
+供 bench_* 管理命令使用。内存统计读取 /proc，仅支持 Linux。
+"""
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+
+REQUEST_ERRORS = (urllib.error.URLError, ConnectionError, socket.timeout)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(base_url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('gunicorn 启动失败')
+        try:
+            urllib.request.urlopen(base_url + '/', timeout=1).close()
+            return
+        except REQUEST_ERRORS:
+            time.sleep(0.2)
+    raise RuntimeError('等待 gunicorn 启动超时')
+
+
+@contextmanager
+def gunicorn_server(profile, workers=None, env=None):
+    """按 gunicorn.conf.py 中的 profile 启动服务，返回 (base_url, 进程)"""
+    port = free_port()
+    environ = dict(os.environ, GUNICORN_PROFILE=profile, PORT=str(port), GUNICORN_ACCESS_LOG='',
+                   GUNICORN_LOG_LEVEL='warning', **(env or {}))
+    if workers:
+        environ['WEB_CONCURRENCY'] = str(workers)
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py'],
+        cwd=settings.BASE_DIR, env=environ, stdout=sys.stdout, stderr=sys.stderr,
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        wait_ready(base_url, process)
+        yield base_url, process
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def _child_pids(pid):
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # 进程名可能含空格，取最后一个右括号之后的字段
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            children.append(int(entry))
+    return children
+
+
+def _proc_value(path, key):
+    try:
+        with open(path) as f:
+            for line in f:
+                if line.startswith(key):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def memory_usage(pid):
+    """
+    进程及其子进程的内存（字节）：(rss, pss)
+    RSS 把共享页重复计算；PSS 按共享进程数均摊，更接近容器实际占用
+    """
+    pids = [pid] + _child_pids(pid)
+    rss = sum(_proc_value(f'/proc/{p}/status', 'VmRSS:') for p in pids)
+    pss = sum(_proc_value(f'/proc/{p}/smaps_rollup', 'Pss:') for p in pids)
+    return rss * 1024, pss * 1024
+
+
+def worker_shape(pid):
+    """(worker 进程数, 单个 worker 的最大线程数)"""
+    children = _child_pids(pid)
+    threads = max((_proc_value(f'/proc/{child}/status', 'Threads:') for child in children), default=0)
+    return len(children), threads
+
+
+def run_concurrent(func, items, concurrency):
+    """并发执行 func(item)，返回 (结果列表, 用时秒)"""
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(func, items))
+    return results, time.perf_counter() - started
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    if not values:
+        return 0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
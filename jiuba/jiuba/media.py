@@ -0,0 +1,147 @@
+"""
+生产环境媒体文件服务
+
+- 文件名带内容哈希的文件返回一年期 immutable 缓存头，其它文件短期缓存并可协商
+- 支持单段 Range 请求（206），方便客户端断点续传
+- 配置 MEDIA_SENDFILE_HEADER 后只返回响应头，由前置代理（nginx X-Accel-Redirect /
+  Apache X-Sendfile）直接发送文件，gunicorn worker 不再读取文件内容
+- 缩略图尚未生成时临时重定向到原图，并在后台生成缩略图
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseNotModified, HttpResponseRedirect, StreamingHttpResponse
+)
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from .background import submit
+from .images import generate_derivatives, original_name
+from .storage import is_hashed_name
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+DEFAULT_CACHE_CONTROL = 'public, max-age=3600'
+CHUNK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _parse_range(header, size):
+    """解析单段 Range，返回 (start, end)；无法满足返回 False；忽略返回 None"""
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        # 多段或格式不支持时按 RFC 7233 忽略 Range，返回完整内容
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    elif last:
+        start = max(size - int(last), 0)
+        end = size - 1
+    else:
+        return None
+    if start > end or start >= size:
+        return False
+    return start, end
+
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _not_modified(request, etag, mtime):
+    """条件请求：有 If-None-Match 时只比较 ETag（弱比较），忽略 If-Modified-Since（RFC 7232 §6）"""
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        etags = parse_etags(if_none_match)
+        return '*' in etags or etag in {tag.removeprefix('W/') for tag in etags}
+    modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return modified_since is not None and int(mtime) <= modified_since
+
+
+def _full_path(path):
+    try:
+        return safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+
+
+def _missing_derivative(path):
+    """缩略图尚未生成（刚上传、历史图片）：临时重定向到原图，不缓存，后台补生成后即可直接访问"""
+    original = original_name(path)
+    if original is None or not os.path.isfile(_full_path(original)):
+        raise Http404
+    submit(generate_derivatives, original, key=('image_derivatives', original))
+    response = HttpResponseRedirect(default_storage.url(original))
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    fullpath = _full_path(path)
+    if not os.path.isfile(fullpath):
+        return _missing_derivative(path)
+
+    stat = os.stat(fullpath)
+    etag = '"%x-%x"' % (int(stat.st_mtime), stat.st_size)
+    cache_control = IMMUTABLE_CACHE_CONTROL if is_hashed_name(path) else DEFAULT_CACHE_CONTROL
+
+    if _not_modified(request, etag, stat.st_mtime):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        response['Cache-Control'] = cache_control
+        return response
+
+    content_type, encoding = mimetypes.guess_type(fullpath)
+    content_type = content_type or 'application/octet-stream'
+
+    sendfile_header = getattr(settings, 'MEDIA_SENDFILE_HEADER', None)
+    if sendfile_header:
+        # 代理负责 Range 和文件发送；响应头只能是 latin-1，中文等文件名需百分号编码，由代理解码
+        response = HttpResponse(content_type=content_type)
+        if sendfile_header == 'X-Accel-Redirect':
+            response[sendfile_header] = quote(settings.MEDIA_SENDFILE_PREFIX.rstrip('/') + '/' + path.lstrip('/'))
+        else:
+            response[sendfile_header] = quote(fullpath)
+    else:
+        byte_range = None
+        if 'Range' in request.headers:
+            byte_range = _parse_range(request.headers['Range'], stat.st_size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+        if byte_range:
+            start, end = byte_range
+            length = end - start + 1
+            response = StreamingHttpResponse(
+                _read_range(fullpath, start, length), status=206, content_type=content_type
+            )
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+            response['Content-Length'] = str(length)
+        else:
+            response = FileResponse(open(fullpath, 'rb'), content_type=content_type)
+        response['Accept-Ranges'] = 'bytes'
+
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['ETag'] = etag
+    response['Cache-Control'] = cache_control
+    return response
@@ -0,0 +1,108 @@
+"""
+Prometheus 指标
+
+指标只在进程内累加，不写数据库。gunicorn 下（gunicorn.conf.py 设置 PROMETHEUS_MULTIPROC_DIR）
+每个 worker 把指标值写入该目录下以进程号命名的 mmap 文件，/metrics 由收到抓取请求的 worker
+读取整个目录汇总；worker 退出后由 master 标记（child_exit），当前值类指标只统计存活的 worker。
+未设置该环境变量时（runserver、测试）使用进程内的默认注册表。
+
+/metrics 需带 Authorization: Bearer <METRICS_TOKEN>；未配置令牌时返回 404，
+除非显式设置 METRICS_PUBLIC（仅限本地开发或只在内网暴露时）。
+"""
+import os
+import threading
+import weakref
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+
+# 其它请求方法记为 OTHER，避免标签取值无限增长
+HTTP_METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# 请求（由 RequestMetricsMiddleware 记录），view 为 URL 名称，未匹配路由时为 unmatched
+REQUEST_LATENCY = Histogram(
+    'jiuba_http_request_duration_seconds', '请求处理耗时', ['method', 'view', 'status'], buckets=LATENCY_BUCKETS,
+)
+REQUEST_QUERIES = Histogram(
+    'jiuba_http_request_queries', '每个请求的 SQL 条数', ['view'], buckets=(1, 2, 5, 10, 20, 50, 100),
+)
+REQUEST_DB_TIME = Histogram(
+    'jiuba_http_request_db_seconds', '每个请求的 SQL 耗时', ['view'], buckets=LATENCY_BUCKETS,
+)
+
+# 下单：success / empty_cart / no_cart / invalid / error
+CHECKOUTS = Counter('jiuba_checkouts_total', '下单结果', ['result'])
+
+# 发起支付：method 为 wechat / balance / invalid，result 为 success / failure
+PAYMENTS = Counter('jiuba_payments_total', '发起支付结果', ['method', 'result'])
+# 支付回调：success / duplicate（已处理过）/ fail（支付失败）/ unknown（无此支付）/ invalid
+PAYMENT_CALLBACKS = Counter('jiuba_payment_callbacks_total', '支付回调', ['result'])
+PAYMENT_CALLBACK_LAG = Histogram(
+    'jiuba_payment_callback_lag_seconds', '从创建支付到收到支付成功回调的时间',
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800),
+)
+
+# 预约占位：admitted / full（名额已满）/ invalid / promoted（候补转正）
+RESERVATION_ADMISSIONS = Counter('jiuba_reservation_admissions_total', '预约占位结果', ['result'])
+
+DB_CONNECTIONS_OPENED = Counter('jiuba_db_connections_opened_total', '新建的数据库连接', ['alias'])
+DB_CONNECTIONS_OPEN = Gauge(
+    'jiuba_db_connections_open', '当前打开的数据库连接', ['alias'], multiprocess_mode='livesum',
+)
+
+# 本进程创建过的连接（各线程各自持有），用于统计当前打开的连接数
+_connections = weakref.WeakSet()
+_connections_lock = threading.Lock()
+
+
+def track_connection(connection):
+    """connection_created 信号调用"""
+    with _connections_lock:
+        _connections.add(connection)
+    DB_CONNECTIONS_OPENED.labels(connection.alias).inc()
+    update_connection_gauge()
+
+
+def update_connection_gauge():
+    counts = {}
+    with _connections_lock:
+        connections = list(_connections)
+    for connection in connections:
+        if connection.connection is not None:
+            counts[connection.alias] = counts.get(connection.alias, 0) + 1
+    for alias in settings.DATABASES:
+        DB_CONNECTIONS_OPEN.labels(alias).set(counts.get(alias, 0))
+
+
+def observe_request(method, view, status, duration, queries, db_time):
+    view = view or 'unmatched'
+    method = method if method in HTTP_METHODS else 'OTHER'
+    REQUEST_LATENCY.labels(method, view, str(status)).observe(duration)
+    REQUEST_QUERIES.labels(view).observe(queries)
+    REQUEST_DB_TIME.labels(view).observe(db_time)
+    update_connection_gauge()
+
+
+def registry():
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        collected = CollectorRegistry()
+        multiprocess.MultiProcessCollector(collected)
+        return collected
+    return REGISTRY
+
+
+@require_GET
+def metrics_view(request):
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token and not getattr(settings, 'METRICS_PUBLIC', False):
+        raise Http404
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=401)
+    return HttpResponse(generate_latest(registry()), content_type=CONTENT_TYPE_LATEST)
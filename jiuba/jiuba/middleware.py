@@ -1,3 +1,134 @@
+"""
+项目级中间件
+
+- RequestMetricsMiddleware：记录每个请求的耗时、SQL 条数与耗时、响应大小和视图名，
+  写入 Server-Timing 响应头、Prometheus 直方图（jiuba/metrics.py）
+  和 jiuba.requests 日志（每行一个 JSON，Cloud Run 按结构化日志解析），
+  超过 SLOW_REQUEST_MS / MAX_REQUEST_QUERIES 的请求以 WARNING 级别记录。
+  REQUEST_METRICS_ENABLED 为 False 时不加载，没有任何开销。
+- MerchantAuthMiddleware：商家后台登录检查
+"""
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.shortcuts import redirect
+
+from .metrics import observe_request
+
+logger = logging.getLogger('jiuba.requests')
+
+
+class QueryRecorder:
+    """connection.execute_wrapper 的包装函数，统计 SQL 条数与耗时"""
+    __slots__ = ('count', 'duration')
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+def _wrap_connections(recorder):
+    """在当前线程的所有数据库连接上安装 recorder，关闭返回的 ExitStack 时移除"""
+    stack = ExitStack()
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(recorder))
+    return stack
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    return match.view_name or match._func_path
+
+
+class RequestMetricsMiddleware:
+    """
+    放在 CompressionMiddleware 之后，响应大小为压缩前的序列化结果。
+    流式响应（导出、SSE）只统计到返回响应对象为止，大小记为 null。
+    同时支持 WSGI 和 ASGI：ASGI 下同步视图和 sync_to_async 中的 ORM 调用都在本请求专用的线程里执行，
+    包装函数也安装在该线程的连接上。
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, 'SLOW_REQUEST_MS', 500)
+        self.max_queries = getattr(settings, 'MAX_REQUEST_QUERIES', 30)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with _wrap_connections(recorder):
+            response = self.get_response(request)
+        self.record(request, response, recorder, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        stack = await sync_to_async(_wrap_connections)(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        self.record(request, response, recorder, time.perf_counter() - started)
+        return response
+
+    def record(self, request, response, recorder, elapsed):
+        total_ms = elapsed * 1000
+        db_ms = recorder.duration * 1000
+        timing = f'db;dur={db_ms:.1f};desc="{recorder.count} queries", app;dur={total_ms:.1f}'
+        if response.has_header('Server-Timing'):
+            timing = f"{response['Server-Timing']}, {timing}"
+        response['Server-Timing'] = timing
+        name = view_name(request)
+        observe_request(request.method, name, response.status_code, elapsed, recorder.count, recorder.duration)
+
+        flags = []
+        if total_ms >= self.slow_ms:
+            flags.append('slow')
+        if recorder.count > self.max_queries:
+            flags.append('queries')
+        level = logging.WARNING if flags else logging.INFO
+        if not logger.isEnabledFor(level):
+            return
+        logger.log(level, json.dumps({
+            'severity': logging.getLevelName(level),
+            'message': f'{request.method} {request.path} {response.status_code} {total_ms:.0f}ms',
+            'method': request.method,
+            'path': request.path,
+            'view': name,
+            'status': response.status_code,
+            'duration_ms': round(total_ms, 1),
+            'db_ms': round(db_ms, 1),
+            'queries': recorder.count,
+            'size': None if response.streaming else len(response.content),
+            'flags': flags,
+        }, ensure_ascii=False))
+
+
 class MerchantAuthMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
@@ -6,7 +137,6 @@ class MerchantAuthMiddleware:
         # 检查是否是商家后台路径
         if request.path.startswith('/merchant/') and not request.path.startswith('/merchant/login/'):
             if not request.user.is_authenticated or not request.user.is_staff:  # 临时使用 is_staff
-                from django.shortcuts import redirect
                 return redirect('/merchant/login/')
         
         response = self.get_response(request)
@@ -0,0 +1,200 @@
+"""
+N+1 查询检测
+
+去掉字面量、把 IN (%s, %s, ...) 折叠后相同的 SQL 视为同一形状，一个请求 / 代码块内
+同一形状执行达到 NPLUSONE_THRESHOLD 次即视为 N+1（常见于序列化器里 source='category.name'
+之类的外键访问、模型属性里的 self.items.all() 等），报告该语句、次数和触发它的调用栈。
+
+- NPlusOneDetector：上下文管理器，在当前线程的所有数据库连接上记录 SQL
+- NPlusOneMiddleware：开发环境检测每个请求（NPLUSONE_ENABLED，默认关闭），
+  发现 N+1 时写 jiuba.nplusone 警告日志，NPLUSONE_RAISE 为 True 时抛出 NPlusOneError
+- NPlusOneTestMixin：测试用例中 with self.assertNoNPlusOne(): ... 断言代码块内没有 N+1
+"""
+import logging
+import os
+import re
+import sys
+import traceback
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.template.base import Node
+from rest_framework.fields import Field
+
+from . import middleware
+from .middleware import _wrap_connections, view_name
+
+logger = logging.getLogger('jiuba.nplusone')
+
+# 事务控制语句在循环里重复出现是正常的
+IGNORED_PREFIXES = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT', 'BEGIN', 'COMMIT', 'ROLLBACK')
+
+# 报告中保留的项目代码帧数
+STACK_DEPTH = 8
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN \(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+_THIS_FILE = os.path.abspath(__file__)
+
+
+class NPlusOneError(AssertionError):
+    pass
+
+
+def fingerprint(sql):
+    """SQL 形状：字面量替换为 ?，IN 列表折叠为 IN (...)"""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def default_threshold():
+    return getattr(settings, 'NPLUSONE_THRESHOLD', 3)
+
+
+def _project_dir():
+    return os.path.abspath(str(settings.BASE_DIR)) + os.sep
+
+
+# 中间件链和 SQL 包装函数本身的帧，不出现在报告里
+_SKIPPED_FILES = {_THIS_FILE, os.path.abspath(middleware.__file__)}
+
+
+def capture_stack():
+    """项目代码中的调用帧（最近的 STACK_DEPTH 帧），第三方库和中间件链的帧不列出"""
+    project_dir = _project_dir()
+    stack = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(project_dir) and frame.filename not in _SKIPPED_FILES
+        and 'site-packages' not in frame.filename and os.path.basename(frame.filename) != 'manage.py'
+    ][-STACK_DEPTH:]
+    return ''.join(traceback.format_list(stack))
+
+
+def query_source():
+    """触发查询的 DRF 序列化字段（如 ProductSerializer.category_name）或模板行，都不是时返回 None"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        owner = frame.f_locals.get('self')
+        if isinstance(owner, Field) and getattr(owner, 'parent', None) is not None:
+            return f'序列化字段 {type(owner.parent).__name__}.{owner.field_name}'
+        if isinstance(owner, Node) and getattr(owner, 'token', None) is not None:
+            return f'模板 {owner.origin.template_name}:{owner.token.lineno}'
+        frame = frame.f_back
+    return None
+
+
+class RepeatedQuery:
+    __slots__ = ('sql', 'count', 'stack', 'source')
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.count = 0
+        self.stack = None
+        self.source = None
+
+    def __str__(self):
+        source = f'（{self.source}）' if self.source else ''
+        return f'{self.count} 次{source}：{self.sql}\n{self.stack or ""}'
+
+
+class NPlusOneDetector:
+    """
+    with NPlusOneDetector() as detector:
+        ...
+    detector.repeated  # 达到阈值的 RepeatedQuery 列表
+
+    只记录当前线程的连接；达到阈值时才抓取调用栈，不重复的查询只多一次正则替换的开销。
+    """
+
+    def __init__(self, threshold=None):
+        self.threshold = threshold if threshold is not None else default_threshold()
+        self.queries = {}
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        if not sql.lstrip().upper().startswith(IGNORED_PREFIXES):
+            key = fingerprint(sql)
+            query = self.queries.get(key)
+            if query is None:
+                query = self.queries[key] = RepeatedQuery(key)
+            query.count += 1
+            if query.count == self.threshold:
+                query.stack = capture_stack()
+                query.source = query_source()
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._stack = _wrap_connections(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    @property
+    def repeated(self):
+        return [query for query in self.queries.values() if query.count >= self.threshold]
+
+    def report(self):
+        return '\n'.join(str(query) for query in sorted(self.repeated, key=lambda query: -query.count))
+
+
+class NPlusOneMiddleware:
+    """放在 RequestMetricsMiddleware 之后；同时支持 WSGI 和 ASGI，ASGI 下的处理方式与其相同"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'NPLUSONE_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with NPlusOneDetector() as detector:
+            response = self.get_response(request)
+        self.check(request, detector)
+        return response
+
+    async def __acall__(self, request):
+        detector = NPlusOneDetector()
+        await sync_to_async(detector.__enter__)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(detector.__exit__)(None, None, None)
+        self.check(request, detector)
+        return response
+
+    def check(self, request, detector):
+        if not detector.repeated:
+            return
+        message = f'{request.method} {request.path}（{view_name(request)}）存在 N+1 查询：\n{detector.report()}'
+        if getattr(settings, 'NPLUSONE_RAISE', False):
+            raise NPlusOneError(message)
+        logger.warning(message)
+
+
+class NPlusOneTestMixin:
+    """
+    class ProductApiTests(NPlusOneTestMixin, TestCase):
+        def test_list(self):
+            with self.assertNoNPlusOne():
+                self.client.get('/api/product/product/')
+    """
+
+    @contextmanager
+    def assertNoNPlusOne(self, threshold=None):
+        with NPlusOneDetector(threshold) as detector:
+            yield detector
+        if detector.repeated:
+            raise self.failureException(f'存在 N+1 查询：\n{detector.report()}')
@@ -0,0 +1,27 @@
+"""
+基于 orjson 的 JSON 解析器
+
+请求体按 UTF-8 直接解析，不经过 codecs 流式解码；未安装 orjson 或请求声明了其它字符集时
+退回 DRF 的 JSONParser。与 STRICT_JSON 默认值不同，NaN / Infinity 总是被拒绝。
+"""
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from .renderers import ORJSONRenderer, orjson
+
+
+class ORJSONParser(JSONParser):
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        # request.encoding 来自 Content-Type 的 charset，未声明时为 DEFAULT_CHARSET
+        encoding = parser_context.get('encoding') or settings.DEFAULT_CHARSET
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
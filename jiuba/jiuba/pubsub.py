@@ -0,0 +1,56 @@
+"""
+进程内发布 / 订阅
+
+同步代码（请求处理线程、后台任务）调用 publish()，ASGI 事件循环中的订阅者通过
+asyncio.Queue 接收。只在当前进程内广播：多 worker 部署时订阅方需要配合数据库轮询
+（见 apps.order.live），本模块只负责让同进程内的事件即时送达。
+"""
+import asyncio
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+# 订阅者消费过慢时丢弃新消息，由订阅方通过轮询补齐
+QUEUE_SIZE = 100
+
+_lock = threading.Lock()
+_subscribers = defaultdict(set)
+
+
+def publish(channel, message):
+    """向频道的所有订阅者投递消息，可在任意线程调用"""
+    with _lock:
+        subscribers = list(_subscribers.get(channel, ()))
+    for loop, queue in subscribers:
+        try:
+            loop.call_soon_threadsafe(_deliver, queue, message)
+        except RuntimeError:
+            # 事件循环已关闭
+            pass
+
+
+def _deliver(queue, message):
+    try:
+        queue.put_nowait(message)
+    except asyncio.QueueFull:
+        pass
+
+
+@contextmanager
+def subscribe(channel):
+    """在事件循环中订阅频道：with subscribe('orders') as queue: await queue.get()"""
+    subscriber = (asyncio.get_running_loop(), asyncio.Queue(QUEUE_SIZE))
+    with _lock:
+        _subscribers[channel].add(subscriber)
+    try:
+        yield subscriber[1]
+    finally:
+        with _lock:
+            _subscribers[channel].discard(subscriber)
+            if not _subscribers[channel]:
+                del _subscribers[channel]
+
+
+def subscriber_count(channel):
+    with _lock:
+        return len(_subscribers.get(channel, ()))
@@ -2,8 +2,8 @@
 Django settings for jiuba project.
 """
 
-import sys
 import os
+import tempfile
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -25,14 +25,14 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 FILE_UPLOAD_PERMISSIONS = 0o644
 
+# 媒体文件交给前置代理发送：nginx 设为 X-Accel-Redirect（配合 internal location），
+# Apache/lighttpd 设为 X-Sendfile；为空时由 Django 直接发送
+MEDIA_SENDFILE_HEADER = os.environ.get('MEDIA_SENDFILE_HEADER') or None
+MEDIA_SENDFILE_PREFIX = os.environ.get('MEDIA_SENDFILE_PREFIX', '/protected-media/')
+
 # 自定义用户模型
 AUTH_USER_MODEL = 'user.User'
 
-# 将apps目录添加到Python路径中
-print(f"BASE_DIR type: {type(BASE_DIR)}")
-print(f"BASE_DIR value: {BASE_DIR}")
-sys.path.insert(0, os.path.join(BASE_DIR, 'apps'))
-
 # Application definition
 INSTALLED_APPS = [
     'django.contrib.admin',
@@ -51,17 +51,23 @@ INSTALLED_APPS = [
     'apps.payment',
     'apps.shop',
     'apps.endpoints',
-    'apps.services',
     'apps.cart',
     'apps.activity',
     'apps.merchant',
     'apps.notice',  # 新增的应用
+    'apps.search',
 ]
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # 调整位置：在SecurityMiddleware之后
+    # 压缩 API / 页面响应，静态文件由 WhiteNoise 返回预压缩文件
+    'jiuba.compression.CompressionMiddleware',
+    # 请求耗时、SQL 统计，Server-Timing 响应头和结构化日志
+    'jiuba.middleware.RequestMetricsMiddleware',
+    # 开发环境检测 N+1 查询
+    'jiuba.nplusone.NPlusOneMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -71,7 +77,57 @@ MIDDLEWARE = [
     'jiuba.middleware.MerchantAuthMiddleware',
 ]
 
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# 请求统计（jiuba/middleware.py），关闭后中间件不加载；超过阈值的请求以 WARNING 级别记录，
+# REQUEST_LOG_LEVEL=INFO 时记录所有请求
+REQUEST_METRICS_ENABLED = os.environ.get('REQUEST_METRICS_ENABLED', '1') == '1'
+SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', 500))
+MAX_REQUEST_QUERIES = int(os.environ.get('MAX_REQUEST_QUERIES', 30))
+
+# N+1 查询检测（jiuba/nplusone.py）：同一形状的 SQL 在一个请求内执行达到阈值次数时
+# 写 jiuba.nplusone 警告日志，NPLUSONE_RAISE=1 时直接报错。每条 SQL 都要做正则归一化，
+# 默认关闭，开发环境通过 NPLUSONE_ENABLED=1 开启（docker-compose.yml、Dockerfile.dev）
+NPLUSONE_ENABLED = os.environ.get('NPLUSONE_ENABLED', '0') == '1'
+NPLUSONE_RAISE = os.environ.get('NPLUSONE_RAISE', '0') == '1'
+NPLUSONE_THRESHOLD = int(os.environ.get('NPLUSONE_THRESHOLD', 3))
+
+# /metrics 的 Bearer 令牌，为空时 /metrics 返回 404；
+# METRICS_PUBLIC=1 时不带令牌也可以访问（仅限本地开发或只在内网暴露时）
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_PUBLIC = os.environ.get('METRICS_PUBLIC', '0') == '1'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        # 日志内容本身是 JSON
+        'raw': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'requests': {'class': 'logging.StreamHandler', 'formatter': 'raw'},
+    },
+    'loggers': {
+        'jiuba.requests': {
+            'handlers': ['requests'],
+            'level': os.environ.get('REQUEST_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
+# 小于该字节数的响应不压缩；动态 brotli 压缩质量（0-11）
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_BROTLI_QUALITY = 5
+
+STORAGES = {
+    # 上传文件名附加内容哈希，便于长期缓存
+    'default': {
+        'BACKEND': 'jiuba.storage.HashedMediaStorage',
+    },
+    # collectstatic 时生成 .gz 和 .br（需安装 brotli）预压缩文件
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
 ROOT_URLCONF = 'jiuba.urls'
 
 TEMPLATES = [
@@ -142,7 +198,31 @@ STATICFILES_FINDERS = [
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# 缓存配置：多个 gunicorn worker 需要共享缓存，才能在数据变更时统一失效
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(tempfile.gettempdir(), 'jiuba_cache'),
+    }
+}
+
+# ASGI 部署（jiuba/asgi.py 设置 JIUBA_ASYNC_VIEWS=1）时，调用外部接口的视图改用异步版本
+ASYNC_VIEWS = os.environ.get('JIUBA_ASYNC_VIEWS') == '1'
+
+# 后台任务线程数（jiuba.background），0 表示在请求内同步执行
+BACKGROUND_TASK_WORKERS = 2
+
 REST_FRAMEWORK = {
+    # orjson 渲染 / 解析 JSON，输出与 DRF 默认一致（见 jiuba/renderers.py）
+    'DEFAULT_RENDERER_CLASSES': [
+        'jiuba.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'jiuba.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
@@ -152,8 +232,9 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
-        'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
+        # 需在 OrderingFilter 之后，搜索结果才能按相关度排序
+        'apps.search.filters.IndexedSearchFilter',
     ],
 }
 
@@ -163,4 +244,14 @@ WECHAT_APP_ID = '您的微信小程序AppID'
 WECHAT_APP_SECRET = '您的微信小程序AppSecret'
 WECHAT_MCH_ID = '您的微信支付商户号'
 WECHAT_API_KEY = '您的微信支付API密钥'
-WECHAT_NOTIFY_URL = 'https://yourdomain.com/api/payment/wechat-callback/'
\ No newline at end of file
+WECHAT_NOTIFY_URL = 'https://yourdomain.com/api/payment/wechat_callback/'
+# 微信支付 API 地址，为空时使用模拟支付（不发起网络请求）
+WECHAT_PAY_API_BASE = os.environ.get('WECHAT_PAY_API_BASE', '')
+
+# 活动开始前提醒（python manage.py send_reservation_reminders）
+RESERVATION_REMINDER_LEAD_MINUTES = 120
+# 发送器：ConsoleSender 打印日志，FileSender 写入 RESERVATION_REMINDER_OUTBOX（JSON Lines），
+# 接入微信订阅消息后替换为对应实现
+RESERVATION_REMINDER_SENDER = 'apps.reservations.reminders.ConsoleSender'
+RESERVATION_REMINDER_OUTBOX = BASE_DIR / 'reminder_outbox.jsonl'
+WECHAT_REMINDER_TEMPLATE_ID = '您的活动提醒订阅消息模板ID'
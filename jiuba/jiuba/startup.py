@@ -0,0 +1,139 @@
+"""
+冷启动耗时测量
+
+在全新的子进程中依次计时：导入配置、django.setup()、创建 WSGI 处理器（加载中间件）、
+处理第一个请求（导入 URLconf 和视图），可同时用 python -X importtime 统计各模块的导入耗时。
+供 startup_profile 管理命令和启动测试使用。
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+
+# 冷启动预算（秒）：配置导入 + django.setup() + 第一个请求（测试中取多次运行的中位数），可用 STARTUP_BUDGET_SECONDS 覆盖
+DEFAULT_BUDGET = 2.0
+
+# 冷启动不应导入的模块（含子模块）：遗留的 FastAPI 代码、测试框架、只供管理命令使用的模块
+EXCLUDED_MODULES = (
+    'apps.services', 'fastapi', 'pydantic', 'unittest', 'django.test',
+    'apps.endpoints.benchdata', 'apps.endpoints.seeding', 'jiuba.startup',
+)
+
+PHASES = (
+    ('settings', '导入配置'),
+    ('setup', 'django.setup()'),
+    ('handler', '加载中间件'),
+    ('first_request', '第一个请求'),
+)
+
+CHILD_SCRIPT = r'''
+import json, os, sys, time
+from io import BytesIO
+from wsgiref.util import setup_testing_defaults
+
+marks = [time.perf_counter()]
+sys_path = list(sys.path)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'jiuba.settings')
+import django
+from django.conf import settings
+settings.INSTALLED_APPS
+marks.append(time.perf_counter())
+sys_path_changed = sys.path != sys_path
+django.setup()
+marks.append(time.perf_counter())
+from django.core.handlers.wsgi import WSGIHandler
+handler = WSGIHandler()
+marks.append(time.perf_counter())
+path, _, query = sys.argv[1].partition('?')
+environ = {'PATH_INFO': path, 'QUERY_STRING': query, 'wsgi.input': BytesIO()}
+setup_testing_defaults(environ)
+statuses = []
+b''.join(handler(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+marks.append(time.perf_counter())
+print(json.dumps({
+    'marks': marks, 'status': statuses[0], 'sys_path_changed': sys_path_changed, 'modules': sorted(sys.modules),
+}))
+'''
+
+
+@dataclass
+class ImportRecord:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def budget():
+    return float(os.environ.get('STARTUP_BUDGET_SECONDS', DEFAULT_BUDGET))
+
+
+def parse_importtime(output):
+    """解析 -X importtime 输出：import time: self [us] | cumulative | imported package"""
+    records = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        module = name.lstrip()
+        records.append(ImportRecord(
+            module=module,
+            self_us=int(parts[0]),
+            cumulative_us=int(parts[1]),
+            depth=(len(name) - len(module) - 1) // 2,
+        ))
+    return records
+
+
+def measure_cold_start(path='/', importtime=False):
+    """
+    在新进程中测量冷启动，返回：
+    {'phases': {阶段: 秒}, 'process': 进程总用时, 'status': 第一个请求的状态行,
+     'output': 启动过程中打印到标准输出的内容, 'sys_path_changed': 导入配置是否修改了 sys.path,
+     'modules': 第一个请求完成时已导入的模块, 'imports': [ImportRecord]}
+    """
+    command = [sys.executable]
+    if importtime:
+        command += ['-X', 'importtime']
+    command += ['-c', CHILD_SCRIPT, path]
+    env = dict(os.environ)
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'jiuba.settings')
+
+    started = time.perf_counter()
+    completed = subprocess.run(command, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if completed.returncode != 0:
+        raise RuntimeError(f'冷启动子进程失败:\n{completed.stderr[-2000:]}')
+
+    *output, last_line = completed.stdout.strip().splitlines()
+    result = json.loads(last_line)
+    marks = result['marks']
+    return {
+        'phases': {name: marks[i + 1] - marks[i] for i, (name, _) in enumerate(PHASES)},
+        'process': elapsed,
+        'status': result['status'],
+        'output': '\n'.join(output),
+        'sys_path_changed': result['sys_path_changed'],
+        'modules': result['modules'],
+        'imports': parse_importtime(completed.stderr) if importtime else [],
+    }
+
+
+def cold_start_seconds(result):
+    """预算覆盖的部分：导入配置、django.setup() 到第一个请求完成（不含解释器自身启动）"""
+    return sum(result['phases'].values())
+
+
+def excluded_imports(result):
+    """冷启动中导入了的 EXCLUDED_MODULES 模块"""
+    return [
+        module for module in result['modules']
+        if any(module == name or module.startswith(name + '.') for name in EXCLUDED_MODULES)
+    ]
@@ -0,0 +1,37 @@
+"""
+媒体文件存储
+
+上传文件名中插入内容哈希（beer.jpg -> beer.3f2a9c1d0b7e.jpg），
+文件内容变化时地址随之变化，因此可以对媒体文件设置永久缓存。
+缩略图的文件名由原图文件名决定（jiuba/images.py 按名称查找），保存时不做改动。
+"""
+import hashlib
+import os
+import re
+
+from django.core.files.storage import FileSystemStorage
+
+from .images import is_derivative_name
+
+HASH_LENGTH = 12
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{%d}\.' % HASH_LENGTH)
+
+
+def is_hashed_name(name):
+    return bool(HASHED_NAME_RE.search(os.path.basename(name)))
+
+
+class HashedMediaStorage(FileSystemStorage):
+
+    def save(self, name, content, max_length=None):
+        # 已带哈希的文件名和缩略图（beer.jpg.small.webp）原样保存
+        if name is not None and not is_hashed_name(name) and not is_derivative_name(name):
+            name = self.hashed_name(name, content)
+        return super().save(name, content, max_length=max_length)
+
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk if isinstance(chunk, bytes) else chunk.encode())
+        root, ext = os.path.splitext(name)
+        return f'{root}.{digest.hexdigest()[:HASH_LENGTH]}{ext}'
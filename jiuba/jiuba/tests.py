@@ -0,0 +1,134 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+from urllib.parse import quote
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import SimpleTestCase, override_settings
+from django.utils.http import http_date
+from PIL import Image
+
+from .images import (
+    DERIVATIVE_FORMATS, DERIVATIVE_SIZES, derivative_name, derivative_urls, generate_derivatives, original_name,
+)
+from .storage import is_hashed_name
+
+
+def jpeg_bytes(size=(400, 300)):
+    buffer = BytesIO()
+    Image.new('RGB', size, (200, 120, 40)).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+class MediaRootMixin:
+    """每个用例使用独立的临时 MEDIA_ROOT"""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+
+class HashedMediaStorageTests(MediaRootMixin, SimpleTestCase):
+
+    def test_upload_name_hashed(self):
+        name = default_storage.save('products/beer.jpg', ContentFile(b'beer'))
+        self.assertTrue(is_hashed_name(name))
+        self.assertTrue(name.startswith('products/beer.') and name.endswith('.jpg'))
+        # 内容相同则文件名相同
+        self.assertEqual(default_storage.hashed_name('products/beer.jpg', ContentFile(b'beer')), name)
+
+    def test_derivative_names_kept(self):
+        """未带哈希的原图（历史上传）生成的缩略图也按约定的名称保存，能被查找到"""
+        original = 'products/legacy.jpg'
+        os.makedirs(default_storage.path('products'))
+        with open(default_storage.path(original), 'wb') as f:
+            f.write(jpeg_bytes())
+        self.assertTrue(generate_derivatives(original))
+        for size in DERIVATIVE_SIZES:
+            for fmt in DERIVATIVE_FORMATS:
+                self.assertTrue(default_storage.exists(derivative_name(original, size, fmt)))
+        self.assertFalse(generate_derivatives(original))
+
+
+class DerivativeUrlsTests(MediaRootMixin, SimpleTestCase):
+
+    def test_urls_follow_naming_without_storage_access(self):
+        with mock.patch.object(default_storage, 'exists', side_effect=AssertionError('不应访问存储')):
+            urls = derivative_urls('products/beer.3f2a9c1d0b7e.jpg')
+        self.assertEqual(set(urls), set(DERIVATIVE_SIZES))
+        self.assertEqual(urls['small']['webp'], '/media/products/beer.3f2a9c1d0b7e.jpg.small.webp')
+        self.assertIsNone(derivative_urls(''))
+
+    def test_original_name(self):
+        self.assertEqual(original_name('a/beer.jpg.medium.jpg'), 'a/beer.jpg')
+        self.assertIsNone(original_name('a/beer.jpg'))
+
+
+@override_settings(BACKGROUND_TASK_WORKERS=0)
+class ServeMediaTests(MediaRootMixin, SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.name = default_storage.save('shop_logos/logo.jpg', ContentFile(jpeg_bytes()))
+        self.url = default_storage.url(self.name)
+        self.etag = self.client.get(self.url)['ETag']
+        self.modified = os.stat(default_storage.path(self.name)).st_mtime
+
+    def test_hashed_name_immutable(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_if_none_match(self):
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=self.etag).status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=f'"other", W/{self.etag}').status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH='*').status_code, 304)
+
+    def test_if_modified_since(self):
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=http_date(self.modified)).status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=http_date(self.modified - 60)).status_code, 200)
+
+    def test_if_none_match_mismatch_ignores_if_modified_since(self):
+        response = self.client.get(
+            self.url, HTTP_IF_NONE_MATCH='"stale"', HTTP_IF_MODIFIED_SINCE=http_date(self.modified + 60)
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(len(b''.join(response.streaming_content)), 10)
+
+    def test_missing_derivative_redirects_to_original_and_generates(self):
+        small = derivative_urls(self.name)['small']['webp']
+        response = self.client.get(small)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['Location'], self.url)
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        # 重定向时已补生成，之后直接返回缩略图
+        response = self.client.get(small)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+
+    def test_missing_file_404(self):
+        self.assertEqual(self.client.get('/media/shop_logos/none.jpg').status_code, 404)
+        self.assertEqual(self.client.get('/media/shop_logos/none.jpg.small.webp').status_code, 404)
+
+    def test_sendfile_header_percent_encodes_path(self):
+        name = default_storage.save('shop_logos/店招 1.jpg', ContentFile(jpeg_bytes()))
+        url = default_storage.url(name)
+        with override_settings(MEDIA_SENDFILE_HEADER='X-Accel-Redirect', MEDIA_SENDFILE_PREFIX='/protected-media/'):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + quote(name))
+        self.assertNotIn('店', response['X-Accel-Redirect'])
+        with override_settings(MEDIA_SENDFILE_HEADER='X-Sendfile'):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Sendfile'], quote(default_storage.path(name)))
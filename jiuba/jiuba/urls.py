@@ -15,11 +15,12 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
-from django.conf.urls.static import static
 from django.http import JsonResponse
 from django.http import HttpResponseForbidden
+from jiuba.media import serve_media
+from jiuba.metrics import metrics_view
 
 def admin_required(view_func):
     """只有管理员才能访问Django Admin"""
@@ -77,6 +78,10 @@ def home(request):
                     'url': '/api/orders/',
                     'description': '订单接口'
                 },
+                'payment': {
+                    'url': '/api/payment/',
+                    'description': '支付接口'
+                },
                 'activity': {
                     'url': '/api/activity/',
                     'description': '活动接口'
@@ -98,17 +103,20 @@ def home(request):
 urlpatterns = [
     path('', home, name='home'),  # 添加根路径欢迎页面
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),  # Prometheus 抓取
     path('merchant/', include('apps.merchant.urls')),  # 新增商家后台
     path('api/cart/', include('apps.cart.urls')),
     path('api/auth/', include('apps.user.urls')),
     path('api/shop/', include('apps.shop.urls')),
     path('api/product/', include('apps.product.urls')),
     path('api/orders/', include('apps.order.urls')),
+    path('api/payment/', include('apps.payment.urls')),
     path('api/activity/', include('apps.activity.urls')),
     path('api/reservations/', include('apps.reservations.urls')),
     path('api/notice/', include('apps.notice.urls')),
 ]
 
-# 开发环境下提供媒体文件服务
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+# 媒体文件服务（生产环境同样可用，支持缓存头、Range 和代理 sendfile）
+urlpatterns += [
+    re_path(r'^%s(?P<path>.*)$' % settings.MEDIA_URL.lstrip('/'), serve_media, name='media'),
+]
\ No newline at end of file
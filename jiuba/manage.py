@@ -3,9 +3,6 @@
 import os
 import sys
 
-# 添加项目根目录到 Python 路径
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-sys.path.append(BASE_DIR)
 
 def main():
     """Run administrative tasks."""